@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Compare writing several outputs from one walk of the SoC with writing
+each of them separately.
+
+Builds a synthetic SoC and writes its documentation, SVD, C header and
+JSON description twice: once with a separate extraction per output, and
+once through :func:`lxsocdoc.emit`, which extracts each region only once.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import lxsocdoc
+from synthetic import SyntheticSoC
+
+def separate(soc, out):
+    lxsocdoc.generate_docs(soc, os.path.join(out, "docs"), quiet=True, diagrams="svg", force=True)
+    lxsocdoc.generate_svd(soc, out, force=True)
+    lxsocdoc.emit(soc, [lxsocdoc.CHeaderBackend(os.path.join(out, "csr.h"))])
+    lxsocdoc.emit(soc, [lxsocdoc.JSONBackend(os.path.join(out, "csr.json"))])
+
+def combined(soc, out):
+    lxsocdoc.emit(soc, [
+        lxsocdoc.DocsBackend(os.path.join(out, "docs"), diagrams="svg"),
+        lxsocdoc.SVDBackend(os.path.join(out, "soc.svd")),
+        lxsocdoc.CHeaderBackend(os.path.join(out, "csr.h")),
+        lxsocdoc.JSONBackend(os.path.join(out, "csr.json")),
+    ])
+
+def measure(fn, soc, repeat):
+    best = None
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as out:
+            start = time.perf_counter()
+            fn(soc, out)
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--regions", type=int, default=32, help="Number of CSR regions")
+    parser.add_argument("--csrs", type=int, default=32, help="Ordinary CSRs per region")
+    parser.add_argument("--fields", type=int, default=8, help="Fields per CSR")
+    parser.add_argument("--wide", type=int, default=4, help="CSRs wider than the bus per region")
+    parser.add_argument("--csr-data-width", type=int, default=8, help="CSR bus width")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs; the best is reported")
+    args = parser.parse_args()
+
+    soc = SyntheticSoC(regions=args.regions, csrs=args.csrs, fields=args.fields, wide=args.wide,
+        csr_data_width=args.csr_data_width)
+
+    separate_time = measure(separate, soc, args.repeat)
+    combined_time = measure(combined, soc, args.repeat)
+    print("separate:  {:8.3f} s".format(separate_time))
+    print("emit:      {:8.3f} s".format(combined_time))
+    print("speedup:   {:8.2f}x".format(separate_time / combined_time))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Check that `import lxsocdoc` stays cheap.
+
+Imports lxsocdoc in fresh interpreters, reports the best import time and
+exits with an error if migen or LiteX were imported, or if the import took
+longer than `--max-ms`.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import lxsocdoc
+elapsed = time.perf_counter() - start
+heavy = sorted(m for m in sys.modules if m.split(".")[0] in ("migen", "litex"))
+print(json.dumps({"seconds": elapsed, "heavy": heavy}))
+"""
+
+def probe():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")] +
+        ([env["PYTHONPATH"]] if "PYTHONPATH" in env else []))
+    out = subprocess.check_output([sys.executable, "-c", _PROBE], env=env)
+    return json.loads(out.decode("utf-8"))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Number of fresh interpreters to time")
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail if importing takes longer than this")
+    args = parser.parse_args()
+
+    results = [probe() for _ in range(args.repeat)]
+    best = min(r["seconds"] for r in results) * 1000
+    print("import lxsocdoc: {:.1f} ms".format(best))
+
+    failed = False
+    if len(results[0]["heavy"]) > 0:
+        print("error: importing lxsocdoc also imported {}".format(", ".join(results[0]["heavy"])))
+        failed = True
+    if args.max_ms is not None and best > args.max_ms:
+        print("error: import took longer than {} ms".format(args.max_ms))
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Measure how much memory an extracted register map keeps alive.
+
+Builds a synthetic SoC and reports the memory retained by the
+:obj:`RegisterMap` that lxsocdoc extracts from it, along with the number
+of register and field records and how many distinct field objects there
+are.  By default the registers of a region repeat a few field layouts, and
+the fields are wider than the bus so that registers are split, which lets
+equal field records be shared.  Run it on two revisions to compare them.
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import lxsocdoc
+from synthetic import SyntheticSoC
+
+def measure(soc):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    register_map = lxsocdoc.build_register_map(soc)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    registers = 0
+    fields = 0
+    distinct_fields = set()
+    for region in register_map.regions:
+        for csr in region.csrs:
+            registers += 1
+            fields += len(csr.fields)
+            distinct_fields.update(id(f) for f in csr.fields)
+    return {
+        "retained_bytes": retained,
+        "registers": registers,
+        "fields": fields,
+        "distinct_fields": len(distinct_fields),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--regions", type=int, default=64, help="Number of CSR regions")
+    parser.add_argument("--csrs", type=int, default=32, help="Ordinary CSRs per region")
+    parser.add_argument("--fields", type=int, default=4, help="Fields per CSR")
+    parser.add_argument("--field-width", type=int, default=8, help="Width of each field")
+    parser.add_argument("--layouts", type=int, default=4, help="Distinct field layouts per region, or 0 for one per CSR")
+    parser.add_argument("--wide", type=int, default=4, help="CSRs wider than the bus per region")
+    parser.add_argument("--csr-data-width", type=int, default=8, help="CSR bus width")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    soc = SyntheticSoC(regions=args.regions, csrs=args.csrs, fields=args.fields, wide=args.wide,
+        csr_data_width=args.csr_data_width, layouts=args.layouts or None, field_width=args.field_width)
+    result = measure(soc)
+
+    print("registers:        {:10d}".format(result["registers"]))
+    print("field records:    {:10d}".format(result["fields"]))
+    print("distinct fields:  {:10d}".format(result["distinct_fields"]))
+    print("retained:         {:10.1f} KiB".format(result["retained_bytes"] / 1024))
+    print("per register:     {:10.1f} bytes".format(result["retained_bytes"] / max(1, result["registers"])))
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
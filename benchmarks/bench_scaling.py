@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Measure how lxsocdoc scales with the size of the register map.
+
+Each phase is timed (best of `--repeat` runs) and then run once more under
+tracemalloc to record its peak memory.  Results are printed and can be
+written to a JSON file with `--output`, and a previous result file can be
+passed to `--compare` to show the change between two commits.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import lxsocdoc
+
+from synthetic import SyntheticSoC
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL).decode("ascii").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def measure(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    fn()
+    (_, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": best, "peak_bytes": peak}
+
+def run(args):
+    soc = SyntheticSoC(regions=args.regions, csrs=args.csrs, fields=args.fields, wide=args.wide,
+        events=args.events, values=args.values, csr_data_width=args.csr_data_width)
+    register_map = lxsocdoc.build_register_map(soc)
+    nregisters = sum(len(region.csrs) for region in register_map.regions)
+
+    def print_regions():
+        for region in register_map.regions:
+            region.print_region(io.StringIO(), lxsocdoc.MemoryOutput(), False)
+
+    with tempfile.TemporaryDirectory() as svd_dir:
+        results = {
+            "extract": measure(lambda: lxsocdoc.build_register_map(soc), args.repeat),
+            "print_region": measure(print_regions, args.repeat),
+            "generate_svd": measure(lambda: lxsocdoc.generate_svd(register_map, svd_dir, force=True), args.repeat),
+        }
+
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "parameters": {
+            "regions": args.regions,
+            "csrs": args.csrs,
+            "fields": args.fields,
+            "wide": args.wide,
+            "events": args.events,
+            "values": args.values,
+            "csr_data_width": args.csr_data_width,
+            "registers": nregisters,
+        },
+        "results": results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--regions", type=int, default=32, help="Number of CSR regions")
+    parser.add_argument("--csrs", type=int, default=16, help="Ordinary CSRs per region")
+    parser.add_argument("--fields", type=int, default=4, help="Fields per CSR")
+    parser.add_argument("--wide", type=int, default=2, help="CSRs wider than the bus per region")
+    parser.add_argument("--events", type=int, default=2, help="Event sources per region")
+    parser.add_argument("--values", type=int, default=4, help="Value table entries per CSR")
+    parser.add_argument("--csr-data-width", type=int, default=32, help="CSR bus width")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs per phase")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Compare against a previous JSON result file")
+    args = parser.parse_args()
+
+    result = run(args)
+    previous = None
+    if args.compare is not None:
+        with open(args.compare) as f:
+            previous = json.load(f)
+
+    print("{registers} registers in {regions} regions".format(**result["parameters"]))
+    for (phase, r) in result["results"].items():
+        line = "{:14} {:9.4f} s {:10.1f} KiB".format(phase, r["seconds"], r["peak_bytes"] / 1024)
+        if previous is not None and phase in previous["results"]:
+            p = previous["results"][phase]
+            line += "   ({:+.1%} time, {:+.1%} memory)".format(
+                r["seconds"] / p["seconds"] - 1, r["peak_bytes"] / max(1, p["peak_bytes"]) - 1)
+        print(line)
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == "__main__":
+    main()
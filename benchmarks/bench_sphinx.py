@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Measure how long Sphinx takes to build the documentation of a
+synthetic SoC.
+
+The documentation is generated once with each layout (one page per region,
+and pages planned to `--page-budget` registers) and then built from
+scratch with `sphinx-build`.  Regions are given a range of sizes, from a
+single register up to `--csrs` times `--spread`, so that both splitting
+and grouping come into play.  Requires Sphinx.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import lxsocdoc
+from synthetic import SyntheticSoC
+
+def sized_register_map(args):
+    """Return a register map whose regions range from one register up to
+    `csrs * spread` registers"""
+    soc = SyntheticSoC(regions=args.regions, csrs=args.csrs * args.spread, fields=args.fields, wide=0,
+        csr_data_width=args.csr_data_width)
+    register_map = lxsocdoc.build_register_map(soc)
+    regions = []
+    for (i, region) in enumerate(register_map.regions):
+        # Every fourth region is large; the others get a handful of registers.
+        size = len(region.csrs) if i % 4 == 0 else 1 + i % 3
+        regions.append(region.replace(csrs=region.csrs[:size]))
+    return register_map._replace(regions=tuple(regions))
+
+def build(register_map, page_budget, args):
+    from sphinx.cmd.build import build_main
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "source")
+        lxsocdoc.generate_docs(register_map, source, quiet=True, diagrams="svg", page_budget=page_budget)
+        pages = len([name for name in os.listdir(source) if name.endswith(".rst")])
+        start = time.perf_counter()
+        status = build_main(["-q", "-b", args.builder, "-j", str(args.jobs), source, os.path.join(tmp, "build")])
+        elapsed = time.perf_counter() - start
+    if status != 0:
+        raise RuntimeError("sphinx-build failed")
+    return (pages, elapsed)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--regions", type=int, default=64, help="Number of CSR regions")
+    parser.add_argument("--csrs", type=int, default=64, help="Registers in a large region, before --spread")
+    parser.add_argument("--spread", type=int, default=4, help="Size multiplier of the large regions")
+    parser.add_argument("--fields", type=int, default=4, help="Fields per CSR")
+    parser.add_argument("--csr-data-width", type=int, default=32, help="CSR bus width")
+    parser.add_argument("--page-budget", type=int, default=64, help="Registers per page for the planned layout")
+    parser.add_argument("--builder", default="html", help="Sphinx builder")
+    parser.add_argument("--jobs", type=int, default=1, help="Sphinx parallel jobs")
+    args = parser.parse_args()
+
+    register_map = sized_register_map(args)
+    (plain_pages, plain_time) = build(register_map, None, args)
+    (planned_pages, planned_time) = build(register_map, args.page_budget, args)
+    print("one page per region: {:5d} pages  {:8.2f} s".format(plain_pages, plain_time))
+    print("page budget {:5d}:   {:5d} pages  {:8.2f} s".format(args.page_budget, planned_pages, planned_time))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Compare SVDWriter against the previous print()-per-line SVD emitter.
+
+Usage: bench_svd.py [regions] [csrs-per-region] [fields-per-csr]
+"""
+
+import io
+import sys
+import time
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from litex.soc.interconnect.csr import CSRField
+
+from lxsocdoc.csr import DocumentedCSR, DocumentedCSRField, DocumentedCSRRegion
+from lxsocdoc.regmap import RegisterMap
+from lxsocdoc.rst import reflow
+from lxsocdoc.svd import SVDWriter
+
+def make_register_map(nregions, ncsrs, nfields):
+    regions = []
+    interrupts = {}
+    for r in range(nregions):
+        name = "periph{}".format(r)
+        region = DocumentedCSRRegion((name, 0xe0000000 + r * 0x800, 32, []), csr_data_width=32)
+        for c in range(ncsrs):
+            fields = [DocumentedCSRField(CSRField("field{}".format(f), offset=f, description="Field number {} of this register".format(f)))
+                      for f in range(nfields)]
+            region.csrs.append(DocumentedCSR(
+                "{}_REG{}".format(name.upper(), c), region.origin + c * 4,
+                short_numbered_name="REG{}".format(c), short_name="REG{}".format(c),
+                size=32, description="Register number {}".format(c), fields=fields,
+            ))
+        regions.append(region.freeze())
+        interrupts[name] = r
+    return RegisterMap(regions=tuple(regions), modules=(), interrupts=interrupts, csr_data_width=32)
+
+def legacy_print_svd_register(csr, csr_address, description, length, svd):
+    print('                <register>', file=svd)
+    print('                    <name>{}</name>'.format(csr.short_numbered_name), file=svd)
+    if description is not None:
+        print('                    <description><![CDATA[{}]]></description>'.format(description), file=svd)
+    print('                    <addressOffset>0x{:04x}</addressOffset>'.format(csr_address), file=svd)
+    print('                    <resetValue>0x{:02x}</resetValue>'.format(csr.reset_value), file=svd)
+    print('                    <size>{}</size>'.format(length), file=svd)
+    print('                    <access>{}</access>'.format(csr.access), file=svd)
+    print('                    <fields>', file=svd)
+    for field in csr.fields:
+        print('                        <field>', file=svd)
+        print('                            <name>{}</name>'.format(field.name), file=svd)
+        print('                            <msb>{}</msb>'.format(field.offset + field.size - 1), file=svd)
+        print('                            <bitRange>[{}:{}]</bitRange>'.format(field.offset + field.size - 1, field.offset), file=svd)
+        print('                            <lsb>{}</lsb>'.format(field.offset), file=svd)
+        print('                            <description><![CDATA[{}]]></description>'.format(reflow(field.description)), file=svd)
+        print('                        </field>', file=svd)
+    print('                    </fields>', file=svd)
+    print('                </register>', file=svd)
+
+def legacy_generate_svd(register_map, svd):
+    for region in register_map.regions:
+        csr_address = 0
+        print('        <peripheral>', file=svd)
+        print('            <name>{}</name>'.format(region.name.upper()), file=svd)
+        print('            <baseAddress>0x{:08X}</baseAddress>'.format(region.origin), file=svd)
+        print('            <groupName>{}</groupName>'.format(region.name.upper()), file=svd)
+        print('            <registers>', file=svd)
+        for csr in region.csrs:
+            length = ((csr.size + region.busword - 1)//region.busword) * region.busword
+            legacy_print_svd_register(csr, csr_address, csr.description, length, svd)
+            csr_address = csr_address + 4
+        print('            </registers>', file=svd)
+        print('            <addressBlock>', file=svd)
+        print('                <offset>0</offset>', file=svd)
+        print('                <size>0x{:x}</size>'.format(csr_address), file=svd)
+        print('                <usage>registers</usage>', file=svd)
+        print('            </addressBlock>', file=svd)
+        if region.name in register_map.interrupts:
+            print('            <interrupt>', file=svd)
+            print('                <name>{}</name>'.format(region.name), file=svd)
+            print('                <value>{}</value>'.format(register_map.interrupts[region.name]), file=svd)
+            print('            </interrupt>', file=svd)
+        print('        </peripheral>', file=svd)
+
+def writer_generate_svd(register_map, svd):
+    writer = SVDWriter(svd)
+    for region in register_map.regions:
+        writer.write_peripheral(region, register_map.interrupts.get(region.name))
+    writer.flush()
+
+def best_of(fn, register_map, repeat=5):
+    best = None
+    for _ in range(repeat):
+        with open(os.devnull, "w") as devnull:
+            start = time.perf_counter()
+            fn(register_map, devnull)
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    (nregions, ncsrs, nfields) = [int(x) for x in (sys.argv[1:] + ["20", "64", "8"][len(sys.argv[1:]):])]
+    register_map = make_register_map(nregions, ncsrs, nfields)
+
+    legacy = io.StringIO()
+    legacy_generate_svd(register_map, legacy)
+    new = io.StringIO()
+    writer_generate_svd(register_map, new)
+    if legacy.getvalue() != new.getvalue():
+        raise SystemExit("SVDWriter output differs from the legacy emitter")
+
+    legacy_time = best_of(legacy_generate_svd, register_map)
+    writer_time = best_of(writer_generate_svd, register_map)
+    print("{} regions x {} CSRs x {} fields".format(nregions, ncsrs, nfields))
+    print("legacy print():  {:8.3f} s".format(legacy_time))
+    print("SVDWriter:       {:8.3f} s".format(writer_time))
+    print("speedup:         {:8.2f}x".format(legacy_time / writer_time))
+
+if __name__ == "__main__":
+    main()
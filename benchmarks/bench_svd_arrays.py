@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Compare the size of SVD files written with and without register arrays.
+
+Builds a synthetic SoC, writes its SVD both ways, checks that the arrays
+expand to exactly the registers of the plain file and reports both sizes.
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import lxsocdoc
+from synthetic import SyntheticSoC
+
+def write_svd(register_map, arrays):
+    stream = io.StringIO()
+    start = time.perf_counter()
+    lxsocdoc.SVDWriter(stream, arrays=arrays).write(register_map)
+    return (stream.getvalue(), time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--regions", type=int, default=32, help="Number of CSR regions")
+    parser.add_argument("--csrs", type=int, default=16, help="Ordinary CSRs per region")
+    parser.add_argument("--fields", type=int, default=2, help="Fields per CSR")
+    parser.add_argument("--wide", type=int, default=8, help="CSRs wider than the bus per region")
+    parser.add_argument("--banks", type=int, default=16, help="Numbered registers per region that share a description")
+    parser.add_argument("--csr-data-width", type=int, default=8, help="CSR bus width")
+    args = parser.parse_args()
+
+    soc = SyntheticSoC(regions=args.regions, csrs=args.csrs, fields=args.fields, wide=args.wide,
+        banks=args.banks, csr_data_width=args.csr_data_width)
+    register_map = lxsocdoc.build_register_map(soc)
+
+    (plain, plain_time) = write_svd(register_map, arrays=False)
+    (arrays, arrays_time) = write_svd(register_map, arrays=True)
+    problems = lxsocdoc.check_register_arrays(plain, arrays)
+    for problem in problems:
+        print("error: " + problem)
+
+    print("plain:   {:10d} bytes  {:8.3f} s".format(len(plain), plain_time))
+    print("arrays:  {:10d} bytes  {:8.3f} s".format(len(arrays), arrays_time))
+    print("ratio:   {:10.2f}x".format(len(plain) / len(arrays)))
+    return 1 if len(problems) > 0 else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Compare how long Sphinx takes to parse grid tables and list tables.
+
+Generates the documentation of a synthetic SoC once with each
+`table_format` and times a from-scratch build with Sphinx's `dummy`
+builder, which reads and parses every page but writes nothing.  The total
+size of the generated pages is reported alongside.  Requires Sphinx.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import lxsocdoc
+from synthetic import SyntheticSoC
+
+def parse(register_map, table_format, args):
+    from sphinx.cmd.build import build_main
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "source")
+        lxsocdoc.generate_docs(register_map, source, quiet=True, diagrams="svg", table_format=table_format)
+        size = sum(os.path.getsize(os.path.join(source, name)) for name in os.listdir(source) if name.endswith(".rst"))
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            status = build_main(["-q", "-E", "-b", "dummy", source, os.path.join(tmp, "build")])
+            elapsed = time.perf_counter() - start
+            if status != 0:
+                raise RuntimeError("sphinx-build failed")
+            best = elapsed if best is None else min(best, elapsed)
+    return (size, best)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--regions", type=int, default=32, help="Number of CSR regions")
+    parser.add_argument("--csrs", type=int, default=32, help="Ordinary CSRs per region")
+    parser.add_argument("--fields", type=int, default=8, help="Fields per CSR")
+    parser.add_argument("--values", type=int, default=4, help="Documented values per field")
+    parser.add_argument("--wide", type=int, default=2, help="CSRs wider than the bus per region")
+    parser.add_argument("--csr-data-width", type=int, default=32, help="CSR bus width")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of runs; the best is reported")
+    args = parser.parse_args()
+
+    soc = SyntheticSoC(regions=args.regions, csrs=args.csrs, fields=args.fields, wide=args.wide,
+        values=args.values, csr_data_width=args.csr_data_width)
+    register_map = lxsocdoc.build_register_map(soc)
+
+    (grid_size, grid_time) = parse(register_map, "grid", args)
+    (list_size, list_time) = parse(register_map, "list", args)
+    print("grid tables:  {:10d} bytes  {:8.2f} s".format(grid_size, grid_time))
+    print("list tables:  {:10d} bytes  {:8.2f} s".format(list_size, list_time))
+    print("list / grid:  {:10.2f}x".format(list_time / grid_time))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""Synthetic stand-ins for a LiteX SoC, for benchmarking lxsocdoc.
+
+These build real LiteX CSR objects, but skip elaborating an SoC: there is
+no CPU, no bus and no platform.  The result has just enough of the SoC
+interface (`csr_regions`, `soc_interrupt_map`, `csr_data_width` and the
+peripheral submodules) for :func:`lxsocdoc.build_register_map`.
+"""
+
+from migen import Module
+
+from litex.soc.interconnect.csr import CSRStatus, CSRStorage, CSRField, _CompoundCSR
+from litex.soc.interconnect.csr_eventmanager import EventManager, EventSourcePulse
+
+class SyntheticRegion:
+    def __init__(self, origin, busword, obj):
+        self.origin = origin
+        self.busword = busword
+        self.obj = obj
+
+class SyntheticPeripheral(Module):
+    pass
+
+class SyntheticSoC(Module):
+    """A fake SoC with a parameterised register map
+
+    Arguments
+    ---------
+
+    regions (int): Number of CSR regions.
+
+    csrs (int): Number of ordinary CSRs in each region.
+
+    fields (int): Number of fields in each ordinary CSR.
+
+    wide (int): Number of compound CSRs per region that are four times as
+    wide as `csr_data_width`, and so get split into several registers.
+
+    events (int): Number of event sources per region.  Regions with events
+    get an EventManager and an interrupt.
+
+    values (int): Number of entries in the value table of each CSR's first
+    field.
+
+    layouts (int): If set, the ordinary CSRs of each region cycle through
+    this many field layouts, so that registers repeat the same fields.
+    Otherwise every CSR's fields are described differently.
+
+    csr_data_width (int): Width of the CSR bus.
+
+    field_width (int): Width of each field.  By default the fields of a CSR
+    fill one bus word between them.
+
+    banks (int): Number of numbered `bank` CSRs per region that share their
+    description and fields, and so can be described as one SVD register
+    array.
+    """
+    def __init__(self, regions=16, csrs=16, fields=4, wide=2, events=2, values=4, csr_data_width=32, layouts=None,
+                field_width=None, banks=0):
+        self.csr_data_width = csr_data_width
+        self.csr_regions = {}
+        self.soc_interrupt_map = {}
+
+        if field_width is None:
+            field_width = max(1, csr_data_width // max(1, fields))
+        for r in range(regions):
+            name = "periph{}".format(r)
+            peripheral = SyntheticPeripheral()
+            csr_list = []
+            for c in range(csrs):
+                csr_fields = []
+                layout = c if layouts is None else c % layouts
+                for f in range(fields):
+                    field_values = None
+                    if f == 0 and values > 0:
+                        field_values = [(str(v), "value{}".format(v), "Selects mode number {}.".format(v)) for v in range(values)]
+                    csr_fields.append(CSRField("field{}".format(f), size=field_width, offset=f * field_width,
+                        description="Field {} of register {}.  It controls a very important aspect of {}.".format(f, layout, name),
+                        values=field_values))
+                if c % 2:
+                    csr = CSRStatus(name="reg{}".format(c), fields=csr_fields, description="Status register {} of {}".format(c, name))
+                else:
+                    csr = CSRStorage(name="reg{}".format(c), fields=csr_fields, description="Control register {} of {}".format(c, name))
+                csr_list.append(csr)
+            for w in range(wide):
+                csr_list.append(CSRStorage(csr_data_width * 4, name="wide{}".format(w), description="A register wider than the bus"))
+            for b in range(banks):
+                bank_fields = [CSRField("field{}".format(f), size=field_width, offset=f * field_width,
+                    description="Field {} of every bank register of {}.".format(f, name)) for f in range(fields)]
+                if len(bank_fields) > 0:
+                    csr_list.append(CSRStorage(name="bank{}".format(b), fields=bank_fields, description="Bank register of {}".format(name)))
+                else:
+                    csr_list.append(CSRStorage(csr_data_width, name="bank{}".format(b), description="Bank register of {}".format(name)))
+
+            if events > 0:
+                ev = EventManager()
+                for e in range(events):
+                    setattr(ev, "event{}".format(e), EventSourcePulse(name="event{}".format(e), description="Event {} fired".format(e)))
+                # Create the CSRs by hand rather than calling finalize(),
+                # which relies on migen being able to trace variable names.
+                ev.status = CSRStatus(events, name="ev_status")
+                ev.pending = CSRStatus(events, name="ev_pending")
+                ev.enable = CSRStorage(events, name="ev_enable")
+                peripheral.submodules.ev = ev
+                csr_list += [ev.status, ev.pending, ev.enable]
+                self.soc_interrupt_map[name] = r
+
+            for csr in csr_list:
+                if isinstance(csr, _CompoundCSR):
+                    try:
+                        csr.finalize(csr_data_width, "big")
+                    except TypeError:
+                        # Older versions of LiteX don't take an ordering
+                        csr.finalize(csr_data_width)
+
+            setattr(self.submodules, name, peripheral)
+            self.csr_regions[name] = SyntheticRegion(0xe0000000 + r * 0x800, csr_data_width, csr_list)
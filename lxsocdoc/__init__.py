@@ -3,26 +3,42 @@
 # Disable pylint's E1101, which breaks completely on migen
 #pylint:disable=E1101
 
-from litex.soc.interconnect.csr import _CompoundCSR
 from .csr import DocumentedCSRRegion
-from .module import gather_submodules, ModuleNotDocumented, DocumentedModule, DocumentedInterrupts
-from .rst import reflow
-
-sphinx_configuration = """
-project = '{}'
-copyright = '{}, {}'
-author = '{}'
-extensions = [
-    'sphinx.ext.autosectionlabel',
-    'sphinxcontrib.wavedrom',{}
-]
-templates_path = ['_templates']
-exclude_patterns = []
-offline_skin_js_path = "https://wavedrom.com/skins/default.js"
-offline_wavedrom_js_path = "https://wavedrom.com/WaveDrom.js"
-html_theme = 'alabaster'
-html_static_path = ['_static']
-"""
+from .module import gather_submodules, ModuleIndex, ModuleNotDocumented, DocumentedModule, DocumentedInterrupts
+from .regmap import (RegisterMap, build_register_map, as_register_map, group_identical_regions,
+    get_interrupts, index_modules, iter_documented_regions, document_modules, get_csr_regions)
+from .output import OutputSink, OutputDirectory, OutputReport, MemoryOutput, ZipOutput, TarOutput, open_output
+from .rst import format_table, format_list_table, layout_table, TABLE_FORMATS, make_table, print_table, reflow, set_text_cache_size, text_cache_info
+from .stats import BuildStats, NULL_STATS
+from .emit import emit, Backend, DocsBackend, SVDBackend, CHeaderBackend, JSONBackend, field_mask
+
+import os
+from collections import OrderedDict
+
+# Names that are only imported from their module when first used, so that
+# `import lxsocdoc` doesn't load the parts a build may not need.
+_LAZY_NAMES = {
+    "plan_pages": "layout", "RegionIndexPage": "layout", "RegisterPage": "layout", "GroupPage": "layout",
+    "load_register_map": "loader",
+    "Fingerprint": "fingerprint", "fingerprint_regions": "fingerprint", "FileFingerprintStore": "fingerprint",
+    "regenerate": "fingerprint", "FINGERPRINT_SUFFIX": "fingerprint",
+    "sphinx_conf": "docs", "index_rst": "docs", "render_regions": "docs", "write_page": "docs",
+    "install_assets": "docs", "pages_manifest": "docs", "pages_present": "docs", "docs_fingerprint": "docs",
+    "DocsFingerprintStore": "docs", "PAGES_FILE": "docs", "FINGERPRINT_FILE": "docs",
+    "SVDWriter": "svd", "format_register": "svd", "check_register_arrays": "svd", "open_svd_output": "svd",
+    "svd_compression": "svd", "svd_fingerprint": "svd", "COMPRESSION_SUFFIXES": "svd",
+}
+
+def __getattr__(name):
+    if name not in _LAZY_NAMES:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    import importlib
+    value = getattr(importlib.import_module("." + _LAZY_NAMES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_NAMES))
 
 def sub_csr_bit_range(busword, csr, offset):
     nwords = (csr.size + busword - 1)//busword
@@ -33,256 +49,299 @@ def sub_csr_bit_range(busword, csr, offset):
     return (origin, nbits, name)
 
 def print_svd_register(csr, csr_address, description, length, svd):
-    print('                <register>', file=svd)
-    print('                    <name>{}</name>'.format(csr.short_numbered_name), file=svd)
-    if description is not None:
-        print('                    <description><![CDATA[{}]]></description>'.format(description), file=svd)
-    print('                    <addressOffset>0x{:04x}</addressOffset>'.format(csr_address), file=svd)
-    print('                    <resetValue>0x{:02x}</resetValue>'.format(csr.reset_value), file=svd)
-    print('                    <size>{}</size>'.format(length), file=svd)
-    print('                    <access>{}</access>'.format(csr.access), file=svd)
-    csr_address = csr_address + 4
-    print('                    <fields>', file=svd)
-    if hasattr(csr, "fields") and len(csr.fields) > 0:
-        for field in csr.fields:
-            print('                        <field>', file=svd)
-            print('                            <name>{}</name>'.format(field.name), file=svd)
-            print('                            <msb>{}</msb>'.format(field.offset + field.size - 1), file=svd)
-            print('                            <bitRange>[{}:{}]</bitRange>'.format(field.offset + field.size - 1, field.offset), file=svd)
-            print('                            <lsb>{}</lsb>'.format(field.offset), file=svd)
-            print('                            <description><![CDATA[{}]]></description>'.format(reflow(field.description)), file=svd)
-            print('                        </field>', file=svd)
+    from .svd import format_register
+    svd.write(format_register(csr, csr_address, description, length))
+
+def generate_svd(soc, buildpath, vendor="litex", name="soc", filename=None, description=None, stats=None, deduplicate=False, arrays=False,
+            compression=None, compresslevel=None, force=False):
+    """Generate a CMSIS-SVD file describing the SoC
+
+    `soc` may be either a LiteX SoC or a :obj:`RegisterMap` that was
+    previously returned by :func:`build_register_map`.
+
+    If `stats` is a :obj:`BuildStats`, the time spent on each region is
+    recorded in it.
+
+    Given a SoC, each region is extracted and written before the next one
+    is looked at, so memory use doesn't grow with the size of the SoC.
+
+    If `deduplicate` is set, peripherals that are identical to an earlier
+    one apart from their name, base address and interrupt are emitted as
+    `<peripheral derivedFrom=...>` rather than repeating their registers.
+
+    If `arrays` is set, runs of registers that only differ in a trailing
+    index, and share a description, are emitted as a single `dim` register
+    array.  :func:`check_register_arrays` verifies
+    that this expands to the same registers as the plain output.
+
+    `compression` may be `"gzip"`, `"xz"` or `"bz2"` to compress the file
+    as it is written, at `compresslevel`.  The default file name gets the
+    matching suffix, and a `filename` ending in `.gz`, `.xz` or `.bz2`
+    selects compression by itself.  `buildpath` may also be a binary file
+    object, in which case the SVD is written to it and `filename` is
+    ignored.
+
+    A fingerprint of the register map and these options is stored beside
+    the SVD file, in a file with `.fingerprint` appended to its name.  If
+    it matches, the SVD is left alone unless `force` is set.  Comparing
+    needs every region up front, so regions are only streamed from a SoC
+    when there is no old fingerprint.  Returns whether the file was
+    written.
+    """
+    from .fingerprint import FileFingerprintStore, fingerprint_regions, regenerate, FINGERPRINT_SUFFIX
+    from .svd import SVDWriter, open_svd_output, svd_compression, svd_fingerprint, COMPRESSION_SUFFIXES
+    fingerprint = svd_fingerprint(vendor, name, description, deduplicate, arrays, compression, compresslevel)
+    store = None
+    if hasattr(buildpath, "write"):
+        target = buildpath
     else:
-        field_size = csr.size
-        field_name = csr.short_name.lower()
-        # Strip off "ev_" from eventmanager fields
-        if field_name == "ev_enable":
-            field_name = "enable"
-        elif field_name == "ev_pending":
-            field_name = "pending"
-        elif field_name == "ev_status":
-            field_name = "status"
-        print('                        <field>', file=svd)
-        print('                            <name>{}</name>'.format(field_name), file=svd)
-        print('                            <msb>{}</msb>'.format(field_size - 1), file=svd)
-        print('                            <bitRange>[{}:{}]</bitRange>'.format(field_size - 1, 0), file=svd)
-        print('                            <lsb>{}</lsb>'.format(0), file=svd)
-        print('                        </field>', file=svd)
-    print('                    </fields>', file=svd)
-    print('                </register>', file=svd)
-
-def generate_svd(soc, buildpath, vendor="litex", name="soc", filename=None, description=None):
-    interrupts = {}
-    for csr, irq in sorted(soc.soc_interrupt_map.items()):
-        interrupts[csr] = irq
-
-    documented_regions = []
-
-    raw_regions = []
-    if hasattr(soc, "get_csr_regions"):
-        raw_regions = soc.get_csr_regions()
+        if filename is None:
+            filename = name + ".svd" + COMPRESSION_SUFFIXES.get(compression, "")
+        target = buildpath + "/" + filename
+        store = FileFingerprintStore(target, FINGERPRINT_SUFFIX)
+    # Check the options before the old fingerprint is thrown away.
+    compression = svd_compression(target, compression)
+
+    # Only stream when there is no old fingerprint to compare against, as
+    # the comparison has to come before anything is written.
+    streaming = not (isinstance(soc, RegisterMap) or deduplicate)
+    if streaming and store is not None and not force and store.read() is not None:
+        streaming = False
+    if streaming:
+        interrupts = get_interrupts(soc)
+        fingerprint.add_interrupts(interrupts, soc.csr_data_width)
+        regions = fingerprint_regions(iter_documented_regions(soc, stats, interrupts=interrupts), fingerprint)
     else:
-        for region_name, region in soc.csr_regions.items():
-            raw_regions.append((region_name, region.origin, region.busword, region.obj))
-    for csr_region in raw_regions:
-        documented_regions.append(DocumentedCSRRegion(csr_region, csr_data_width=soc.csr_data_width))
-
-    if filename is None:
-        filename = name + ".svd"
-    with open(buildpath + "/" + filename, "w", encoding="utf-8") as svd:
-        print('<?xml version="1.0" encoding="utf-8"?>', file=svd)
-        print('', file=svd)
-        print('<device schemaVersion="1.1" xmlns:xs="http://www.w3.org/2001/XMLSchema-instance" xs:noNamespaceSchemaLocation="CMSIS-SVD.xsd" >', file=svd)
-        print('    <vendor>{}</vendor>'.format(vendor), file=svd)
-        print('    <name>{}</name>'.format(name.upper()), file=svd)
-        if description is not None:
-            print('    <description><![CDATA[{}]]></description>'.format(reflow(description)), file=svd)
-        print('', file=svd)
-        print('    <addressUnitBits>8</addressUnitBits>', file=svd)
-        print('    <width>32</width>', file=svd)
-        print('    <size>32</size>', file=svd)
-        print('    <access>read-write</access>', file=svd)
-        print('    <resetValue>0x00000000</resetValue>', file=svd)
-        print('    <resetMask>0xFFFFFFFF</resetMask>', file=svd)
-        print('', file=svd)
-        print('    <peripherals>', file=svd)
-
-        for region in documented_regions:
-            csr_address = 0
-            print('        <peripheral>', file=svd)
-            print('            <name>{}</name>'.format(region.name.upper()), file=svd)
-            print('            <baseAddress>0x{:08X}</baseAddress>'.format(region.origin), file=svd)
-            print('            <groupName>{}</groupName>'.format(region.name.upper()), file=svd)
-            if len(region.sections) > 0:
-                print('            <description><![CDATA[{}]]></description>'.format(reflow(region.sections[0].body())), file=svd)
-            print('            <registers>', file=svd)
-            for csr in region.csrs:
-                description = None
-                if hasattr(csr, "description"):
-                    description = csr.description
-                if isinstance(csr, _CompoundCSR) and len(csr.simple_csrs) > 1:
-                    is_first = True
-                    for i in range(len(csr.simple_csrs)):
-                        (start, length, name) = sub_csr_bit_range(region.busword, csr, i)
-                        sub_name = csr.name.upper() + "_" + name
-                        if length > 0:
-                            bits_str = "Bits {}-{} of `{}`.".format(start, start+length, csr.name)
-                        else:
-                            bits_str = "Bit {} of `{}`.".format(start, csr.name)
-                        if is_first:
-                            if description is not None:
-                                print_svd_register(csr.simple_csrs[i], csr_address, bits_str + " " + description, length, svd)
-                            else:
-                                print_svd_register(csr.simple_csrs[i], csr_address, bits_str, length, svd)
-                            is_first = False
-                        else:
-                            print_svd_register(csr.simple_csrs[i], csr_address, bits_str, length, svd)
-                        csr_address = csr_address + 4
-                else:
-                    length = ((csr.size + region.busword - 1)//region.busword) * region.busword
-                    print_svd_register(csr, csr_address, description, length, svd)
-                    csr_address = csr_address + 4
-            print('            </registers>', file=svd)
-            print('            <addressBlock>', file=svd)
-            print('                <offset>0</offset>', file=svd)
-            print('                <size>0x{:x}</size>'.format(csr_address), file=svd)
-            print('                <usage>registers</usage>', file=svd)
-            print('            </addressBlock>', file=svd)
-            if region.name in interrupts:
-                print('            <interrupt>', file=svd)
-                print('                <name>{}</name>'.format(region.name), file=svd)
-                print('                <value>{}</value>'.format(interrupts[region.name]), file=svd)
-                print('            </interrupt>', file=svd)
-            print('        </peripheral>', file=svd)
-        print('    </peripherals>', file=svd)
-        print('</device>', file=svd)
+        register_map = as_register_map(soc, stats)
+        fingerprint.add_register_map(register_map, modules=False)
+
+    def write_svd():
+        with open_svd_output(target, compression, compresslevel) as svd:
+            writer = SVDWriter(svd, vendor=vendor, name=name, description=description, derive=deduplicate, arrays=arrays)
+            if streaming:
+                # Extract, write and drop one region at a time.
+                writer.write_regions(regions, interrupts, stats)
+            else:
+                writer.write(register_map, stats)
+
+    if store is None:
+        write_svd()
+        return True
+    return regenerate(store, fingerprint, write_svd, force)
 
 def generate_docs(soc, base_dir, project_name="LiteX SoC Project",
-            author="Anonymous", sphinx_extensions=[], quiet=False, note_pulses=False):
-    """Possible extra extensions:
+            author="Anonymous", sphinx_extensions=[], quiet=False, note_pulses=False, jobs=1, asset_mode="copy", diagrams="wavedrom", stats=None, deduplicate=False, force=False,
+            page_budget=None, table_format="grid"):
+    """Generate Sphinx documentation for the SoC in `base_dir`
+
+    `soc` may be either a LiteX SoC or a :obj:`RegisterMap` that was
+    previously returned by :func:`build_register_map`, which allows the SoC
+    to be extracted once and shared with :func:`generate_svd`.
+
+    Possible extra extensions:
         [
             'm2r',
             'recommonmark',
             'sphinx_rtd_theme',
             'sphinx_autodoc_typehints',
         ]
+
+    Set `jobs` to render the register pages in that many worker processes
+    (or `None` for one per CPU).  The output is identical to a serial run.
+
+    `asset_mode` controls how the static JavaScript files are installed
+    into `_static`: `"copy"` (the default), or `"symlink"` or `"hardlink"`
+    for build trees that share a single lxsocdoc installation.  Files that
+    are already installed are left alone.
+
+    `diagrams` selects how register diagrams are drawn.  `"wavedrom"`
+    emits `.. wavedrom::` blocks for `sphinxcontrib.wavedrom` to render,
+    while `"svg"` renders them to static SVG files under `bitfield/` as
+    part of this call, which is much faster for large SoCs.
+
+    If `stats` is a :obj:`BuildStats`, the time (and optionally memory)
+    spent in each phase of the build is recorded in it.
+
+    Given a SoC rather than a :obj:`RegisterMap`, with `jobs` of 1 and
+    without `deduplicate`, each region is extracted, rendered and written
+    before the next one is looked at, so memory use is bounded by the
+    largest region rather than the whole SoC.
+
+    If `deduplicate` is set, regions that are identical apart from their
+    name, base address and interrupt share a single page, which lists the
+    base address of every instance.
+
+    A fingerprint of the register map and these options is stored in
+    `.lxsocdoc-fingerprint`.  If it matches, nothing is written and the
+    returned report has `skipped` set, unless `force` is set.  Comparing
+    needs every region up front, so regions are only extracted one at a
+    time when there is no old fingerprint.
+
+    If `page_budget` is set, regions are laid out to about that many
+    registers per page by :func:`plan_pages`: larger regions are split
+    across sub-pages listed in a toctree on the region's page, and runs of
+    small regions share a page.  Registers keep their section labels, so
+    references to them are unaffected.
+
+    `table_format` selects how tables are written: `"grid"` (the default)
+    for grid tables, or `"list"` for `.. list-table::` directives.  List
+    tables don't pad every cell to the width of its column, so the sources
+    are about half the size, but docutils parses each cell separately and
+    so takes longer to read them.  Both render to the same content.
+
+    `base_dir` may be a directory, the path of a `.zip`, `.tar`,
+    `.tar.gz`, `.tgz`, `.tar.xz` or `.tar.bz2` archive to stream every file
+    into, or an :obj:`OutputSink` such as a :obj:`MemoryOutput`.  A sink
+    that is passed in is left open.  Archives get no fingerprint, so they
+    are always regenerated.
+
+    Returns an :obj:`OutputReport` listing which files were rewritten and
+    which were left untouched because their contents did not change.
     """
+    from .docs import (sphinx_conf, index_rst, render_regions, write_page, install_assets, pages_manifest,
+        docs_fingerprint, DocsFingerprintStore, PAGES_FILE)
+    from .fingerprint import fingerprint_regions, regenerate
+    from .layout import plan_pages
 
-    # Ensure the target directory is a full path
-    if base_dir[-1] != '/':
-        base_dir = base_dir + '/'
+    if stats is None:
+        stats = NULL_STATS
 
-    # Ensure the output directory exists
-    import pathlib
-    pathlib.Path(base_dir + "/_static").mkdir(parents=True, exist_ok=True)
+    # Render every file into memory first and only replace the files on
+    # disk whose contents actually changed.  This keeps mtimes stable so
+    # that an incremental sphinx-build only re-reads modified pages.
+    output = open_output(base_dir)
+    if isinstance(output, OutputDirectory):
+        # Ensure the output directory exists
+        import pathlib
+        pathlib.Path(output.path("_static")).mkdir(parents=True, exist_ok=True)
 
     # Create various Sphinx plumbing
-    with open(base_dir + "conf.py", "w", encoding="utf-8") as conf:
-        import datetime
-        year = datetime.datetime.now().year
-        sphinx_ext_str = ""
-        for ext in sphinx_extensions:
-            sphinx_ext_str += "\n    \"{}\",".format(ext)
-        print(sphinx_configuration.format(project_name, year, author, author, sphinx_ext_str), file=conf)
-    if not quiet:
-        print("Generate the documentation by running `sphinx-build -M html {} {}_build`".format(base_dir, base_dir))
-
-    # Gather all interrupts so we can easily map IRQ numbers to CSR sections
-    interrupts = {}
-    for csr, irq in sorted(soc.soc_interrupt_map.items()):
-        interrupts[csr] = irq
-
-    # Convert each CSR region into a DocumentedCSRRegion.
-    # This process will also expand each CSR into a DocumentedCSR,
-    # which means that CompoundCSRs (such as CSRStorage and CSRStatus)
-    # that are larger than the buswidth will be turned into multiple
-    # DocumentedCSRs.
-    documented_regions = []
-    seen_modules = set()
-    regions = []
-    # Previously, litex contained a function to gather csr regions.
-    if hasattr(soc, "get_csr_regions"):
-        regions = soc.get_csr_regions()
+    import datetime
+    year = datetime.datetime.now().year
+    conf = sphinx_conf(project_name, author, year, sphinx_extensions, diagrams)
+    if not quiet and isinstance(output, OutputDirectory):
+        docs_dir = os.path.join(output.base_dir, "")
+        print("Generate the documentation by running `sphinx-build -M html {} {}_build`".format(docs_dir, docs_dir))
+
+    # Given a SoC, extract, render and write one region at a time, so that
+    # only a single region's registers are in memory at once.  This needs
+    # every region up front to share pages, or to hand them to a pool, or
+    # to compare against an old fingerprint before writing anything.
+    store = DocsFingerprintStore(output)
+    streaming = not isinstance(soc, RegisterMap) and not deduplicate and jobs == 1 and page_budget is None
+    if streaming and not force and store.read() is not None:
+        streaming = False
+    if streaming:
+        interrupts = get_interrupts(soc)
+        csr_regions = get_csr_regions(soc)
+        module_index = index_modules(soc, csr_regions, stats)
+        additional_modules = document_modules(soc, module_index, interrupts, stats)
+        region_names = [csr_region[0] for csr_region in csr_regions]
+        page_names = region_names
+        page_regions = iter_documented_regions(soc, stats, csr_regions, module_index, interrupts)
+        pages = OrderedDict((name, name) for name in region_names)
     else:
-        # Now we just access the regions directly.
-        for region_name, region in soc.csr_regions.items():
-            regions.append((region_name, region.origin, region.busword, region.obj))
-    for csr_region in regions:
-        module = None
-        if hasattr(soc, csr_region[0]):
-            module = getattr(soc, csr_region[0])
-            seen_modules.add(module)
-        submodules = gather_submodules(module)
-
-        documented_region = DocumentedCSRRegion(csr_region, module, submodules, csr_data_width=soc.csr_data_width)
-        if documented_region.name in interrupts:
-            documented_region.document_interrupt(soc, submodules, interrupts[documented_region.name])
-        documented_regions.append(documented_region)
-
-    # Document any modules that are not CSRs:
-    additional_modules = [
-        DocumentedInterrupts(interrupts),
-    ]
-    for (mod_name, mod) in soc._submodules:
-        if mod not in seen_modules:
-            try:
-                additional_modules.append(DocumentedModule(mod_name, mod))
-            except ModuleNotDocumented:
-                pass
-
-    with open(base_dir + "index.rst", "w", encoding="utf-8") as index:
-        print("""
-Documentation for {}
-{}
-
-.. toctree::
-    :hidden:
-""".format(project_name, "="*len("Documentation for " + project_name)), file=index)
+        register_map = as_register_map(soc, stats)
+        documented_regions = register_map.regions
+        additional_modules = register_map.modules
+
+        # Map of region name to the page that documents it, and the regions
+        # that get a page of their own.
+        pages = OrderedDict((region.name, region.name) for region in documented_regions)
+        page_regions = list(documented_regions)
+        if deduplicate:
+            page_regions = []
+            for group in group_identical_regions(documented_regions):
+                canonical = group[0]
+                if len(group) > 1:
+                    canonical = canonical.replace(instances=[(r.name, r.origin, register_map.interrupts.get(r.name)) for r in group])
+                    for region in group:
+                        pages[region.name] = canonical.name
+                page_regions.append(canonical)
+        subpages = []
+        if page_budget is not None:
+            (page_regions, subpages, page_of) = plan_pages(page_regions, page_budget)
+            for (name, page) in pages.items():
+                pages[name] = page_of[page]
+        if deduplicate or page_budget is not None:
+            additional_modules = [m.with_pages(pages) if hasattr(m, "with_pages") else m for m in additional_modules]
+        region_names = [region.name for region in documented_regions]
+        page_names = [region.name for region in page_regions]
+        # Sub-pages are listed in the toctree of their region's page instead.
+        page_regions = page_regions + subpages
+
+    # Nothing is written if the output was already generated from the same
+    # register map with the same options.
+    fingerprint = docs_fingerprint(project_name, author, year, sphinx_extensions, note_pulses, asset_mode,
+        diagrams, deduplicate, page_budget, table_format)
+    if streaming:
+        fingerprint.add_interrupts(interrupts, soc.csr_data_width)
         for module in additional_modules:
-            print("    {}".format(module.name), file=index)
-        for region in documented_regions:
-            print("    {}".format(region.name), file=index)
-
-        if len(additional_modules) > 0:
-            print("""
-Modules
-=======
-""", file=index)
-            for module in additional_modules:
-                print("* :doc:`{} <{}>`".format(module.name.upper(), module.name), file=index)
-
-        if len(documented_regions) > 0:
-            print("""
-Register Groups
-===============
-""", file=index)
-            for region in documented_regions:
-                print("* :doc:`{} <{}>`".format(region.name.upper(), region.name), file=index)
-
-        print("""
-Indices and tables
-==================
-
-* :ref:`genindex`
-* :ref:`modindex`
-* :ref:`search`
-""", file=index)
-
-    # Create a Region file for each of the documented CSR regions.
-    for region in documented_regions:
-        with open(base_dir + region.name + ".rst", "w", encoding="utf-8") as outfile:
-            region.print_region(outfile, base_dir, note_pulses)
-
-    # Create a Region file for each additional non-CSR module
-    for region in additional_modules:
-        with open(base_dir + region.name + ".rst", "w", encoding="utf-8") as outfile:
-            region.print_region(outfile, base_dir, note_pulses)
-
-    import os
-    with open(os.path.dirname(__file__) + "/../static/WaveDrom.js", "r") as wd_in:
-        with open(base_dir + "/_static/WaveDrom.js", "w") as wd_out:
-            wd_out.write(wd_in.read())
-
-    with open(os.path.dirname(__file__) + "/../static/default.js", "r") as wd_in:
-        with open(base_dir + "/_static/default.js", "w") as wd_out:
-            wd_out.write(wd_in.read())
+            fingerprint.add_module(module)
+        page_regions = fingerprint_regions(page_regions, fingerprint)
+    else:
+        fingerprint.add_register_map(register_map)
+
+    def write_docs():
+        output.write("conf.py", conf)
+        index = index_rst(project_name, additional_modules, page_names, region_names, pages)
+        digests = {"index": write_page(output, "index", (index, {}))}
+        files = set()
+
+        # Create a Region file for each of the documented CSR regions,
+        # followed by one for each additional non-CSR module.
+        regions = page_regions
+        if streaming:
+            for region in regions:
+                rendered = render_regions([region], note_pulses, 1, diagrams, stats, table_format)[0]
+                with stats.phase("write_output", region.name):
+                    digests[region.name] = write_page(output, region.name, rendered, files)
+                del region, rendered
+            regions = []
+        all_regions = list(regions) + list(additional_modules)
+        rendered = render_regions(all_regions, note_pulses, jobs, diagrams, stats, table_format)
+        with stats.phase("write_output"):
+            for (region, page) in zip(all_regions, rendered):
+                digests[region.name] = write_page(output, region.name, page, files)
+            install_assets(output, asset_mode)
+        output.write(PAGES_FILE, pages_manifest(digests, files))
+
+    if not regenerate(store, fingerprint, write_docs, force):
+        output.report.skipped = True
+    if output is not base_dir:
+        output.close()
+    return output.report
+
+def build_docs(soc, base_dir, build_dir=None, builder="html", jobs=1, quiet=True, **kwargs):
+    """Generate the documentation for `soc` and build it with Sphinx,
+    without starting another process
+
+    The sources are generated into `base_dir` by :func:`generate_docs`, to
+    which `jobs` and any other keyword arguments are passed on.  Sphinx
+    then builds them into `build_dir/builder` (by default `_build` inside
+    `base_dir`, where `sphinx-build -M` would put it), reading and writing
+    with `jobs` processes.
+
+    Sphinx's pickled environment is kept in `build_dir/doctrees` and reused
+    by the next call, and the extension in :mod:`lxsocdoc.sphinxext` tells
+    it which pages lxsocdoc changed, so only those pages are read again.
+
+    `base_dir` must be a directory.  Returns `(report, status)`, where
+    `report` is the :obj:`OutputReport` of :func:`generate_docs` and
+    `status` is Sphinx's exit status.
+    """
+    from sphinx.application import Sphinx
+    from sphinx.util.docutils import docutils_namespace, patch_docutils
+    import sys
+
+    if build_dir is None:
+        build_dir = os.path.join(base_dir, "_build")
+    report = generate_docs(soc, base_dir, quiet=True, jobs=jobs, **kwargs)
+
+    with patch_docutils(base_dir), docutils_namespace():
+        app = Sphinx(base_dir, base_dir, os.path.join(build_dir, builder), os.path.join(build_dir, "doctrees"), builder,
+            status=None if quiet else sys.stdout, warning=sys.stderr, parallel=jobs or os.cpu_count() or 1)
+        if "lxsocdoc.sphinxext" not in app.extensions:
+            app.setup_extension("lxsocdoc.sphinxext")
+        app.build()
+    return (report, app.statuscode)
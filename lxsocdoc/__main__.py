@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import sys
+
+from . import generate_docs, build_docs, generate_svd, emit, CHeaderBackend, JSONBackend
+from .loader import load_register_map
+
+def build(args):
+    register_map = load_register_map(args.csr_map, args.sidecar)
+    if args.docs is None and args.svd is None and args.c_header is None and args.json is None:
+        print("Nothing to do: pass --docs, --svd, --c-header and/or --json", file=sys.stderr)
+        return 1
+    status = 0
+    if args.docs is not None:
+        options = dict(project_name=args.project_name, author=args.author, note_pulses=args.note_pulses, jobs=args.jobs,
+            diagrams=args.diagrams, deduplicate=args.deduplicate, force=args.force, page_budget=args.page_budget,
+            table_format=args.table_format)
+        if args.sphinx is not None:
+            (_, status) = build_docs(register_map, args.docs, builder=args.sphinx, quiet=args.quiet, **options)
+        else:
+            generate_docs(register_map, args.docs, quiet=args.quiet, **options)
+    if args.svd is not None:
+        os.makedirs(args.svd, exist_ok=True)
+        generate_svd(register_map, args.svd, vendor=args.vendor, name=args.name, deduplicate=args.deduplicate, arrays=args.svd_arrays,
+            compression=args.svd_compression, compresslevel=args.svd_compresslevel, force=args.force)
+    backends = []
+    if args.c_header is not None:
+        backends.append(CHeaderBackend(args.c_header, name=args.name))
+    if args.json is not None:
+        backends.append(JSONBackend(args.json))
+    if len(backends) > 0:
+        emit(register_map, backends)
+    return status
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="lxsocdoc", description="Document a LiteX SoC")
+    subparsers = parser.add_subparsers(dest="command")
+
+    build_parser = subparsers.add_parser("build",
+        help="Generate documentation from a LiteX csr.json or csr.csv file, without elaborating the SoC")
+    build_parser.add_argument("--from", dest="csr_map", required=True, metavar="CSR_MAP",
+        help="csr.json or csr.csv file exported by LiteX")
+    build_parser.add_argument("--sidecar", help="JSON file with extra descriptions, fields and module documentation")
+    build_parser.add_argument("--docs", metavar="DIR", help="Write Sphinx sources to this directory, or to a .zip, .tar, .tar.gz, .tar.xz or .tar.bz2 archive")
+    build_parser.add_argument("--sphinx", metavar="BUILDER", nargs="?", const="html",
+        help="Also build the documentation with Sphinx, in-process, into _build/BUILDER inside the --docs directory")
+    build_parser.add_argument("--svd", metavar="DIR", help="Write an SVD file to this directory, creating it if needed")
+    build_parser.add_argument("--c-header", metavar="FILE",
+        help="Write a C header with register addresses and field masks to this file")
+    build_parser.add_argument("--json", metavar="FILE", help="Write a JSON description of the registers to this file")
+    build_parser.add_argument("--name", default="soc", help="SoC name, used for the SVD file")
+    build_parser.add_argument("--vendor", default="litex", help="Vendor name for the SVD file")
+    build_parser.add_argument("--project-name", default="LiteX SoC Project", help="Sphinx project name")
+    build_parser.add_argument("--author", default="Anonymous", help="Sphinx project author")
+    build_parser.add_argument("--note-pulses", action="store_true", help="Note which fields are pulses")
+    build_parser.add_argument("--jobs", type=int, default=1, help="Number of processes used to render pages, and to build them with --sphinx")
+    build_parser.add_argument("--diagrams", choices=["wavedrom", "svg"], default="wavedrom",
+        help="How to draw register diagrams")
+    build_parser.add_argument("--deduplicate", action="store_true",
+        help="Share one page and SVD description between identical peripherals")
+    build_parser.add_argument("--table-format", choices=["grid", "list"], default="grid",
+        help="Write tables as grid tables or as list-table directives")
+    build_parser.add_argument("--page-budget", type=int, metavar="REGISTERS",
+        help="Split regions with more registers than this across several pages, and put small regions on shared pages")
+    build_parser.add_argument("--svd-arrays", action="store_true",
+        help="Describe repeated registers as SVD register arrays")
+    build_parser.add_argument("--svd-compression", choices=["gzip", "xz", "bz2"],
+        help="Compress the SVD file as it is written")
+    build_parser.add_argument("--svd-compresslevel", type=int, help="Compression level for the SVD file")
+    build_parser.add_argument("--force", action="store_true",
+        help="Regenerate the output even if the register map hasn't changed")
+    build_parser.add_argument("--quiet", action="store_true", help="Don't print the sphinx-build command")
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        if args.sphinx is not None and args.docs is None:
+            build_parser.error("--sphinx needs --docs")
+        return build(args)
+    parser.print_help()
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import functools
+import hashlib
+import html
+import json
+
+# Fill hues used by WaveDrom's bitfield renderer for each field `type`
+_TYPE_HUES = {
+    2: 0,
+    3: 80,
+    4: 170,
+    5: 45,
+    6: 126,
+    7: 215,
+}
+
+def bitfield_key(entries, bits, hspace=400):
+    """Return the content hash that identifies a bitfield diagram
+
+    `entries` is the list of WaveDrom `reg` entries, as returned by
+    :func:`DocumentedCSRRegion.bitfield`.
+    """
+    desc = json.dumps({"reg": entries, "bits": bits, "hspace": hspace}, sort_keys=True)
+    return hashlib.sha1(desc.encode("utf-8")).hexdigest()
+
+def render_bitfield(entries, bits, hspace=400, fontsize=14, fontfamily="sans-serif"):
+    """Render a WaveDrom-style register bitfield diagram as SVG
+
+    Arguments
+    ---------
+
+    entries (:obj:`list` of :obj:`dict`): WaveDrom `reg` entries, starting
+    from bit 0.  Each has a `bits` width, and may have a `name`, an `attr`
+    that is printed underneath the field, and a `type` that selects a fill
+    colour.  Entries without a `name` are drawn as reserved bits.
+
+    bits (int): Total width of the register.
+
+    hspace (int): Width of the diagram in pixels.
+
+    Returns
+    -------
+
+    A string containing a standalone SVG document.
+    """
+    return _render_bitfield(json.dumps(entries, sort_keys=True), bits, hspace, fontsize, fontfamily)
+
+@functools.lru_cache(maxsize=4096)
+def _render_bitfield(entries_json, bits, hspace, fontsize, fontfamily):
+    entries = json.loads(entries_json)
+    step = hspace / bits
+    label_height = fontsize * 1.2
+    box_top = label_height + fontsize * 0.3
+    box_height = fontsize * 2.5
+    box_bottom = box_top + box_height
+    tick = box_height / 8
+    has_attr = any("attr" in e for e in entries)
+    height = box_bottom + (label_height + fontsize * 0.5 if has_attr else fontsize * 0.5)
+
+    def x(bit):
+        """Left edge of `bit`, with the MSB drawn on the left"""
+        return (bits - bit) * step
+
+    def fmt(v):
+        return "{:g}".format(round(v, 2))
+
+    shapes = []
+    text = []
+    lsb = 0
+    for entry in entries:
+        width = entry["bits"]
+        msb = lsb + width - 1
+        (left, right) = (x(msb + 1), x(lsb))
+        if "name" not in entry:
+            fill = ' fill="#000" fill-opacity="0.1"'
+        elif entry.get("type") in _TYPE_HUES:
+            fill = ' fill="hsl({},100%,50%)" fill-opacity="0.1"'.format(_TYPE_HUES[entry["type"]])
+        else:
+            fill = ' fill="none"'
+        shapes.append('<rect x="{}" y="{}" width="{}" height="{}"{}/>'.format(
+            fmt(left), fmt(box_top), fmt(right - left), fmt(box_height), fill))
+
+        # Tick marks between the bits of a multi-bit field
+        for bit in range(lsb + 1, msb + 1):
+            shapes.append('<path d="M{x},{y0}v{t}M{x},{y1}v-{t}"/>'.format(
+                x=fmt(x(bit)), y0=fmt(box_top), y1=fmt(box_bottom), t=fmt(tick)))
+
+        # Bit numbers above the field
+        text.append('<text x="{}" y="{}">{}</text>'.format(fmt(x(lsb) - step / 2), fmt(fontsize), lsb))
+        if msb != lsb:
+            text.append('<text x="{}" y="{}">{}</text>'.format(fmt(x(msb) - step / 2), fmt(fontsize), msb))
+
+        middle = (left + right) / 2
+        if "name" in entry:
+            text.append('<text x="{}" y="{}">{}</text>'.format(
+                fmt(middle), fmt(box_top + box_height / 2 + fontsize * 0.35), html.escape(entry["name"], quote=False)))
+        if "attr" in entry:
+            text.append('<text x="{}" y="{}">{}</text>'.format(
+                fmt(middle), fmt(box_bottom + label_height), html.escape(str(entry["attr"]), quote=False)))
+        lsb += width
+
+    return "".join([
+        '<svg xmlns="http://www.w3.org/2000/svg" width="{w}" height="{h}" viewBox="-1 -1 {w} {h}">\n'.format(
+            w=fmt(hspace + 2), h=fmt(height + 2)),
+        '<g stroke="#000" stroke-width="1">\n',
+        "\n".join(shapes),
+        '\n</g>\n',
+        '<g font-family="{}" font-size="{}" text-anchor="middle">\n'.format(html.escape(fontfamily), fontsize),
+        "\n".join(text),
+        '\n</g>\n',
+        '</svg>\n',
+    ])
@@ -1,67 +1,186 @@
-from migen import *
-from migen.util.misc import xdir
-from migen.fhdl.specials import Memory
-
-from litex.soc.integration.doc import ModuleDoc
-from litex.soc.interconnect.csr_bus import SRAM
-from litex.soc.interconnect.csr import _CompoundCSR, CSRStatus, CSRStorage, CSRField, _CSRBase
-from litex.soc.interconnect.csr_eventmanager import _EventSource, SharedIRQ, EventManager, EventSourceLevel, EventSourceProcess, EventSourcePulse
+# migen and LiteX are only imported by the methods that take a SoC apart,
+# so that the rest of lxsocdoc can be imported without them.
 
+import copy
+import hashlib
 import textwrap
+import weakref
+import zlib
+
+from .bitfield import bitfield_key, render_bitfield
+from .module import DocumentedSection
+from .output import write_output
+from .rst import dedent, layout_table, print_table, reflow
+
+# Event sources of each EventManager, in declaration order.  Finding them
+# means walking every attribute of the manager, so it's only done once.
+_event_sources_cache = weakref.WeakKeyDictionary()
+
+def event_sources(manager):
+    """Return the `_EventSource`s of `manager`, sorted by `duid`"""
+    try:
+        return _event_sources_cache[manager]
+    except KeyError:
+        pass
+    from migen.util.misc import xdir
+    from litex.soc.interconnect.csr_eventmanager import _EventSource
+
+    sources = sorted((y for x, y in xdir(manager, True) if isinstance(y, _EventSource)), key=lambda x: x.duid)
+    _event_sources_cache[manager] = sources
+    return sources
+
+class _FrozenRecord:
+    """Base of the slotted records, whose attributes can't be assigned
+    once they are built.  Use :func:`replace` to get a modified copy."""
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError("{} is immutable; use replace()".format(type(self).__name__))
+
+    def __delattr__(self, name):
+        raise AttributeError("{} is immutable".format(type(self).__name__))
+
+    def _set(self, **values):
+        for (attr, value) in values.items():
+            object.__setattr__(self, attr, value)
+
+    def replace(self, **changes):
+        """Return a copy with the attributes in `changes` set"""
+        new = object.__new__(type(self))
+        for attr in self.__slots__:
+            object.__setattr__(new, attr, changes[attr] if attr in changes else getattr(self, attr))
+        return new
+
+    # Pickling and copying would otherwise restore the slots with setattr()
+    def __getstate__(self):
+        return tuple(getattr(self, attr) for attr in self.__slots__)
+
+    def __setstate__(self, state):
+        for (attr, value) in zip(self.__slots__, state):
+            object.__setattr__(self, attr, value)
+
+class DocumentedCSRField(_FrozenRecord):
+    """One field of a :obj:`DocumentedCSR`
+
+    Fields are immutable slotted records, since a large SoC has hundreds of
+    thousands of them.  Fields that aren't changed by splitting a CSR are
+    shared between its sub-registers, so use :func:`replace` to get a
+    modified copy.
+    """
+    __slots__ = ("name", "size", "offset", "reset_value", "description", "access", "pulse", "values", "start")
 
-from .rst import print_table, reflow
-
-class DocumentedCSRField:
     def __init__(self, field):
-        self.name        = field.name
-        self.size        = field.size
-        self.offset      = field.offset
-        self.reset_value = field.reset.value
-        self.description = field.description
-        self.access      = field.access
-        self.pulse       = field.pulse
-        self.values      = field.values
-
-        # If this is part of a sub-CSR, this value will be different
-        self.start       = None
-
-class DocumentedCSR:
+        self._set(
+            name        = field.name,
+            size        = field.size,
+            offset      = field.offset,
+            reset_value = field.reset.value,
+            description = field.description,
+            access      = field.access,
+            pulse       = field.pulse,
+            values      = field.values,
+            # If this is part of a sub-CSR, this value will be different
+            start       = None,
+        )
+
+    def key(self):
+        """Return a hashable key that is equal for equal fields"""
+        return (self.name, self.size, self.offset, self.reset_value, self.description,
+            str(self.access), self.pulse, repr(self.values), self.start)
+
+def documented_fields(fields):
+    """Return `fields` as :obj:`DocumentedCSRField`s with reflowed
+    descriptions.  The originals are never modified, so that this doesn't
+    change the SoC being documented."""
+    trimmed = []
+    for f in fields:
+        if not isinstance(f, DocumentedCSRField):
+            f = DocumentedCSRField(f)
+        if f.description is not None:
+            description = reflow(f.description)
+            if description != f.description:
+                f = f.replace(description=description)
+        trimmed.append(f)
+    return trimmed
+
+class DocumentedCSR(_FrozenRecord):
+    """One register of a :obj:`DocumentedCSRRegion`
+
+    Registers are immutable, like their fields; use :func:`replace` to get
+    a modified copy.
+    """
+    __slots__ = ("name", "short_name", "short_numbered_name", "address", "offset", "size",
+                 "description", "reset_value", "access", "fields")
+
     def trim(self, docstring):
         if docstring is not None:
             return reflow(docstring)
         return None
 
-    def __init__(self, name, address, short_numbered_name="", short_name="", reset=0, offset=0, size=8, description=None, access="read-write", fields=[]):
-        self.name = name
-        self.short_name = short_name
-        self.short_numbered_name = short_numbered_name
-        self.address = address
-        self.offset = offset
-        self.size = size
+    def __init__(self, name, address, short_numbered_name="", short_name="", reset=0, offset=0, size=8, description=None, access="read-write", fields=None, trim_fields=True):
         if size == 0:
             print("!!! Warning: creating CSR of size 0 {}".format(name))
-        self.description = self.trim(description)
-        self.reset_value = reset
-        self.fields = fields
-        self.access = access
-        for f in self.fields:
-            f.description = self.trim(f.description)
+        if fields is None:
+            fields = ()
+        if trim_fields:
+            fields = documented_fields(fields)
+        self._set(
+            name = name,
+            short_name = short_name,
+            short_numbered_name = short_numbered_name,
+            address = address,
+            offset = offset,
+            size = size,
+            description = self.trim(description),
+            reset_value = reset,
+            access = access,
+            fields = tuple(fields),
+        )
 
 class DocumentedCSRRegion:
+    """The registers and documentation of one CSR region
+
+    A region is filled in as it is built, then :func:`freeze` turns its
+    lists into tuples and stops any attribute from being assigned, as it is
+    for every region in a :obj:`RegisterMap`.  Use :func:`replace` to get a
+    modified copy of a frozen region.
+    """
+    _frozen = False
+
     def __init__(self, csr_region, module=None, submodules=[], csr_data_width=8):
         (self.name, self.origin, self.busword, self.raw_csrs) = csr_region
         self.current_address = self.origin
         self.sections = []
         self.csrs = []
+        # The registers as the SoC declares them, if document_interrupt()
+        # has since filled in event fields; see svd_csrs.
+        self._svd_csrs = None
         self.csr_data_width = csr_data_width
+        self._csr_index = None
+        # Field records by key() while the region is built, so that equal
+        # fields of different registers are a single object
+        self._fields = {}
+        # `(name, origin, irq)` of every region documented by this one's page
+        self.instances = []
 
         # If the section has extra documentation, gather it.
-        if isinstance(module, ModuleDoc):
-            self.sections.append(module)
-        if module is not None and hasattr(module, "get_module_documentation"):
-            docs = module.get_module_documentation()
-            for doc in docs:
-                self.sections.append(doc)
+        if module is not None:
+            from litex.soc.integration.doc import ModuleDoc
+            if isinstance(module, ModuleDoc):
+                self.sections.append(module)
+            if hasattr(module, "get_module_documentation"):
+                docs = module.get_module_documentation()
+                for doc in docs:
+                    self.sections.append(doc)
+
+        # A region with nothing in it (as created by the csr.json loader)
+        # doesn't need to look at migen or LiteX at all.
+        if isinstance(self.raw_csrs, list) and len(self.raw_csrs) == 0:
+            return
+
+        from migen.fhdl.specials import Memory
+        from litex.soc.interconnect.csr_bus import SRAM
+        from litex.soc.interconnect.csr import _CSRBase
 
         if isinstance(self.raw_csrs, SRAM):
             print("{}@{:x}: Found SRAM: {}".format(self.name, self.origin, self.raw_csrs))
@@ -82,6 +201,81 @@ class DocumentedCSRRegion:
         else:
             print("{}@{:x}: Unexpected item on the CSR bus: {}".format(self.name, self.origin, self.raw_csrs))
 
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError("{} is frozen; use replace()".format(self.name))
+        object.__setattr__(self, name, value)
+
+    def freeze(self):
+        """Make this region immutable, and return it"""
+        if not self._frozen:
+            self._fields = None
+            self.csrs = tuple(self.csrs)
+            self.sections = tuple(self.sections)
+            self.instances = tuple(self.instances)
+            if self._svd_csrs is not None:
+                self._svd_csrs = tuple(self._svd_csrs)
+            self._frozen = True
+        return self
+
+    def replace(self, **changes):
+        """Return a frozen copy of this region with the attributes in
+        `changes` set"""
+        new = copy.copy(self)
+        new.__dict__.update((name, tuple(value) if isinstance(value, list) else value)
+            for (name, value) in changes.items())
+        new.__dict__["_csr_index"] = None
+        return new.freeze()
+
+    def snapshot(self):
+        """Return a picklable copy of this region.
+
+        The copy drops the raw migen CSR objects and replaces each section
+        with a :obj:`DocumentedSection`, so it may be rendered in another
+        process.  Its output from :func:`print_region` is unchanged.
+        """
+        return self.replace(raw_csrs=None, sections=tuple(DocumentedSection.from_section(s) for s in self.sections))
+
+    @property
+    def svd_csrs(self):
+        """The registers to describe in an SVD file
+
+        These are the registers as the SoC declares them, before
+        :func:`document_interrupt` adds a field per event to the status,
+        pending and enable registers of an `EventManager`.  Tools such as
+        svd2rust generate an API from the SVD, so the SVD keeps the fields
+        it has always had while the documentation gets the richer ones.
+        """
+        if self._svd_csrs is None:
+            return self.csrs
+        return self._svd_csrs
+
+    def layout_key(self):
+        """Return a digest of everything in this region except its name,
+        base address and interrupt
+
+        Regions with the same key are instances of the same peripheral, and
+        can share a documentation page and SVD description.  Mentions of
+        this region's register names in descriptions are ignored, since
+        they differ between instances.
+        """
+        prefix = self.name.upper() + "_"
+        def describe(text):
+            if isinstance(text, str):
+                return text.replace(prefix, "\0_")
+            return text
+
+        key = [self.busword, [(s.title(), s.body(), s.format(), s.path()) for s in self.sections]]
+        for csr in self.csrs:
+            if not csr.name.startswith(prefix):
+                # Memories and the like are named after the region itself
+                return None
+            key.append((csr.name[len(prefix):], csr.short_name, csr.short_numbered_name, csr.address - self.origin,
+                csr.offset, csr.size, describe(csr.description), csr.reset_value, csr.access,
+                [(f.name, f.size, f.offset, f.reset_value, describe(f.description), f.access, f.pulse, f.values, f.start)
+                    for f in csr.fields]))
+        return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+
     def bit_range(self, start, end, empty_if_zero=False):
         end -= 1
         if start == end:
@@ -91,70 +285,92 @@ class DocumentedCSRRegion:
         else:
             return "[{}:{}]".format(end, start)
 
+    def csrs_named(self, short_name):
+        """Return the :obj:`DocumentedCSR`s whose `short_name` matches
+        `short_name`, ignoring case.
+
+        A CSR that was split across several bus words has one entry per
+        word.  The name index is built on first use, and rebuilt if
+        `self.csrs` has grown since.  The index is only a cache, so it is
+        kept even once the region is frozen."""
+        if self._csr_index is None or self._csr_index[0] != len(self.csrs):
+            index = {}
+            for dcsr in self.csrs:
+                index.setdefault(dcsr.short_name.upper(), []).append(dcsr)
+            self.__dict__["_csr_index"] = (len(self.csrs), index)
+        return self._csr_index[1].get(short_name.upper(), [])
+
     def document_interrupt(self, soc, submodules, irq):
+        from litex.soc.interconnect.csr import CSRField
+        from litex.soc.interconnect.csr_eventmanager import EventSourceLevel, EventSourceProcess, EventSourcePulse
+
+        def source_description(src):
+            if hasattr(src, "name") and src.name is not None:
+                base_text = "`1` if a `{}` event occurred. ".format(src.name)
+            else:
+                base_text = "`1` if a this particular event occurred. "
+            if hasattr(src, "description") and src.description is not None:
+                return src.description
+            elif isinstance(src, EventSourceLevel):
+                return base_text + "This Event is **level triggered** when the signal is **high**."
+            elif isinstance(src, EventSourcePulse):
+                return base_text + "This Event is triggered on a **rising** edge."
+            elif isinstance(src, EventSourceProcess):
+                return base_text + "This Event is triggered on a **falling** edge."
+            else:
+                return base_text + "This Event uses an unknown method of triggering."
+
+        def status_field(i, source):
+            if hasattr(source, "name") and source.name is not None:
+                return CSRField(source.name, offset=i, description="Level of the `{}` event".format(source.name))
+            return CSRField("event{}".format(i), offset=i, description="Level of the `event{}` event".format(i))
+
+        def pending_field(i, source):
+            if hasattr(source, "name") and source.name is not None:
+                return CSRField(source.name, offset=i, description=source_description(source))
+            return CSRField("event{}".format(i), offset=i, description=source_description(source))
+
+        def enable_field(i, source):
+            if hasattr(source, "name") and source.name is not None:
+                return CSRField(source.name, offset=i, description="Write a `1` to enable the `{}` Event".format(source.name))
+            return CSRField("event{}".format(i), offset=i, description="Write a `1` to enable the `{}` Event".format(i))
+
+        # Patched registers are replaced by copies, keyed by the id() of the
+        # register they replace, so that svd_csrs keeps the originals.
+        replaced = {}
         managers = submodules["event_managers"]
         for m in managers:
-            sources_u = [y for x, y in xdir(m, True) if isinstance(y, _EventSource)]
-            sources = sorted(sources_u, key=lambda x: x.duid)
-
-            def source_description(src):
-                if hasattr(src, "name") and src.name is not None:
-                    base_text = "`1` if a `{}` event occurred. ".format(src.name)
-                else:
-                    base_text = "`1` if a this particular event occurred. "
-                if hasattr(src, "description") and src.description is not None:
-                    return src.description
-                elif isinstance(src, EventSourceLevel):
-                    return base_text + "This Event is **level triggered** when the signal is **high**."
-                elif isinstance(src, EventSourcePulse):
-                    return base_text + "This Event is triggered on a **rising** edge."
-                elif isinstance(src, EventSourceProcess):
-                    return base_text + "This Event is triggered on a **falling** edge."
-                else:
-                    return base_text + "This Event uses an unknown method of triggering."
+            sources = event_sources(m)
 
             # Patch the DocumentedCSR to add our own Description, if one doesn't exist.
-            for dcsr in self.csrs:
-                short_name = dcsr.short_name.upper()
-                if short_name == m.status.name.upper():
-                    if dcsr.fields is None or len(dcsr.fields) == 0:
-                        fields = []
-                        for i, source in enumerate(sources):
-                            if hasattr(source, "name") and source.name is not None:
-                                fields.append(DocumentedCSRField(CSRField(source.name, offset=i, description="Level of the `{}` event".format(source.name))))
-                            else:
-                                fields.append(DocumentedCSRField(CSRField("event{}".format(i), offset=i, description="Level of the `event{}` event".format(i))))
-                        dcsr.fields = fields
-                    if dcsr.description is None:
-                        dcsr.description = "This register contains the current raw level of the Event trigger.  Writes to this register have no effect."
-                elif short_name == m.pending.name.upper():
-                    if dcsr.fields is None or len(dcsr.fields) == 0:
-                        fields = []
-                        for i, source in enumerate(sources):
-                            if hasattr(source, "name") and source.name is not None:
-                                fields.append(DocumentedCSRField(CSRField(source.name, offset=i, description=source_description(source))))
-                            else:
-                                fields.append(DocumentedCSRField(CSRField("event{}".format(i), offset=i, description=source_description(source))))
-                        dcsr.fields = fields
-                    if dcsr.description is None:
-                        dcsr.description = "When an Event occurs, the corresponding bit will be set in this register.  To clear the Event, set the corresponding bit in this register."
-                elif short_name == m.enable.name.upper():
-                    if dcsr.fields is None or len(dcsr.fields) == 0:
-                        fields = []
-                        for i, source in enumerate(sources):
-                            if hasattr(source, "name") and source.name is not None:
-                                fields.append(DocumentedCSRField(CSRField(source.name, offset=i, description="Write a `1` to enable the `{}` Event".format(source.name))))
-                            else:
-                                fields.append(DocumentedCSRField(CSRField("event{}".format(i), offset=i, description="Write a `1` to enable the `{}` Event".format(i))))
-                        dcsr.fields = fields
-                    if dcsr.description is None:
-                        dcsr.description = "This register enables the corresponding Events.  Write a `0` to this register to disable individual events."
+            patches = [
+                (m.status, status_field, "This register contains the current raw level of the Event trigger.  Writes to this register have no effect."),
+                (m.pending, pending_field, "When an Event occurs, the corresponding bit will be set in this register.  To clear the Event, set the corresponding bit in this register."),
+                (m.enable, enable_field, "This register enables the corresponding Events.  Write a `0` to this register to disable individual events."),
+            ]
+            for (csr, make_field, description) in patches:
+                for dcsr in self.csrs_named(csr.name):
+                    current = replaced.get(id(dcsr), dcsr)
+                    changes = {}
+                    if current.fields is None or len(current.fields) == 0:
+                        changes["fields"] = tuple(DocumentedCSRField(make_field(i, source)) for i, source in enumerate(sources))
+                    if current.description is None:
+                        changes["description"] = description
+                    if len(changes) > 0:
+                        replaced[id(dcsr)] = current.replace(**changes)
+        if len(replaced) > 0:
+            if self._svd_csrs is None:
+                self._svd_csrs = list(self.csrs)
+            self.csrs = [replaced.get(id(dcsr), dcsr) for dcsr in self.csrs]
 
     def sub_csr_bit_range(self, csr, offset):
-        nwords = (csr.size + self.busword - 1)//self.busword
+        return self._sub_bit_range(csr.name, csr.size, offset)
+
+    def _sub_bit_range(self, csr_name, csr_size, offset):
+        nwords = (csr_size + self.busword - 1)//self.busword
         i = nwords - offset - 1
-        nbits = min(csr.size - i*self.busword, self.busword) - 1
-        name = (csr.name + str(i) if nwords > 1 else csr.name).upper()
+        nbits = min(csr_size - i*self.busword, self.busword) - 1
+        name = (csr_name + str(i) if nwords > 1 else csr_name).upper()
         origin = i*self.busword
         return (origin, nbits, name)
 
@@ -173,64 +389,112 @@ class DocumentedCSRRegion:
                 continue
             if field.offset + field.size < start:
                 continue
-            new_field = DocumentedCSRField(field)
-
-            new_field.offset -= start
-            if new_field.offset < 0:
-                underflow_amount = -new_field.offset
-                new_field.offset = 0
-                new_field.size  -= underflow_amount
-                new_field.start  = underflow_amount
+            if not isinstance(field, DocumentedCSRField):
+                field = DocumentedCSRField(field)
+
+            (offset, size, field_start) = (field.offset - start, field.size, field.start)
+            if offset < 0:
+                underflow_amount = -offset
+                offset = 0
+                size  -= underflow_amount
+                field_start = underflow_amount
             # If it extends past the range, clamp the size to the range
-            if new_field.offset + new_field.size > (end - start):
-                new_field.size = (end - start) - new_field.offset + 1
-                if new_field.start is None:
-                    new_field.start = 0
-            split_f.append(new_field)
+            if offset + size > (end - start):
+                size = (end - start) - offset + 1
+                if field_start is None:
+                    field_start = 0
+            if (offset, size, field_start) != (field.offset, field.size, field.start):
+                field = field.replace(offset=offset, size=size, start=field_start)
+            split_f.append(self.share_field(field))
         return split_f
 
-    def print_reg(self, reg, stream):
-        print("", file=stream)
-        print("    .. wavedrom::", file=stream)
-        print("        :caption: {}".format(reg.name), file=stream)
-        print("", file=stream)
-        print("        {", file=stream)
-        print("            \"reg\": [", file=stream)
+    def share_field(self, field):
+        """Return the field record equal to `field` that an earlier register
+        of this region uses, or `field` itself if there isn't one"""
+        if self._fields is None:
+            return field
+        return self._fields.setdefault(field.key(), field)
+
+    def bitfield(self, reg):
+        """Return the WaveDrom `reg` entries describing the layout of `reg`.
+
+        Each entry is a :obj:`dict` with a `bits` width and, for named fields,
+        a `name` and optionally an `attr` (reset value) and `type`.  Entries
+        are listed starting from bit 0.
+        """
+        entries = []
         if len(reg.fields) > 0:
             bit_offset = 0
             for field in reg.fields:
                 field_name = field.name
-                attr_str = ""
-                if field.reset_value != 0:
-                    attr_str = "\"attr\": '" + str(field.reset_value) + "', "
-                type_str = ""
-                if field.pulse:
-                    type_str = "\"type\": 4, "
                 if hasattr(field, "start") and field.start is not None:
                     field_name = "{}{}".format(field.name, self.bit_range(field.start, field.size + field.start, empty_if_zero=True))
-                term=","
                 if bit_offset != field.offset:
-                    print("                {\"bits\": " + str(field.offset - bit_offset) + "},", file=stream)
-                if field.offset + field.size == self.busword:
-                    term=""
-                print("                {\"name\": \"" + field_name + "\",  " + type_str + attr_str + "\"bits\": " + str(field.size) + "}" + term, file=stream)
+                    entries.append({"bits": field.offset - bit_offset})
+                entry = {"name": field_name}
+                if field.pulse:
+                    entry["type"] = 4
+                if field.reset_value != 0:
+                    entry["attr"] = str(field.reset_value)
+                entry["bits"] = field.size
+                entries.append(entry)
                 bit_offset = field.offset + field.size
             if bit_offset != self.busword:
-                print("                {\"bits\": " + str(self.busword - bit_offset) + "}", file=stream)
+                entries.append({"bits": self.busword - bit_offset})
         else:
-            term=""
-            if reg.size != self.csr_data_width:
-                term=","
-            attr_str = ""
+            entry = {"name": reg.short_name.lower() + self.bit_range(reg.offset, reg.offset + reg.size, empty_if_zero=True)}
             if reg.reset_value != 0:
-                attr_str = "\"attr\": 'reset: " + str(reg.reset_value) + "', "
-            print("                {\"name\": \"" + reg.short_name.lower() + self.bit_range(reg.offset, reg.offset + reg.size, empty_if_zero=True) + "\", " + attr_str + "\"bits\": " + str(reg.size) + "}" + term, file=stream)
+                entry["attr"] = "reset: " + str(reg.reset_value)
+            entry["bits"] = reg.size
+            entries.append(entry)
             if reg.size != self.csr_data_width:
-                print("                {\"bits\": " + str(self.csr_data_width - reg.size) + "},", file=stream)
+                entries.append({"bits": self.csr_data_width - reg.size})
+        return entries
+
+    def print_reg(self, reg, stream):
+        lines = []
+        # Fields have always been followed by two spaces, whole registers by one.
+        name_sep = ",  " if len(reg.fields) > 0 else ", "
+        for entry in self.bitfield(reg):
+            line = "                {"
+            if "name" in entry:
+                line += "\"name\": \"" + entry["name"] + "\"" + name_sep
+            if "type" in entry:
+                line += "\"type\": " + str(entry["type"]) + ", "
+            if "attr" in entry:
+                line += "\"attr\": '" + entry["attr"] + "', "
+            lines.append(line + "\"bits\": " + str(entry["bits"]) + "}")
+        # The padding after a register without fields has always been
+        # followed by a comma.
+        if len(reg.fields) == 0 and len(lines) > 1:
+            lines[-1] += ","
+        print("", file=stream)
+        print("    .. wavedrom::", file=stream)
+        print("        :caption: {}".format(reg.name), file=stream)
+        print("", file=stream)
+        print("        {", file=stream)
+        print("            \"reg\": [", file=stream)
+        print(",\n".join(lines), file=stream)
         print("            ], \"config\": {\"hspace\": 400, \"bits\": " + str(self.busword) + ", \"lanes\": 1 }, \"options\": {\"hspace\": 400, \"bits\": " + str(self.busword) + ", \"lanes\": 1}", file=stream)
         print("        }", file=stream)
         print("", file=stream)
 
+    def print_reg_svg(self, reg, stream, base_dir):
+        """Like :func:`print_reg`, but render the diagram to an SVG file in
+        `base_dir` rather than leaving it to `sphinxcontrib.wavedrom`.
+
+        Diagrams are named after a hash of their contents, so identical
+        registers share one file."""
+        entries = self.bitfield(reg)
+        filename = "bitfield/{}.svg".format(bitfield_key(entries, self.busword))
+        write_output(base_dir, filename, render_bitfield(entries, self.busword))
+        print("", file=stream)
+        print("    .. figure:: {}".format(filename), file=stream)
+        print("        :alt: {}".format(reg.name), file=stream)
+        print("", file=stream)
+        print("        {}".format(reg.name), file=stream)
+        print("", file=stream)
+
     def get_csr_reset(self, csr):
         reset = 0
         if hasattr(csr, "fields"):
@@ -262,10 +526,11 @@ class DocumentedCSRRegion:
     def document_csr(self, csr):
         """Generates one or more DocumentedCSR, which will get appended
         to self.csrs"""
+        from litex.soc.interconnect.csr import _CompoundCSR, CSRStatus
+
         fields = []
         description = None
         atomic_write = False
-        full_name = self.name.upper() + "_" + csr.name.upper()
         reset = 0
         if isinstance(csr, CSRStatus):
             access = "read-only"
@@ -281,15 +546,37 @@ class DocumentedCSRRegion:
         size = self.get_csr_size(csr)
         reset = self.get_csr_reset(csr)
 
+        nwords = 1
+        if isinstance(csr, _CompoundCSR) and len(csr.simple_csrs) > 1:
+            nwords = len(csr.simple_csrs)
+        self.add_csr(csr.name, size, reset=reset, description=description, fields=fields,
+            access=access, nwords=nwords, atomic_write=atomic_write)
+
+    def add_csr(self, csr_name, size, reset=0, description=None, fields=None, access="read-write", nwords=1, atomic_write=False):
+        """Append the DocumentedCSR(s) for a CSR called `csr_name`, which is
+        `size` bits wide and occupies `nwords` bus words starting at
+        `self.current_address`.
+
+        This is the second half of :func:`document_csr`, and may be used to
+        fill in a region from something other than a LiteX CSR."""
+        full_name = self.name.upper() + "_" + csr_name.upper()
+
+        # Convert and reflow the fields once, rather than once for each
+        # sub-CSR.  Sub-CSRs share any field that splitting doesn't change,
+        # and registers with the same fields share their records.
+        if fields is None:
+            fields = []
+        fields = [self.share_field(f) for f in documented_fields(fields)]
+
         # If the CSR is composed of multiple sub-CSRs, document each
         # one individually.
-        if isinstance(csr, _CompoundCSR) and len(csr.simple_csrs) > 1:
-            for i in range(len(csr.simple_csrs)):
-                (start, length, name) = self.sub_csr_bit_range(csr, i)
+        if nwords > 1:
+            for i in range(nwords):
+                (start, length, name) = self._sub_bit_range(csr_name, size, i)
                 sub_name = self.name.upper() + "_" + name
                 bits_str = "Bits {}-{} of `{}`.".format(start, start+length, full_name)
                 if atomic_write:
-                    if i == (range(len(csr.simple_csrs))-1):
+                    if i == nwords - 1:
                         bits_str += "Writing this register triggers an update of " + full_name
                     else:
                         bits_str += "The value won't take effect until `" + full_name + "0` is written."
@@ -300,28 +587,26 @@ class DocumentedCSRRegion:
                     else:
                         d = bits_str + " " + reflow(d)
                     self.csrs.append(DocumentedCSR(
-                        sub_name, self.current_address, short_numbered_name=name.upper(), short_name=csr.name.upper(), reset=(reset>>start)&((2**length)-1),
+                        sub_name, self.current_address, short_numbered_name=name.upper(), short_name=csr_name.upper(), reset=(reset>>start)&((2**length)-1),
                         offset=start, size=self.csr_data_width,
-                        description=d, fields=self.split_fields(fields, start, start + length), access=access
+                        description=d, fields=self.split_fields(fields, start, start + length), access=access, trim_fields=False
                     ))
                 else:
                     self.csrs.append(DocumentedCSR(
-                        sub_name, self.current_address, short_numbered_name=name.upper(), short_name=csr.name.upper(), reset=(reset>>start)&((2**length)-1),
+                        sub_name, self.current_address, short_numbered_name=name.upper(), short_name=csr_name.upper(), reset=(reset>>start)&((2**length)-1),
                         offset=start, size=self.csr_data_width,
-                        description=bits_str, fields=self.split_fields(fields, start, start + length), access=access
+                        description=bits_str, fields=self.split_fields(fields, start, start + length), access=access, trim_fields=False
                     ))
                 self.current_address += 4
         else:
             self.csrs.append(DocumentedCSR(
-                full_name, self.current_address, short_numbered_name=csr.name.upper(), short_name=csr.name.upper(), reset=reset, size=size,
-                description=description, fields=fields, access=access
+                full_name, self.current_address, short_numbered_name=csr_name.upper(), short_name=csr_name.upper(), reset=reset, size=size,
+                description=description, fields=fields, access=access, trim_fields=False
             ))
             self.current_address += 4
 
-    def make_value_table(self, values):
-        ret = ""
-        max_value_width=len("Value")
-        max_description_width=len("Description")
+    def make_value_table(self, values, table_format="grid"):
+        table = [["Value", "Description"]]
         for v in values:
             (value, name, description) = (None, None, None)
             if len(v) == 2:
@@ -334,47 +619,40 @@ class DocumentedCSRRegion:
             # Ensure the value is a string
             if not isinstance(value, str):
                 value = "{}".format(value)
+            table.append([value, description])
+        return "\n" + layout_table(table, table_format)
+
+    def print_instances(self, stream, table_format="grid"):
+        """Print the table of regions that share this page"""
+        print("This page documents {} identical instances.  Register names and addresses".format(len(self.instances)), file=stream)
+        print("below are given for {}; add the difference in base address for the others.".format(self.name.upper()), file=stream)
+        has_irq = any(irq is not None for (name, origin, irq) in self.instances)
+        table = [["Instance", "Base Address"] + (["Interrupt"] if has_irq else [])]
+        for (name, origin, irq) in self.instances:
+            row = [name.upper(), "0x{:08x}".format(origin)]
+            if has_irq:
+                row.append("" if irq is None else str(irq))
+            table.append(row)
+        print_table(table, stream, table_format)
+
+    def print_region(self, stream, base_dir, note_pulses, diagrams="wavedrom", table_format="grid"):
+        self.print_overview(stream, base_dir, table_format)
+        if len(self.csrs) > 0:
+            self.print_csrs(stream, base_dir, note_pulses, diagrams, self.csrs, table_format)
 
-            max_value_width = max(max_value_width, len(value))
-            for d in description.splitlines():
-                max_description_width = max(max_description_width, len(d))
-        ret += "\n"
-        ret += "+-" + "-"*max_value_width + "-+-" + "-"*max_description_width + "-+\n"
-        ret += "| " + "Value".ljust(max_value_width) + " | " + "Description".ljust(max_description_width) + " |\n"
-        ret += "+=" + "="*max_value_width + "=+=" +  "="*max_description_width + "=+\n"
-        for v in values:
-            (value, name, description) = (None, None, None)
-            if len(v) == 2:
-                (value, description) = v
-            elif len(v) == 3:
-                (value, name, description) = v
-            else:
-                raise ValueError("Unexpected length of CSRField's value tuple")
-
-            # Ensure the value is a string
-            if not isinstance(value, str):
-                value = "{}".format(value)
-
-            value = value.ljust(max_value_width)
-            first_line = True
-            for d in description.splitlines():
-                if first_line:
-                    ret += "| {} | {} |\n".format(value, d.ljust(max_description_width))
-                    first_line = False
-                else:
-                    ret += "| {} | {} |\n".format(" ".ljust(max_value_width), d.ljust(max_description_width))
-            ret += "+-" + "-"*max_value_width + "-+-" + "-"*max_description_width + "-+\n"
-        return ret
-
-    def print_region(self, stream, base_dir, note_pulses):
+    def print_overview(self, stream, base_dir, table_format="grid"):
+        """Print the title, description and register listing of this region"""
         title = "{}".format(self.name.upper())
         print(title, file=stream)
         print("=" * len(title), file=stream)
         print("", file=stream)
 
+        if len(self.instances) > 1:
+            self.print_instances(stream, table_format)
+
         for section in self.sections:
-            title = textwrap.dedent(section.title())
-            body = textwrap.dedent(section.body())
+            title = dedent(section.title())
+            body = dedent(section.body())
             print("{}".format(title), file=stream)
             print("-" * len(title), file=stream)
 
@@ -385,9 +663,9 @@ class DocumentedCSRRegion:
                 if filename is not None:
                     print(".. mdinclude:: " + filename, file=stream)
                 else:
-                    temp_filename = self.name + '-' + str(hash(title)) + "." + section.format()
-                    with open(base_dir + "/" + temp_filename, "w") as cache:
-                        print(body, file=cache)
+                    # Use a stable hash, so the name is the same in every process and run
+                    temp_filename = self.name + '-' + str(zlib.crc32(title.encode("utf-8"))) + "." + section.format()
+                    write_output(base_dir, temp_filename, body + "\n")
                     print(".. mdinclude:: " + temp_filename, file=stream)
             print("", file=stream)
 
@@ -399,70 +677,38 @@ class DocumentedCSRRegion:
             csr_table = [["Register", "Address"]]
             for csr in self.csrs:
                 csr_table.append([":ref:`{} <{}>`".format(csr.name, csr.name), ":ref:`0x{:08x} <{}>`".format(csr.address, csr.name)])
-            print_table(csr_table, stream)
+            print_table(csr_table, stream, table_format)
 
-            for csr in self.csrs:
-                print("{}".format(csr.name), file=stream)
-                print("^" * len(csr.name), file=stream)
-                print("", file=stream)
-                print("`Address: 0x{:08x} + 0x{:x} = 0x{:08x}`".format(self.origin, csr.address - self.origin, csr.address), file=stream)
-                print("", file=stream)
-                if csr.description is not None:
-                    print(textwrap.indent(csr.description, prefix="    "), file=stream)
+    def print_csrs(self, stream, base_dir, note_pulses, diagrams, csrs, table_format="grid"):
+        """Print the detailed description of each register in `csrs`"""
+        for csr in csrs:
+            print("{}".format(csr.name), file=stream)
+            print("^" * len(csr.name), file=stream)
+            print("", file=stream)
+            print("`Address: 0x{:08x} + 0x{:x} = 0x{:08x}`".format(self.origin, csr.address - self.origin, csr.address), file=stream)
+            print("", file=stream)
+            if csr.description is not None:
+                print(textwrap.indent(csr.description, prefix="    "), file=stream)
+            if diagrams == "svg":
+                self.print_reg_svg(csr, stream, base_dir)
+            else:
                 self.print_reg(csr, stream)
-                if len(csr.fields) > 0:
-                    max_field_width=len("Field")
-                    max_name_width=len("Name")
-                    max_description_width=len("Description")
-                    value_tables = {}
-
-                    for f in csr.fields:
-                        field = self.bit_range(f.offset, f.offset + f.size)
-                        max_field_width = max(max_field_width, len(field))
-
-                        name = f.name
-                        if hasattr(f, "start") and f.start is not None:
-                            name = "{}{}".format(f.name, self.bit_range(f.start, f.size + f.start))
-                        max_name_width = max(max_name_width, len(name))
-
-                        description = f.description
-                        if description is None:
-                            description = ""
-                        if note_pulses and f.pulse:
-                            description = description + "\n\nWriting a 1 to this bit triggers the function."
-                        for d in description.splitlines():
-                            max_description_width = max(max_description_width, len(d))
-                        if f.values is not None:
-                            value_tables[f.name] = self.make_value_table(f.values)
-                            for d in value_tables[f.name].splitlines():
-                                max_description_width = max(max_description_width, len(d))
-                    print("", file=stream)
-                    print("+-" + "-"*max_field_width + "-+-" + "-"*max_name_width + "-+-" + "-"*max_description_width + "-+", file=stream)
-                    print("| " + "Field".ljust(max_field_width) + " | " + "Name".ljust(max_name_width) + " | " + "Description".ljust(max_description_width) + " |", file=stream)
-                    print("+=" + "="*max_field_width + "=+=" + "="*max_name_width + "=+=" + "="*max_description_width + "=+", file=stream)
-                    for f in csr.fields:
-                        field = self.bit_range(f.offset, f.offset + f.size).ljust(max_field_width)
-
-                        name = f.name.upper()
-                        if hasattr(f, "start") and f.start is not None:
-                            name = "{}{}".format(f.name.upper(), self.bit_range(f.start, f.size + f.start))
-                        name = name.ljust(max_name_width)
-
-                        description = f.description
-                        if description is None:
-                            description = ""
-                        if note_pulses and f.pulse:
-                            description = description + "\n\nWriting a 1 to this bit triggers the function."
-
-                        if f.name in value_tables:
-                            description += "\n" + value_tables[f.name]
-
-                        first_line = True
-                        for d in description.splitlines():
-                            if first_line:
-                                print("| {} | {} | {} |".format(field, name, d.ljust(max_description_width)), file=stream)
-                                first_line = False
-                            else:
-                                print("| {} | {} | {} |".format(" ".ljust(max_field_width), " ".ljust(max_name_width), d.ljust(max_description_width)), file=stream)
-                        print("+-" + "-"*max_field_width + "-+-" + "-"*max_name_width + "-+-" + "-"*max_description_width + "-+", file=stream)
-                print("", file=stream)
+            if len(csr.fields) > 0:
+                field_table = [["Field", "Name", "Description"]]
+                for f in csr.fields:
+                    field = self.bit_range(f.offset, f.offset + f.size)
+
+                    name = f.name.upper()
+                    if hasattr(f, "start") and f.start is not None:
+                        name = "{}{}".format(f.name.upper(), self.bit_range(f.start, f.size + f.start))
+
+                    description = f.description
+                    if description is None:
+                        description = ""
+                    if note_pulses and f.pulse:
+                        description = description + "\n\nWriting a 1 to this bit triggers the function."
+                    if f.values is not None:
+                        description += "\n" + self.make_value_table(f.values, table_format)
+                    field_table.append([field, name, description])
+                stream.write("\n" + layout_table(field_table, table_format))
+            print("", file=stream)
@@ -0,0 +1,227 @@
+"""Pieces of the Sphinx documentation shared by :func:`generate_docs` and
+the docs backend of :func:`emit`."""
+
+import hashlib
+import io
+import json
+import os
+
+from .fingerprint import Fingerprint, FingerprintStore
+from .output import MemoryOutput
+from .stats import NULL_STATS
+
+sphinx_configuration = """
+project = '{}'
+copyright = '{}, {}'
+author = '{}'
+extensions = [
+    'sphinx.ext.autosectionlabel',{}
+]
+templates_path = ['_templates']
+exclude_patterns = []
+offline_skin_js_path = "https://wavedrom.com/skins/default.js"
+offline_wavedrom_js_path = "https://wavedrom.com/WaveDrom.js"
+html_theme = 'alabaster'
+html_static_path = ['_static']
+"""
+
+STATIC_ASSETS = ("WaveDrom.js", "default.js")
+
+# Name of the file listing a digest of every generated page, which the
+# Sphinx extension in :mod:`lxsocdoc.sphinxext` uses to tell which pages
+# changed
+PAGES_FILE = ".lxsocdoc-pages"
+
+# Name of the file holding the fingerprint of the documentation
+FINGERPRINT_FILE = ".lxsocdoc-fingerprint"
+
+def sphinx_conf(project_name, author, year, sphinx_extensions=[], diagrams="wavedrom"):
+    """Return the contents of `conf.py`"""
+    conf = io.StringIO()
+    sphinx_ext_str = ""
+    # Pre-rendered SVG diagrams don't need the wavedrom extension at all
+    if diagrams == "wavedrom":
+        sphinx_ext_str += "\n    'sphinxcontrib.wavedrom',"
+    for ext in sphinx_extensions:
+        sphinx_ext_str += "\n    \"{}\",".format(ext)
+    print(sphinx_configuration.format(project_name, year, author, author, sphinx_ext_str), file=conf)
+    return conf.getvalue()
+
+def index_rst(project_name, modules, page_names, region_names, pages):
+    """Return the contents of `index.rst`
+
+    Arguments
+    ---------
+
+    project_name (str): Title of the documentation.
+
+    modules (:obj:`list` of :obj:`DocumentedModule`): Modules without CSRs.
+
+    page_names (:obj:`list` of str): Name of each register page.
+
+    region_names (:obj:`list` of str): Name of each CSR region.
+
+    pages (:obj:`dict`): Map of region name to the page that documents it.
+    """
+    index = io.StringIO()
+    print("""
+Documentation for {}
+{}
+
+.. toctree::
+    :hidden:
+""".format(project_name, "="*len("Documentation for " + project_name)), file=index)
+    for module in modules:
+        print("    {}".format(module.name), file=index)
+    for name in page_names:
+        print("    {}".format(name), file=index)
+
+    if len(modules) > 0:
+        print("""
+Modules
+=======
+""", file=index)
+        for module in modules:
+            print("* :doc:`{} <{}>`".format(module.name.upper(), module.name), file=index)
+
+    if len(region_names) > 0:
+        print("""
+Register Groups
+===============
+""", file=index)
+        for name in region_names:
+            print("* :doc:`{} <{}>`".format(name.upper(), pages[name]), file=index)
+
+    print("""
+Indices and tables
+==================
+
+* :ref:`genindex`
+* :ref:`modindex`
+* :ref:`search`
+""", file=index)
+    return index.getvalue()
+
+def _render_region(region, note_pulses, diagrams="wavedrom", table_format="grid"):
+    """Render a single region to a string, along with any extra files
+    (such as markdown includes) that it produced.
+
+    This is a module-level function so that it can be used as the target
+    of a process pool."""
+    stream = io.StringIO()
+    extra_files = MemoryOutput()
+    region.print_region(stream, extra_files, note_pulses, diagrams, table_format)
+    return (stream.getvalue(), extra_files.files)
+
+def render_regions(regions, note_pulses=False, jobs=1, diagrams="wavedrom", stats=None, table_format="grid"):
+    """Render each region in `regions`, returning a list of
+    `(rst, extra_files)` tuples in the same order.
+
+    If `jobs` is greater than 1, the regions are rendered by a pool of that
+    many worker processes.  Each region is first reduced to a picklable
+    snapshot, so no migen objects are sent to the workers.  A `jobs` of
+    `None` uses one worker per CPU.
+    """
+    if stats is None:
+        stats = NULL_STATS
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if jobs <= 1 or len(regions) <= 1:
+        rendered = []
+        for region in regions:
+            with stats.phase("print_region", region.name):
+                rendered.append(_render_region(region, note_pulses, diagrams, table_format))
+        return rendered
+
+    import concurrent.futures
+    import functools
+    # Work done in the worker processes can't be measured per region.
+    with stats.phase("print_region_parallel"):
+        snapshots = [region.snapshot() for region in regions]
+        chunksize = max(1, len(snapshots) // (jobs * 4))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+            return list(pool.map(functools.partial(_render_region, note_pulses=note_pulses, diagrams=diagrams, table_format=table_format), snapshots, chunksize=chunksize))
+
+def write_page(output, name, rendered, files=None):
+    """Write a page returned by :func:`render_regions` to `output`
+
+    Returns a digest of the page and the files it includes, for
+    :func:`pages_manifest`.  If `files` is a set, the names of the included
+    files are added to it.
+    """
+    (rst, extra_files) = rendered
+    digest = hashlib.sha256(rst.encode("utf-8"))
+    for (extra_name, content) in extra_files.items():
+        output.write(extra_name, content)
+        if files is not None:
+            files.add(extra_name)
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        digest.update(extra_name.encode("utf-8"))
+        digest.update(hashlib.sha256(content).digest())
+    output.write(name + ".rst", rst)
+    return digest.hexdigest()
+
+def pages_manifest(digests, files=()):
+    """Return the contents of :data:`PAGES_FILE`, given a map of document
+    name to the digest returned by :func:`write_page` and the names of the
+    files the pages include"""
+    return json.dumps({"pages": digests, "files": sorted(files)}, indent=1, sort_keys=True) + "\n"
+
+def pages_present(output):
+    """Return whether `output` still has `conf.py`, the static assets, and
+    every page and included file listed in its :data:`PAGES_FILE`"""
+    content = output.read(PAGES_FILE)
+    if content is None:
+        return False
+    try:
+        manifest = json.loads(content.decode("utf-8"))
+    except ValueError:
+        return False
+    names = ["conf.py"] + ["_static/" + asset for asset in STATIC_ASSETS]
+    names += [page + ".rst" for page in manifest.get("pages", {})]
+    names += manifest.get("files", [])
+    return all(output.exists(name) for name in names)
+
+def install_assets(output, asset_mode="copy"):
+    """Install the static JavaScript files into `_static`"""
+    static_dir = os.path.join(os.path.dirname(__file__), "..", "static")
+    for asset in STATIC_ASSETS:
+        output.install("_static/" + asset, os.path.join(static_dir, asset), asset_mode)
+
+def docs_fingerprint(project_name, author, year, sphinx_extensions=[], note_pulses=False, asset_mode="copy",
+            diagrams="wavedrom", deduplicate=False, page_budget=None, table_format="grid"):
+    """Return a :obj:`Fingerprint` of documentation generated with these
+    options, to which the register map is then added"""
+    return Fingerprint("docs", {
+        "project_name": project_name, "author": author, "year": year,
+        "sphinx_extensions": list(sphinx_extensions), "note_pulses": note_pulses,
+        "asset_mode": asset_mode, "diagrams": diagrams, "deduplicate": deduplicate,
+        "page_budget": page_budget, "table_format": table_format,
+    })
+
+class DocsFingerprintStore(FingerprintStore):
+    """The fingerprint of the documentation in the :obj:`OutputSink`
+    `output`, kept in :data:`FINGERPRINT_FILE`
+
+    Sinks that can't be read back, such as archives, get no fingerprint,
+    as it could never be checked.
+    """
+    def __init__(self, output):
+        self.output = output
+
+    def read(self):
+        content = self.output.read(FINGERPRINT_FILE)
+        if content is None:
+            return None
+        return content.decode("utf-8").strip()
+
+    def write(self, fingerprint):
+        if self.output.readable:
+            self.output.write(FINGERPRINT_FILE, fingerprint + "\n")
+
+    def remove(self):
+        self.output.remove(FINGERPRINT_FILE)
+
+    def present(self):
+        return pages_present(self.output)
@@ -0,0 +1,367 @@
+"""Drive several output backends from a single walk of the register map.
+
+:func:`emit` extracts each CSR region once and hands it to every backend
+in turn before moving on to the next one, so adding an output costs only
+the time taken to format it.  The backends write each region as soon as
+they receive it.
+"""
+
+from collections import namedtuple
+import io
+import json
+import re
+import types
+
+from .output import open_output
+from .regmap import RegisterMap, get_interrupts, get_csr_regions, index_modules, iter_documented_regions, document_modules
+from .stats import NULL_STATS
+
+class MapSummary(namedtuple("MapSummary", ["region_names", "modules", "interrupts", "csr_data_width"])):
+    """Everything about a register map that is known before its regions
+    are extracted, as passed to :func:`Backend.begin`
+
+    Attributes
+    ----------
+
+    region_names (:obj:`tuple` of str): Name of every CSR region, in order.
+
+    modules (:obj:`tuple` of :obj:`DocumentedModule`): Snapshots of the
+    documented modules that do not have CSRs, starting with the interrupt
+    table.
+
+    interrupts (:obj:`mapping`): Read-only map of region name to IRQ number.
+
+    csr_data_width (int): Width of the CSR bus data path.
+    """
+    __slots__ = ()
+
+def field_mask(field):
+    """Return the mask of `field` within its register"""
+    return ((1 << field.size) - 1) << field.offset
+
+def _identifier(name):
+    return re.sub(r"[^A-Za-z0-9_]", "_", name).upper()
+
+def _access(access):
+    # Fields carry a litex CSRAccess, registers a string.
+    if access is None or isinstance(access, str):
+        return access
+    return getattr(access, "name", str(access))
+
+class _TextTarget:
+    """A text file opened by a backend, or a stream the caller passed in"""
+    def __init__(self, target):
+        self.target = target
+        self.stream = None
+
+    def open(self):
+        if hasattr(self.target, "write"):
+            self.stream = self.target
+        else:
+            self.stream = open(self.target, "w", encoding="utf-8")
+        return self.stream
+
+    def close(self):
+        if self.stream is not self.target:
+            self.stream.close()
+        self.stream = None
+
+class Backend:
+    """An output written by :func:`emit`
+
+    :func:`begin` is called once before any region is extracted, then
+    :func:`region` once for each CSR region in order, and finally
+    :func:`end`.  A backend should write each region out when it receives
+    it rather than holding on to it.
+
+    Attributes
+    ----------
+
+    phase (str): Name under which the time spent in :func:`region` is
+    recorded in a :obj:`BuildStats`.
+    """
+    phase = "emit"
+
+    def begin(self, summary):
+        pass
+
+    def region(self, region, irq):
+        pass
+
+    def end(self):
+        pass
+
+class DocsBackend(Backend):
+    """Write Sphinx documentation, as :func:`generate_docs` does without
+    `deduplicate` or `jobs`
+
+    Arguments
+    ---------
+
+    base_dir (str): Output directory or archive, or an :obj:`OutputSink`,
+    as for :func:`generate_docs`.
+
+    The other arguments are those of :func:`generate_docs`.  The
+    fingerprint is written as :func:`generate_docs` would, so that it
+    knows whether the pages are up to date.
+
+    Attributes
+    ----------
+
+    output (:obj:`OutputSink`): Where the files are written.  Its
+    `report` lists which files changed.
+    """
+    phase = "print_region"
+
+    def __init__(self, base_dir, project_name="LiteX SoC Project", author="Anonymous", sphinx_extensions=[],
+                note_pulses=False, asset_mode="copy", diagrams="wavedrom", stats=None, table_format="grid"):
+        self.output = open_output(base_dir)
+        self._owned = self.output is not base_dir
+        self.project_name = project_name
+        self.author = author
+        self.sphinx_extensions = sphinx_extensions
+        self.note_pulses = note_pulses
+        self.asset_mode = asset_mode
+        self.diagrams = diagrams
+        self.table_format = table_format
+        self.stats = NULL_STATS if stats is None else stats
+        from .docs import DocsFingerprintStore
+        self.store = DocsFingerprintStore(self.output)
+
+    def begin(self, summary):
+        from .docs import sphinx_conf, index_rst, write_page, docs_fingerprint
+        import datetime
+        year = datetime.datetime.now().year
+        self.store.remove()
+        self.fingerprint = docs_fingerprint(self.project_name, self.author, year, self.sphinx_extensions,
+            self.note_pulses, self.asset_mode, self.diagrams, table_format=self.table_format)
+        self.fingerprint.add_interrupts(summary.interrupts, summary.csr_data_width)
+        for module in summary.modules:
+            self.fingerprint.add_module(module)
+        self.modules = summary.modules
+        pages = dict((name, name) for name in summary.region_names)
+        self.output.write("conf.py", sphinx_conf(self.project_name, self.author, year, self.sphinx_extensions, self.diagrams))
+        index = index_rst(self.project_name, summary.modules, summary.region_names, summary.region_names, pages)
+        self.digests = {"index": write_page(self.output, "index", (index, {}))}
+        self.files = set()
+
+    def region(self, region, irq):
+        from .docs import render_regions, write_page
+        self.fingerprint.add_region(region)
+        rendered = render_regions([region], self.note_pulses, 1, self.diagrams, table_format=self.table_format)[0]
+        self.digests[region.name] = write_page(self.output, region.name, rendered, self.files)
+
+    def end(self):
+        from .docs import render_regions, write_page, install_assets, pages_manifest, PAGES_FILE
+        rendered = render_regions(self.modules, self.note_pulses, 1, self.diagrams, self.stats, self.table_format)
+        with self.stats.phase("write_output"):
+            for (module, page) in zip(self.modules, rendered):
+                self.digests[module.name] = write_page(self.output, module.name, page, self.files)
+            install_assets(self.output, self.asset_mode)
+        self.output.write(PAGES_FILE, pages_manifest(self.digests, self.files))
+        self.store.write(self.fingerprint.hexdigest())
+        if self._owned:
+            self.output.close()
+
+class SVDBackend(Backend):
+    """Write a CMSIS-SVD file
+
+    Arguments
+    ---------
+
+    target (str): Path of the SVD file, or a text or binary file object.
+
+    The other arguments are those of :func:`generate_svd`.  Describing
+    peripherals with `derivedFrom` needs every region up front, so it is
+    only offered by :func:`generate_svd`.  Given a path, the fingerprint
+    beside the file is written as :func:`generate_svd` would.
+    """
+    phase = "svd"
+
+    def __init__(self, target, vendor="litex", name="soc", description=None, arrays=False, compression=None, compresslevel=None):
+        self.target = target
+        self.vendor = vendor
+        self.name = name
+        self.description = description
+        self.arrays = arrays
+        self.compression = compression
+        self.compresslevel = compresslevel
+        self._context = None
+        self.store = None
+        if isinstance(target, str):
+            from .fingerprint import FileFingerprintStore
+            self.store = FileFingerprintStore(target)
+
+    def begin(self, summary):
+        from .svd import SVDWriter, open_svd_output, svd_fingerprint
+        if self.store is not None:
+            self.store.remove()
+            self.fingerprint = svd_fingerprint(self.vendor, self.name, self.description, arrays=self.arrays,
+                compression=self.compression, compresslevel=self.compresslevel)
+            self.fingerprint.add_interrupts(summary.interrupts, summary.csr_data_width)
+        stream = self.target
+        if not isinstance(stream, io.TextIOBase):
+            self._context = open_svd_output(self.target, self.compression, self.compresslevel)
+            stream = self._context.__enter__()
+        self.writer = SVDWriter(stream, vendor=self.vendor, name=self.name, description=self.description, arrays=self.arrays)
+        self.writer.write_header()
+
+    def region(self, region, irq):
+        if self.store is not None:
+            self.fingerprint.add_region(region)
+        self.writer.write_peripheral(region, irq)
+
+    def end(self):
+        self.writer.write_footer()
+        if self._context is not None:
+            self._context.__exit__(None, None, None)
+            self._context = None
+        if self.store is not None:
+            self.store.write(self.fingerprint.hexdigest())
+
+class CHeaderBackend(Backend):
+    """Write a C header with the address of every register and the
+    offset, size and mask of every field
+
+    For a field `f` of register `r` in region `x`, `CSR_X_R_ADDR` is the
+    address of the register and `CSR_X_R_SIZE` its width in bits.  The
+    field is read as `(value & CSR_X_R_F_MASK) >> CSR_X_R_F_OFFSET`.
+
+    Arguments
+    ---------
+
+    target (str): Path of the header, or a text stream.
+
+    name (str): SoC name, used for the include guard.
+    """
+    phase = "c_header"
+
+    def __init__(self, target, name="soc"):
+        self._target = _TextTarget(target)
+        self.name = name
+
+    def begin(self, summary):
+        self.stream = self._target.open()
+        self.guard = "__GENERATED_{}_CSR_H".format(_identifier(self.name))
+        self.stream.write("/* Generated by lxsocdoc.  Do not edit. */\n#ifndef {0}\n#define {0}\n\n".format(self.guard))
+        self.stream.write("#define CSR_DATA_WIDTH {}\n".format(summary.csr_data_width))
+
+    def region(self, region, irq):
+        lines = ["", "/* {} */".format(region.name),
+            "#define CSR_{}_BASE 0x{:08x}L".format(_identifier(region.name), region.origin)]
+        if irq is not None:
+            lines.append("#define {}_INTERRUPT {}".format(_identifier(region.name), irq))
+        for csr in region.csrs:
+            reg = "CSR_" + _identifier(csr.name)
+            lines.append("#define {}_ADDR 0x{:08x}L".format(reg, csr.address))
+            lines.append("#define {}_SIZE {}".format(reg, csr.size))
+            lines.append("#define {}_RESET 0x{:x}".format(reg, csr.reset_value))
+            suffix = "U" if csr.size <= 32 else "ULL"
+            for field in csr.fields:
+                name = reg + "_" + _identifier(field.name)
+                lines.append("#define {}_OFFSET {}".format(name, field.offset))
+                lines.append("#define {}_SIZE {}".format(name, field.size))
+                lines.append("#define {}_MASK 0x{:x}{}".format(name, field_mask(field), suffix))
+        lines.append("")
+        self.stream.write("\n".join(lines))
+
+    def end(self):
+        self.stream.write("\n#endif /* {} */\n".format(self.guard))
+        self._target.close()
+
+class JSONBackend(Backend):
+    """Write a JSON description of every register and field
+
+    The file holds `csr_data_width`, `interrupts` and a list of `regions`.
+    Each field records its `offset` (the shift that brings it down to bit
+    0) and its `mask` within the register.  Regions are written one per
+    line, as they arrive.
+
+    Arguments
+    ---------
+
+    target (str): Path of the JSON file, or a text stream.
+    """
+    phase = "json"
+
+    def __init__(self, target):
+        self._target = _TextTarget(target)
+
+    def begin(self, summary):
+        self.stream = self._target.open()
+        self.stream.write('{{\n"csr_data_width": {},\n"interrupts": {},\n"regions": ['.format(
+            summary.csr_data_width, json.dumps(dict(summary.interrupts))))
+        self.separator = "\n"
+
+    def region(self, region, irq):
+        registers = []
+        for csr in region.csrs:
+            registers.append({
+                "name": csr.name,
+                "short_name": csr.short_numbered_name,
+                "address": csr.address,
+                "size": csr.size,
+                "reset": csr.reset_value,
+                "access": _access(csr.access),
+                "description": csr.description,
+                "fields": [{
+                    "name": field.name,
+                    "offset": field.offset,
+                    "size": field.size,
+                    "mask": field_mask(field),
+                    "reset": field.reset_value,
+                    "access": _access(field.access),
+                    "pulse": field.pulse,
+                    "description": field.description,
+                    "values": field.values,
+                } for field in csr.fields],
+            })
+        self.stream.write(self.separator)
+        self.stream.write(json.dumps({
+            "name": region.name,
+            "origin": region.origin,
+            "busword": region.busword,
+            "interrupt": irq,
+            "registers": registers,
+        }, default=str))
+        self.separator = ",\n"
+
+    def end(self):
+        self.stream.write("\n]\n}\n")
+        self._target.close()
+
+def emit(soc, backends, stats=None):
+    """Write every output in `backends` from one walk of `soc`
+
+    `soc` may be either a LiteX SoC or a :obj:`RegisterMap`.  Given a SoC,
+    each region is extracted, handed to every backend and dropped before
+    the next one is looked at, so memory use is bounded by the largest
+    region however many outputs there are.
+
+    If `stats` is a :obj:`BuildStats`, the time spent in each backend is
+    recorded in it per region, under the backend's `phase`.
+    """
+    if stats is None:
+        stats = NULL_STATS
+    if isinstance(soc, RegisterMap):
+        summary = MapSummary(tuple(region.name for region in soc.regions), soc.modules, soc.interrupts, soc.csr_data_width)
+        regions = soc.regions
+    else:
+        interrupts = get_interrupts(soc)
+        csr_regions = get_csr_regions(soc)
+        module_index = index_modules(soc, csr_regions, stats)
+        summary = MapSummary(tuple(csr_region[0] for csr_region in csr_regions),
+            tuple(module.snapshot() for module in document_modules(soc, module_index, interrupts, stats)),
+            types.MappingProxyType(interrupts), soc.csr_data_width)
+        regions = iter_documented_regions(soc, stats, csr_regions, module_index, interrupts)
+
+    for backend in backends:
+        backend.begin(summary)
+    for region in regions:
+        irq = summary.interrupts.get(region.name)
+        for backend in backends:
+            with stats.phase(backend.phase, region.name):
+                backend.region(region, irq)
+        del region
+    for backend in backends:
+        backend.end()
@@ -0,0 +1,183 @@
+"""Fingerprints of register maps, used to skip regenerating output that
+would come out the same.
+
+A fingerprint covers everything the generators read from a register map:
+every region with its registers, fields, reset values, access types and
+descriptions, the interrupts, the module documentation, and the options
+passed to the generator.  It is stored in a small text file beside the
+output.
+
+:func:`regenerate` holds the logic shared by the generators: skip the
+output if its fingerprint matches, and otherwise write it out and store
+the new fingerprint.
+"""
+
+import abc
+import hashlib
+import os
+
+# Bump this whenever a change to lxsocdoc changes the files it generates,
+# so that output from an older version is never mistaken for up to date.
+FINGERPRINT_VERSION = 4
+
+# Suffix of the file holding the fingerprint of a single output file
+FINGERPRINT_SUFFIX = ".fingerprint"
+
+def _sections(sections):
+    return [(s.title(), s.body(), s.format(), s.path()) for s in sections]
+
+class Fingerprint:
+    """Accumulate a stable SHA-256 over a register map
+
+    Regions may be added one at a time as they are extracted, so a
+    fingerprint can be taken without keeping the whole register map in
+    memory.
+
+    Arguments
+    ---------
+
+    kind (str): What is being generated, such as `"docs"` or `"svd"`.
+
+    options (:obj:`dict`): Generator options that affect the output.
+    """
+    def __init__(self, kind, options={}):
+        self._hash = hashlib.sha256()
+        self._update(("lxsocdoc", FINGERPRINT_VERSION, kind, sorted(options.items())))
+
+    def _update(self, item):
+        data = repr(item).encode("utf-8")
+        # Prefix each item with its length, so that items can't run together.
+        self._hash.update("{}:".format(len(data)).encode("ascii"))
+        self._hash.update(data)
+
+    def _add_csr(self, kind, csr):
+        self._update((kind, csr.name, csr.short_name, csr.short_numbered_name, csr.address, csr.offset,
+            csr.size, csr.description, csr.reset_value, csr.access,
+            [(f.name, f.size, f.offset, f.reset_value, f.description, f.access, f.pulse, f.values, f.start)
+                for f in csr.fields]))
+
+    def add_region(self, region):
+        self._update(("region", region.name, region.origin, region.busword, _sections(region.sections)))
+        for csr in region.csrs:
+            self._add_csr("csr", csr)
+        # The SVD describes registers as the SoC declares them, which may
+        # differ from the documented ones.
+        for (i, (csr, svd_csr)) in enumerate(zip(region.csrs, region.svd_csrs)):
+            if svd_csr is not csr:
+                self._update(("svd_csr", i))
+                self._add_csr("csr", svd_csr)
+
+    def add_module(self, module):
+        self._update(("module", module.name, _sections(module.sections), getattr(module, "irq_table", None)))
+
+    def add_interrupts(self, interrupts, csr_data_width):
+        self._update(("interrupts", list(interrupts.items()), csr_data_width))
+
+    def add_register_map(self, register_map, modules=True):
+        """Add everything in a :obj:`RegisterMap`, in the same order as a
+        generator that streams its regions would"""
+        self.add_interrupts(register_map.interrupts, register_map.csr_data_width)
+        if modules:
+            for module in register_map.modules:
+                self.add_module(module)
+        for region in register_map.regions:
+            self.add_region(region)
+
+    def copy(self):
+        fingerprint = Fingerprint.__new__(Fingerprint)
+        fingerprint._hash = self._hash.copy()
+        return fingerprint
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+def fingerprint_regions(regions, fingerprint):
+    """Pass through the regions of the iterable `regions`, adding each one
+    to `fingerprint` on the way"""
+    for region in regions:
+        fingerprint.add_region(region)
+        yield region
+
+def read_fingerprint(path):
+    """Return the fingerprint stored at `path`, or `None` if there isn't one"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def write_fingerprint(path, fingerprint):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(fingerprint + "\n")
+
+def remove_fingerprint(path):
+    """Remove a stored fingerprint before the output it describes is
+    changed, so that an interrupted build is never taken as up to date"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def fingerprint_matches(path, fingerprint, outputs=()):
+    """Return whether `path` holds `fingerprint` and every file in
+    `outputs` still exists"""
+    if read_fingerprint(path) != fingerprint:
+        return False
+    return all(os.path.exists(output) for output in outputs)
+
+class FingerprintStore(abc.ABC):
+    """Where :func:`regenerate` keeps the fingerprint of some output"""
+    @abc.abstractmethod
+    def read(self):
+        """Return the stored fingerprint, or `None` if there isn't one"""
+
+    @abc.abstractmethod
+    def write(self, fingerprint):
+        """Store the hex digest `fingerprint`"""
+
+    @abc.abstractmethod
+    def remove(self):
+        """Remove the stored fingerprint, if there is one"""
+
+    @abc.abstractmethod
+    def present(self):
+        """Return whether every file of the output still exists"""
+
+class FileFingerprintStore(FingerprintStore):
+    """The fingerprint of the single file at `path`, kept in a file with
+    `suffix` appended to its name"""
+    def __init__(self, path, suffix=FINGERPRINT_SUFFIX):
+        self.path = path
+        self.fingerprint_path = path + suffix
+
+    def read(self):
+        return read_fingerprint(self.fingerprint_path)
+
+    def write(self, fingerprint):
+        write_fingerprint(self.fingerprint_path, fingerprint)
+
+    def remove(self):
+        remove_fingerprint(self.fingerprint_path)
+
+    def present(self):
+        return os.path.exists(self.path)
+
+def regenerate(store, fingerprint, generate, force=False):
+    """Call `generate()` to write some output unless `store` shows it is up
+    to date
+
+    The output is up to date if the fingerprint in `store` is `fingerprint`
+    and every file is still present, so `fingerprint` must be complete
+    before this is called.  The stored fingerprint is removed before the
+    output is changed, so that an interrupted build is never taken as up to
+    date, and replaced once it is written.  Returns whether the output was
+    written.
+    """
+    previous = store.read()
+    if previous is not None:
+        if not force and previous == fingerprint.hexdigest() and store.present():
+            return False
+        store.remove()
+    generate()
+    store.write(fingerprint.hexdigest())
+    return True
@@ -0,0 +1,146 @@
+"""Plan how CSR regions are laid out onto documentation pages.
+
+Sphinx pays a fixed cost for every document and a cost that grows with the
+size of each one, so both a region with thousands of registers and
+hundreds of regions with one register each build slowly.  The planner
+splits large regions across several sub-pages and packs small neighbouring
+regions onto shared pages, working to a budget of registers per page.
+
+Every register keeps its section title, and so the label that
+`sphinx.ext.autosectionlabel` gives it, wherever it ends up, so `:ref:`
+links to registers don't change.  Links to a region's page go through the
+map of region name to page name that :func:`plan_pages` returns.
+"""
+
+import copy
+import math
+
+class RegionIndexPage:
+    """The page of a region whose registers are spread over sub-pages
+
+    It holds the region's description and register listing, followed by a
+    toctree of its :obj:`RegisterPage` sub-pages.
+    """
+    def __init__(self, region, subpages):
+        self.name = region.name
+        self.region = region
+        self.subpages = subpages
+
+    def snapshot(self):
+        snap = copy.copy(self)
+        snap.region = self.region.snapshot()
+        return snap
+
+    def print_region(self, stream, base_dir, note_pulses=False, diagrams="wavedrom", table_format="grid"):
+        self.region.print_overview(stream, base_dir, table_format)
+        print("", file=stream)
+        print(".. toctree::", file=stream)
+        print("    :maxdepth: 1", file=stream)
+        print("", file=stream)
+        for subpage in self.subpages:
+            print("    {}".format(subpage), file=stream)
+        print("", file=stream)
+
+class RegisterPage:
+    """A sub-page with the registers of `region` from `start` up to `stop`"""
+    def __init__(self, name, region, start, stop):
+        self.name = name
+        self.region = region
+        self.start = start
+        self.stop = stop
+
+    def snapshot(self):
+        snap = copy.copy(self)
+        snap.region = self.region.snapshot()
+        return snap
+
+    def print_region(self, stream, base_dir, note_pulses=False, diagrams="wavedrom", table_format="grid"):
+        csrs = self.region.csrs[self.start:self.stop]
+        title = "{} ({} to {})".format(self.region.name.upper(), csrs[0].name, csrs[-1].name)
+        print(title, file=stream)
+        print("=" * len(title), file=stream)
+        print("", file=stream)
+        self.region.print_csrs(stream, base_dir, note_pulses, diagrams, csrs, table_format)
+
+class GroupPage:
+    """A page shared by several small regions, one after the other"""
+    def __init__(self, name, regions):
+        self.name = name
+        self.regions = regions
+
+    def snapshot(self):
+        snap = copy.copy(self)
+        snap.regions = [region.snapshot() for region in self.regions]
+        return snap
+
+    def print_region(self, stream, base_dir, note_pulses=False, diagrams="wavedrom", table_format="grid"):
+        # An overlined title sits above the regions' own `=` titles.
+        title = "{} to {}".format(self.regions[0].name.upper(), self.regions[-1].name.upper())
+        print("=" * len(title), file=stream)
+        print(title, file=stream)
+        print("=" * len(title), file=stream)
+        print("", file=stream)
+        for region in self.regions:
+            region.print_region(stream, base_dir, note_pulses, diagrams, table_format)
+            print("", file=stream)
+
+def plan_pages(regions, budget):
+    """Lay `regions` out onto pages of about `budget` registers each
+
+    A region with more than `budget` registers gets a
+    :obj:`RegionIndexPage` and is split evenly across the fewest
+    :obj:`RegisterPage` sub-pages that keep within the budget.  Runs of
+    consecutive regions with fewer than a quarter of `budget` registers
+    each are packed onto :obj:`GroupPage` pages of up to `budget` registers.
+    Every other region keeps a page of its own.
+
+    Returns `(pages, subpages, page_of)`, where `pages` lists the pages
+    that belong in the top-level toctree, `subpages` lists the
+    :obj:`RegisterPage` sub-pages, and `page_of` maps each region name to
+    the name of the page that documents it.  Page names other than a
+    region's own contain a `-`, which can't clash with a region name.
+    """
+    if budget < 1:
+        raise ValueError("The page budget must be at least one register")
+    pages = []
+    subpages = []
+    page_of = {}
+    group = []
+    group_size = 0
+
+    def flush_group():
+        if len(group) == 1:
+            pages.append(group[0])
+            page_of[group[0].name] = group[0].name
+        elif len(group) > 1:
+            page = GroupPage(group[0].name + "-group", list(group))
+            pages.append(page)
+            for region in group:
+                page_of[region.name] = page.name
+        del group[:]
+
+    for region in regions:
+        size = len(region.csrs)
+        if size < budget // 4:
+            if group_size + size > budget:
+                flush_group()
+                group_size = 0
+            group.append(region)
+            group_size += size
+            continue
+        flush_group()
+        group_size = 0
+        page_of[region.name] = region.name
+        if size <= budget:
+            pages.append(region)
+            continue
+        parts = math.ceil(size / budget)
+        step = math.ceil(size / parts)
+        names = []
+        for (i, start) in enumerate(range(0, size, step)):
+            page = RegisterPage("{}-{}".format(region.name, i + 1), region, start, min(start + step, size))
+            subpages.append(page)
+            names.append(page.name)
+        pages.append(RegionIndexPage(region, names))
+    flush_group()
+    return (pages, subpages, page_of)
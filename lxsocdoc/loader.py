@@ -0,0 +1,201 @@
+"""Build a :obj:`RegisterMap` from the files LiteX exports, rather than from
+an elaborated SoC.
+
+LiteX writes the CSR map of every build to `csr.json` and/or `csr.csv`.
+These only contain register names, addresses, sizes and access types, so
+an optional JSON sidecar file may be given to fill in descriptions, fields
+and module documentation::
+
+    {
+        "regions": {
+            "uart": {
+                "sections": [
+                    {"title": "UART", "body": "A simple serial port."}
+                ],
+                "registers": {
+                    "rxtx": {
+                        "description": "Data to send or receive",
+                        "size": 8,
+                        "reset": 0,
+                        "fields": [
+                            {"name": "data", "offset": 0, "size": 8,
+                             "description": "One byte of data"}
+                        ]
+                    }
+                }
+            }
+        }
+    }
+
+Register names in the sidecar don't include the region prefix.  Fields
+accept the same keys as a LiteX `CSRField`: `name`, `offset`, `size`,
+`reset`, `description`, `access`, `pulse` and `values`.
+"""
+
+import csv
+import json
+import types
+from collections import OrderedDict
+
+from .csr import DocumentedCSRRegion
+from .module import DocumentedInterrupts, DocumentedSection
+from .regmap import RegisterMap
+
+_ACCESS_TYPES = {
+    "rw": "read-write",
+    "ro": "read-only",
+}
+
+class _FieldSpec:
+    """Stands in for a LiteX CSRField when creating a DocumentedCSRField"""
+    def __init__(self, name, offset, size=1, reset=0, description=None, access=None, pulse=False, values=None):
+        self.name        = name
+        self.offset      = offset
+        self.size        = size
+        self.reset       = types.SimpleNamespace(value=reset)
+        self.description = description
+        self.access      = access
+        self.pulse       = pulse
+        self.values      = values
+
+class CSRMap:
+    """The contents of a LiteX `csr.json` or `csr.csv` file
+
+    Attributes
+    ----------
+
+    bases (:obj:`dict`): Map of region name to base address.
+
+    registers (:obj:`dict`): Map of full register name to a
+    `(address, nwords, access)` tuple.
+
+    constants (:obj:`dict`): Map of constant name to value.
+    """
+    def __init__(self):
+        self.bases = OrderedDict()
+        self.registers = OrderedDict()
+        self.constants = OrderedDict()
+
+    @classmethod
+    def from_json(cls, stream):
+        data = json.load(stream)
+        csr_map = cls()
+        for (name, base) in data.get("csr_bases", {}).items():
+            csr_map.bases[name] = base
+        for (name, reg) in data.get("csr_registers", {}).items():
+            csr_map.registers[name] = (reg["addr"], reg["size"], _ACCESS_TYPES.get(reg.get("type"), "read-write"))
+        for (name, value) in data.get("constants", {}).items():
+            csr_map.constants[name] = value
+        return csr_map
+
+    @classmethod
+    def from_csv(cls, stream):
+        csr_map = cls()
+        for row in csv.reader(stream):
+            if len(row) == 0 or row[0].startswith("#"):
+                continue
+            if row[0] == "csr_base":
+                csr_map.bases[row[1]] = int(row[2], 0)
+            elif row[0] == "csr_register":
+                csr_map.registers[row[1]] = (int(row[2], 0), int(row[3], 0), _ACCESS_TYPES.get(row[4], "read-write"))
+            elif row[0] == "constant":
+                value = row[2]
+                try:
+                    value = int(value, 0)
+                except ValueError:
+                    pass
+                csr_map.constants[row[1]] = value
+        return csr_map
+
+    @property
+    def csr_data_width(self):
+        for name in ("config_csr_data_width", "csr_data_width"):
+            if name in self.constants:
+                return int(self.constants[name])
+        # This was the LiteX default for a long time.
+        return 8
+
+    @property
+    def interrupts(self):
+        """Map of region name to IRQ number, taken from the `*_interrupt`
+        constants"""
+        interrupts = OrderedDict()
+        for (name, value) in sorted(self.constants.items()):
+            if name.endswith("_interrupt") and name[:-len("_interrupt")] in self.bases:
+                interrupts[name[:-len("_interrupt")]] = int(value)
+        return interrupts
+
+def _region_registers(csr_map):
+    """Group the registers of `csr_map` by region, in address order"""
+    # Match longer region names first, so that a register called
+    # `uart_phy_tuning_word` goes to `uart_phy` rather than `uart`.
+    names = sorted(csr_map.bases.keys(), key=len, reverse=True)
+    grouped = OrderedDict((name, []) for name in csr_map.bases.keys())
+    for (full_name, (address, nwords, access)) in csr_map.registers.items():
+        for name in names:
+            if full_name.startswith(name + "_"):
+                grouped[name].append((address, full_name[len(name) + 1:], nwords, access))
+                break
+        else:
+            print("{}: register doesn't belong to any CSR region".format(full_name))
+    for registers in grouped.values():
+        registers.sort()
+    return grouped
+
+def load_register_map(path, sidecar=None):
+    """Build a :obj:`RegisterMap` from a LiteX `csr.json` or `csr.csv` file
+
+    Arguments
+    ---------
+
+    path (str): Path to the `csr.json` or `csr.csv` file.  Files ending in
+    `.csv` are read as CSV, and anything else as JSON.
+
+    sidecar (str): Optional path to a JSON file with descriptions, fields
+    and module documentation, in the format described above.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            csr_map = CSRMap.from_csv(f)
+        else:
+            csr_map = CSRMap.from_json(f)
+
+    extra = {}
+    if sidecar is not None:
+        with open(sidecar, "r", encoding="utf-8") as f:
+            extra = json.load(f).get("regions", {})
+
+    csr_data_width = csr_map.csr_data_width
+    interrupts = csr_map.interrupts
+    regions = []
+    for (name, registers) in _region_registers(csr_map).items():
+        region_extra = extra.get(name, {})
+        region = DocumentedCSRRegion((name, csr_map.bases[name], csr_data_width, []), csr_data_width=csr_data_width)
+        for section in region_extra.get("sections", []):
+            region.sections.append(DocumentedSection(section["title"], section["body"],
+                section.get("format", "rst"), section.get("path")))
+
+        register_extra = region_extra.get("registers", {})
+        for (address, reg_name, nwords, access) in registers:
+            reg = register_extra.get(reg_name, {})
+            fields = [_FieldSpec(**f) for f in reg.get("fields", [])]
+            size = reg.get("size")
+            if size is None:
+                size = nwords * csr_data_width
+            reset = reg.get("reset")
+            if reset is None:
+                reset = 0
+                for f in fields:
+                    reset |= f.reset.value << f.offset
+            region.current_address = address
+            region.add_csr(reg_name, size, reset=reset, description=reg.get("description"),
+                fields=fields, access=reg.get("access", access), nwords=nwords)
+        regions.append(region.freeze())
+
+    regions.sort(key=lambda r: r.origin)
+    return RegisterMap(
+        regions=tuple(regions),
+        modules=(DocumentedInterrupts(interrupts).snapshot(),),
+        interrupts=types.MappingProxyType(interrupts),
+        csr_data_width=csr_data_width,
+    )
@@ -1,118 +1,292 @@
-from migen.fhdl.module import DUID
-from migen.util.misc import xdir
-
-from litex.soc.interconnect.csr_eventmanager import EventManager
-from litex.soc.integration.doc import ModuleDoc
-
-import textwrap
-import inspect
-
-from .rst import print_table, print_rst
-
-def gather_submodules_inner(module, depth, seen_modules, submodules):
-    if module is None:
-        return submodules
-    if depth == 0:
-        if isinstance(module, ModuleDoc):
-            # print("{} is an instance of ModuleDoc".format(module))
-            submodules["module_doc"].append(module)
-    for k,v in module._submodules:
-        # print("{}Submodule {} {}".format(" "*(depth*4), k, v))
-        if v not in seen_modules:
-            seen_modules.add(v)
-            if isinstance(v, EventManager):
-                # print("{}{} appears to be an EventManager".format(" "*(depth*4), k))
-                submodules["event_managers"].append(v)
-
-            if isinstance(v, ModuleDoc):
-                submodules["module_doc"].append(v)
-
-            gather_submodules_inner(v, depth + 1, seen_modules, submodules)
-    return submodules
-
-def gather_submodules(module):
-    depth = 0
-    seen_modules = set()
-    submodules = {
-        "event_managers": [],
-        "module_doc": [],
-    }
-
-    return gather_submodules_inner(module, depth, seen_modules, submodules)
-
-class ModuleNotDocumented(Exception):
-    """Indicates a Module has no documentation or sub-documentation"""
-    pass
-
-class DocumentedModule:
-    """Multi-section Documentation of a Module"""
-
-    def __init__(self, name, module, has_documentation=False):
-        self.name = name
-        self.sections = []
-
-        if isinstance(module, ModuleDoc):
-            has_documentation = True
-            self.sections.append(module)
-
-        if hasattr(module, "get_module_documentation"):
-            for doc in module.get_module_documentation():
-                has_documentation = True
-                self.sections.append(doc)
-
-        if not has_documentation:
-            raise ModuleNotDocumented()
-
-    def print_region(self, stream, base_dir, note_pulses=False):
-        title = "{}".format(self.name.upper())
-        print(title, file=stream)
-        print("=" * len(title), file=stream)
-        print("", file=stream)
-
-        for section in self.sections:
-            title = textwrap.dedent(section.title())
-            body = textwrap.dedent(section.body())
-            print("{}".format(title), file=stream)
-            print("-" * len(title), file=stream)
-            print(textwrap.dedent(body), file=stream)
-            print("", file=stream)
-
-class DocumentedInterrupts(DocumentedModule):
-    """A :obj:`DocumentedModule` that automatically documents interrupts in an SoC
-
-    This creates a :obj:`DocumentedModule` object that prints out the contents
-    of the interrupt map of an SoC.
-    """
-    def __init__(self, interrupts):
-        DocumentedModule.__init__(self, "interrupts", None, has_documentation=True)
-
-        self.irq_table = [["Interrupt", "Module"]]
-        for module_name, irq_no in interrupts.items():
-            self.irq_table.append([str(irq_no), ":doc:`{} <{}>`".format(module_name.upper(), module_name)])
-
-    def print_region(self, stream, base_dir, note_pulses=False):
-        title = "Interrupt Controller"
-        print(title, file=stream)
-        print("=" * len(title), file=stream)
-        print("", file=stream)
-
-        print_rst(stream,
-        """
-        This device has an ``EventManager``-based interrupt
-        system.  Individual modules generate `events` which are wired
-        into a central interrupt controller.
-
-        When an interrupt occurs, you should look the interrupt number up
-        in the CPU-specific interrupt table and then call the relevant
-        module.
-        """)
-
-        section_title = "Assigned Interrupts"
-        print("{}".format(section_title), file=stream)
-        print("-" * len(section_title), file=stream)
-        print("", file=stream)
-
-        print("The following interrupts are assigned on this system:", file=stream)
-        print_table(self.irq_table, stream)
-
-
+# LiteX is only imported once a Module is actually being documented, so
+# that the rest of lxsocdoc can be imported without it.
+
+import copy
+import types
+from collections import OrderedDict
+
+from .rst import dedent, print_table, print_rst
+
+def _new_submodules():
+    return {
+        "event_managers": [],
+        "module_doc": [],
+    }
+
+class ModuleIndex:
+    """Index of every module below `root`, built in a single walk
+
+    The walk uses an explicit stack rather than recursion, so deep module
+    hierarchies can't hit the recursion limit, and each module is only
+    visited once no matter how many CSR regions there are.
+
+    The EventManagers and ModuleDocs of a region are the same as
+    :func:`gather_submodules` would find below it.  A module that can be
+    reached from several regions, such as one shared between peripherals
+    or one inside a nested region, counts for each of them.
+
+    Arguments
+    ---------
+
+    root (:obj:`Module`): The SoC, or any other module, to index.
+
+    regions (:obj:`dict`): Map of module to CSR region name.  Every module
+    below one of these is owned by the nearest such ancestor.
+
+    Attributes
+    ----------
+
+    paths (:obj:`dict`): Map of module to its path from `root`, as a tuple
+    of submodule names.  Anonymous submodules have a name of `None`.
+
+    owners (:obj:`dict`): Map of module to the name of the CSR region that
+    owns it, or `None`.
+
+    top_level (:obj:`list`): `(name, module)` pairs of the direct submodules
+    of `root`.
+    """
+    def __init__(self, root, regions={}):
+        self.paths = {}
+        self.owners = {}
+        self.top_level = []
+        self._regions = regions
+        self._submodules = {}
+        if root is None:
+            return
+        from litex.soc.interconnect.csr_eventmanager import EventManager
+        from litex.soc.integration.doc import ModuleDoc
+
+        # Modules already counted for each region
+        counted = {}
+        for region_name in regions.values():
+            self._submodules[region_name] = _new_submodules()
+            counted[region_name] = set()
+        self.top_level = list(root._submodules)
+
+        def count(region_name, module, own=False):
+            if module in counted[region_name]:
+                return
+            counted[region_name].add(module)
+            submodules = self._submodules[region_name]
+            # A region's own module is only ever one of its ModuleDocs.
+            if not own and isinstance(module, EventManager):
+                submodules["event_managers"].append(module)
+            if isinstance(module, ModuleDoc):
+                submodules["module_doc"].append(module)
+
+        seen_modules = set()
+        # Each entry holds the regions enclosing the path, innermost last.
+        stack = [(iter(root._submodules), (), None, ())]
+        while len(stack) > 0:
+            (children, path, owner, enclosing) = stack[-1]
+            try:
+                (name, module) = next(children)
+            except StopIteration:
+                stack.pop()
+                continue
+            if module in seen_modules:
+                # Reached again along another path, so count it and
+                # everything below it for any region here that missed it.
+                for region_name in enclosing:
+                    if module not in counted[region_name]:
+                        for submodule in _preorder(module):
+                            count(region_name, submodule)
+                continue
+            seen_modules.add(module)
+
+            module_path = path + (name,)
+            self.paths[module] = module_path
+            for region_name in enclosing:
+                count(region_name, module)
+            if module in regions:
+                owner = regions[module]
+                count(owner, module, own=True)
+                enclosing = enclosing + (owner,)
+            self.owners[module] = owner
+            stack.append((iter(module._submodules), module_path, owner, enclosing))
+
+    def is_region(self, module):
+        """Return whether `module` is the module of a CSR region"""
+        return module in self._regions
+
+    def path(self, module):
+        """Return the dotted path of `module`, or `None` if it isn't indexed
+
+        Anonymous submodules show up as `<anonymous>`.
+        """
+        if module not in self.paths:
+            return None
+        return ".".join("<anonymous>" if name is None else name for name in self.paths[module])
+
+    def submodules(self, module):
+        """Return the EventManagers and ModuleDocs below the region `module`
+
+        The result has the same form as :func:`gather_submodules`.  Regions
+        that weren't reached by the walk are gathered on their own.
+        """
+        if module is None:
+            return _new_submodules()
+        if self.owners.get(module) in self._submodules:
+            return self._submodules[self.owners[module]]
+        return gather_submodules(module)
+
+def _preorder(module):
+    """Yield `module` and every module below it, each once, parents first"""
+    seen_modules = set([module])
+    yield module
+    stack = [iter(module._submodules)]
+    while len(stack) > 0:
+        try:
+            (name, submodule) = next(stack[-1])
+        except StopIteration:
+            stack.pop()
+            continue
+        if submodule not in seen_modules:
+            seen_modules.add(submodule)
+            yield submodule
+            stack.append(iter(submodule._submodules))
+
+def gather_submodules(module):
+    """Return the EventManagers and ModuleDocs in `module` and below it"""
+    if module is None:
+        return _new_submodules()
+    root = types.SimpleNamespace(_submodules=[("", module)])
+    return ModuleIndex(root, {module: ""}).submodules(module)
+
+class DocumentedSection:
+    """A plain section of documentation, with the same interface as a
+    :obj:`ModuleDoc`
+
+    Unlike a :obj:`ModuleDoc`, this can be pickled and sent to another
+    process, and can be created without a migen Module at all.
+    """
+    def __init__(self, title, body, format="rst", path=None):
+        self._title  = title
+        self._body   = body
+        self._format = format
+        self._path   = path
+
+    @classmethod
+    def from_section(cls, section):
+        """Capture the contents of `section`, which is usually a ModuleDoc"""
+        return cls(section.title(), section.body(), section.format(), section.path())
+
+    def title(self):
+        return self._title
+
+    def body(self):
+        return self._body
+
+    def format(self):
+        return self._format
+
+    def path(self):
+        return self._path
+
+class ModuleNotDocumented(Exception):
+    """Indicates a Module has no documentation or sub-documentation"""
+    pass
+
+class DocumentedModule:
+    """Multi-section Documentation of a Module"""
+
+    def __init__(self, name, module, has_documentation=False):
+        self.name = name
+        self.sections = []
+
+        if module is not None:
+            from litex.soc.integration.doc import ModuleDoc
+            if isinstance(module, ModuleDoc):
+                has_documentation = True
+                self.sections.append(module)
+
+        if hasattr(module, "get_module_documentation"):
+            for doc in module.get_module_documentation():
+                has_documentation = True
+                self.sections.append(doc)
+
+        if not has_documentation:
+            raise ModuleNotDocumented()
+
+    def snapshot(self):
+        """Return a picklable copy of this module's documentation, with a
+        tuple of sections"""
+        snap = copy.copy(self)
+        snap.sections = tuple(DocumentedSection.from_section(s) for s in self.sections)
+        return snap
+
+    def print_region(self, stream, base_dir, note_pulses=False, diagrams="wavedrom", table_format="grid"):
+        title = "{}".format(self.name.upper())
+        print(title, file=stream)
+        print("=" * len(title), file=stream)
+        print("", file=stream)
+
+        for section in self.sections:
+            title = dedent(section.title())
+            body = dedent(section.body())
+            print("{}".format(title), file=stream)
+            print("-" * len(title), file=stream)
+            print(dedent(body), file=stream)
+            print("", file=stream)
+
+class DocumentedInterrupts(DocumentedModule):
+    """A :obj:`DocumentedModule` that automatically documents interrupts in an SoC
+
+    This creates a :obj:`DocumentedModule` object that prints out the contents
+    of the interrupt map of an SoC.
+    """
+    def __init__(self, interrupts):
+        DocumentedModule.__init__(self, "interrupts", None, has_documentation=True)
+
+        self.interrupts = types.MappingProxyType(OrderedDict(interrupts))
+        self.irq_table = self.make_irq_table({})
+
+    # A mappingproxy can't be pickled, so hand the map over as a plain one.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["interrupts"] = OrderedDict(self.interrupts)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.interrupts = types.MappingProxyType(self.interrupts)
+
+    def make_irq_table(self, pages):
+        irq_table = [["Interrupt", "Module"]]
+        for module_name, irq_no in self.interrupts.items():
+            irq_table.append([str(irq_no), ":doc:`{} <{}>`".format(module_name.upper(), pages.get(module_name, module_name))])
+        return irq_table
+
+    def with_pages(self, pages):
+        """Return a copy that links to the pages in `pages`, a map of module
+        name to document name, for modules that don't have their own page"""
+        linked = copy.copy(self)
+        linked.irq_table = self.make_irq_table(pages)
+        return linked
+
+    def print_region(self, stream, base_dir, note_pulses=False, diagrams="wavedrom", table_format="grid"):
+        title = "Interrupt Controller"
+        print(title, file=stream)
+        print("=" * len(title), file=stream)
+        print("", file=stream)
+
+        print_rst(stream,
+        """
+        This device has an ``EventManager``-based interrupt
+        system.  Individual modules generate `events` which are wired
+        into a central interrupt controller.
+
+        When an interrupt occurs, you should look the interrupt number up
+        in the CPU-specific interrupt table and then call the relevant
+        module.
+        """)
+
+        section_title = "Assigned Interrupts"
+        print("{}".format(section_title), file=stream)
+        print("-" * len(section_title), file=stream)
+        print("", file=stream)
+
+        print("The following interrupts are assigned on this system:", file=stream)
+        print_table(self.irq_table, stream, table_format)
+
+
@@ -0,0 +1,395 @@
+import abc
+import filecmp
+import hashlib
+import io
+import os
+
+class OutputReport:
+    """Record of which generated files were rewritten
+
+    Attributes
+    ----------
+
+    changed (:obj:`list` of str): Files whose contents were (re)written.
+
+    unchanged (:obj:`list` of str): Files that already had the right contents
+    and were left alone, so their mtime is preserved.
+
+    skipped (bool): Nothing was generated, because the stored fingerprint
+    showed that the output was already up to date.
+    """
+    def __init__(self):
+        self.changed = []
+        self.unchanged = []
+        self.skipped = False
+
+    def __repr__(self):
+        if self.skipped:
+            return "OutputReport(skipped=True)"
+        return "OutputReport(changed={}, unchanged={})".format(len(self.changed), len(self.unchanged))
+
+def _file_digest(path, size):
+    """Return the sha256 of the file at `path`, or None if it can't be
+    the same as content of length `size`."""
+    try:
+        if os.stat(path).st_size != size:
+            return None
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).digest()
+    except OSError:
+        return None
+
+def create_temp(dirname, prefix=".lxsocdoc-"):
+    """Create a new, empty file with a random name in `dirname`
+
+    The file gets the same mode as one made by a plain :func:`open`, with
+    the process's umask applied, unlike one from :func:`tempfile.mkstemp`.
+    Returns `(fd, path)`.
+    """
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    while True:
+        path = os.path.join(dirname, "{}{}".format(prefix, os.urandom(8).hex()))
+        try:
+            return (os.open(path, flags, 0o666), path)
+        except FileExistsError:
+            continue
+
+class OutputSink(abc.ABC):
+    """Somewhere to put generated files
+
+    Every file that :func:`generate_docs` produces, including pages, the
+    markdown files included by them, diagrams and static assets, is handed
+    to a sink through :func:`write` or :func:`install`.  Names are relative
+    paths using `/` as the separator.
+
+    A sink can be used as a context manager, which calls :func:`close` on
+    exit.
+
+    Attributes
+    ----------
+
+    report (:obj:`OutputReport`): Which files were written.
+
+    readable (bool): Whether :func:`read` returns the files of an earlier
+    run, so that a fingerprint stored in the sink can be checked.
+    """
+    readable = False
+
+    def __init__(self):
+        self.report = OutputReport()
+
+    @abc.abstractmethod
+    def write(self, name, content):
+        """Write `content` (a :obj:`str` or :obj:`bytes`) to `name`.
+
+        Returns `True` if the file was written, or `False` if it already
+        contained `content`.
+        """
+
+    def install(self, name, source, mode="copy"):
+        """Install the existing file `source` as `name`.  Sinks that can't
+        link to a file copy it whatever `mode` is."""
+        with open(source, "rb") as f:
+            return self.write(name, f.read())
+
+    def read(self, name):
+        """Return the contents of `name` as :obj:`bytes`, or `None` if the
+        sink can't provide it"""
+        return None
+
+    def exists(self, name):
+        return False
+
+    def remove(self, name):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return False
+
+class OutputDirectory(OutputSink):
+    """Write generated files into a directory, skipping files whose
+    contents have not changed.
+
+    Leaving unchanged files untouched keeps their mtime stable, which lets
+    an incremental `sphinx-build` only re-read the pages that changed.
+    """
+    readable = True
+
+    def __init__(self, base_dir):
+        OutputSink.__init__(self)
+        self.base_dir = base_dir
+        # Digests of the files written so far, so that writing the same
+        # file repeatedly during one run doesn't go back to the disk.
+        self._written = {}
+
+    def path(self, name):
+        return os.path.join(self.base_dir, name)
+
+    def write(self, name, content):
+        """Write `content` (a :obj:`str` or :obj:`bytes`) to `name`.
+
+        Returns `True` if the file was written, or `False` if it already
+        contained `content`.
+        """
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        digest = hashlib.sha256(content).digest()
+        if self._written.get(name) == digest:
+            return False
+        self._written[name] = digest
+        path = self.path(name)
+        if _file_digest(path, len(content)) == digest:
+            self.report.unchanged.append(name)
+            return False
+
+        # Write to a temporary file first so that readers never see a
+        # partially-written page.
+        dirname = os.path.dirname(path)
+        os.makedirs(dirname, exist_ok=True)
+        (fd, temp_path) = create_temp(dirname)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self.report.changed.append(name)
+        return True
+
+    def read(self, name):
+        try:
+            with open(self.path(name), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def exists(self, name):
+        return os.path.exists(self.path(name))
+
+    def remove(self, name):
+        try:
+            os.remove(self.path(name))
+        except FileNotFoundError:
+            pass
+
+    def _is_installed(self, source, path, mode):
+        try:
+            if mode == "symlink":
+                return os.path.islink(path) and os.readlink(path) == source
+            if os.path.islink(path):
+                return False
+            if mode == "hardlink":
+                return os.path.samefile(source, path)
+            # A hard link isn't a copy, even though its contents match
+            if os.path.samefile(source, path):
+                return False
+            return filecmp.cmp(source, path, shallow=False)
+        except OSError:
+            return False
+
+    def install(self, name, source, mode="copy"):
+        """Install the existing file `source` as `name`.
+
+        `mode` is one of:
+
+        * `"copy"`: copy the file, letting the kernel do the work where
+          possible (via :func:`shutil.copyfile`).
+        * `"symlink"`: create a symbolic link to `source`.
+        * `"hardlink"`: create a hard link to `source`, which must be on
+          the same filesystem.
+
+        Nothing is done if `name` is already installed in the given mode.
+        Returns `True` if the file was (re)installed.
+        """
+        if mode not in ("copy", "symlink", "hardlink"):
+            raise ValueError("Unknown asset install mode: {}".format(mode))
+        source = os.path.abspath(source)
+        path = self.path(name)
+        if self._is_installed(source, path, mode):
+            self.report.unchanged.append(name)
+            return False
+
+        dirname = os.path.dirname(path)
+        os.makedirs(dirname, exist_ok=True)
+        temp_path = os.path.join(dirname, ".lxsocdoc-{}-{}".format(os.getpid(), os.path.basename(path)))
+        try:
+            if mode == "symlink":
+                os.symlink(source, temp_path)
+            elif mode == "hardlink":
+                os.link(source, temp_path)
+            else:
+                import shutil
+                shutil.copyfile(source, temp_path)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.lexists(temp_path):
+                os.unlink(temp_path)
+            raise
+        self.report.changed.append(name)
+        return True
+
+class MemoryOutput(OutputSink):
+    """Collect generated files in a :obj:`dict` instead of writing them out
+
+    Attributes
+    ----------
+
+    files (:obj:`dict`): Map of file name to contents, in the order in which
+    they were written.
+    """
+    readable = True
+
+    def __init__(self):
+        OutputSink.__init__(self)
+        self.files = {}
+
+    def write(self, name, content):
+        self.files[name] = content
+        self.report.changed.append(name)
+        return True
+
+    def read(self, name):
+        content = self.files.get(name)
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        return content
+
+    def exists(self, name):
+        return name in self.files
+
+    def remove(self, name):
+        self.files.pop(name, None)
+
+class _ArchiveOutput(OutputSink):
+    """Base of the sinks that stream every file into a single archive, so
+    that the output costs one file create however many pages there are.
+    Each file is added as soon as it is written.
+
+    Entries get a fixed timestamp and mode, so the same input always gives
+    the same archive.  Writing a name a second time with the same contents
+    does nothing; writing it with different contents is an error, as an
+    archive entry can't be replaced.
+    """
+    def __init__(self):
+        OutputSink.__init__(self)
+        self._written = {}
+
+    def write(self, name, content):
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        digest = hashlib.sha256(content).digest()
+        previous = self._written.get(name)
+        if previous == digest:
+            return False
+        if previous is not None:
+            raise ValueError("{} was already written to the archive with different contents".format(name))
+        self._written[name] = digest
+        self._add(name, content)
+        self.report.changed.append(name)
+        return True
+
+    def exists(self, name):
+        return name in self._written
+
+class ZipOutput(_ArchiveOutput):
+    """Stream generated files into a zip archive
+
+    Arguments
+    ---------
+
+    target (str): Path of the archive, or a writable binary file object,
+    which need not be seekable.
+
+    compression (int): A :obj:`zipfile` compression method, by default
+    `ZIP_DEFLATED`.
+    """
+    def __init__(self, target, compression=None):
+        import zipfile
+        _ArchiveOutput.__init__(self)
+        if compression is None:
+            compression = zipfile.ZIP_DEFLATED
+        self.compression = compression
+        self._zip = zipfile.ZipFile(target, "w", compression=compression)
+
+    def _add(self, name, content):
+        import zipfile
+        info = zipfile.ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0))
+        info.compress_type = self.compression
+        info.external_attr = 0o644 << 16
+        self._zip.writestr(info, content)
+
+    def close(self):
+        self._zip.close()
+
+class TarOutput(_ArchiveOutput):
+    """Stream generated files into a tar archive
+
+    Arguments
+    ---------
+
+    target (str): Path of the archive, or a writable binary file object,
+    which need not be seekable.
+
+    compression (str): `None`, `"gz"`, `"xz"` or `"bz2"`.
+    """
+    def __init__(self, target, compression=None):
+        import tarfile
+        _ArchiveOutput.__init__(self)
+        mode = "w|" + (compression or "")
+        if hasattr(target, "write"):
+            self._tar = tarfile.open(fileobj=target, mode=mode, format=tarfile.PAX_FORMAT)
+        else:
+            self._tar = tarfile.open(target, mode=mode, format=tarfile.PAX_FORMAT)
+
+    def _add(self, name, content):
+        import tarfile
+        info = tarfile.TarInfo(name)
+        info.size = len(content)
+        info.mode = 0o644
+        info.mtime = 0
+        self._tar.addfile(info, io.BytesIO(content))
+
+    def close(self):
+        self._tar.close()
+
+# Archive suffixes understood by open_output(), longest first
+_ARCHIVE_SUFFIXES = [
+    (".tar.gz", TarOutput, "gz"),
+    (".tar.xz", TarOutput, "xz"),
+    (".tar.bz2", TarOutput, "bz2"),
+    (".tgz", TarOutput, "gz"),
+    (".tar", TarOutput, None),
+    (".zip", ZipOutput, None),
+]
+
+def open_output(target):
+    """Return an :obj:`OutputSink` for `target`
+
+    A path ending in `.zip`, `.tar`, `.tar.gz`, `.tgz`, `.tar.xz` or
+    `.tar.bz2` is written as an archive, and any other path as a
+    directory.  An existing sink is returned as it is.
+    """
+    if isinstance(target, OutputSink):
+        return target
+    if not isinstance(target, (str, os.PathLike)):
+        raise TypeError("output must be a path or an OutputSink, not {}".format(type(target).__name__))
+    target = os.fspath(target)
+    for (suffix, cls, compression) in _ARCHIVE_SUFFIXES:
+        if target.endswith(suffix):
+            return cls(target, compression)
+    return OutputDirectory(target)
+
+def write_output(base_dir, name, content):
+    """Write `content` to `name` inside `base_dir`, which may either be a
+    path or an :obj:`OutputSink`."""
+    if not isinstance(base_dir, OutputSink):
+        base_dir = OutputDirectory(base_dir)
+    return base_dir.write(name, content)
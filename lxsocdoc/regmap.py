@@ -0,0 +1,169 @@
+# Disable pylint's E1101, which breaks completely on migen
+#pylint:disable=E1101
+
+from collections import namedtuple, OrderedDict
+import types
+
+from .csr import DocumentedCSRRegion
+from .module import ModuleIndex, ModuleNotDocumented, DocumentedModule, DocumentedInterrupts
+from .stats import NULL_STATS
+
+class RegisterMap(namedtuple("RegisterMap", ["regions", "modules", "interrupts", "csr_data_width"])):
+    """An immutable snapshot of everything lxsocdoc knows about an SoC
+
+    Its regions are frozen, as are their registers and fields, so use
+    their `replace()` methods to derive a modified copy.
+
+    A `RegisterMap` is produced once by :func:`build_register_map` and may then
+    be handed to any number of generators, such as :func:`generate_docs` and
+    :func:`generate_svd`, without walking the SoC again.
+
+    Attributes
+    ----------
+
+    regions (:obj:`tuple` of :obj:`DocumentedCSRRegion`): Every CSR region,
+    with its registers, fields and interrupt documentation already filled in.
+
+    modules (:obj:`tuple` of :obj:`DocumentedModule`): Snapshots of the
+    documented modules that do not have CSRs, starting with the interrupt
+    table.
+
+    interrupts (:obj:`mapping`): Read-only map of region name to IRQ number.
+
+    csr_data_width (int): Width of the CSR bus data path.
+    """
+    __slots__ = ()
+
+def get_csr_regions(soc):
+    """Return the SoC's CSR regions as `(name, origin, busword, obj)` tuples"""
+    # Previously, litex contained a function to gather csr regions.
+    if hasattr(soc, "get_csr_regions"):
+        return soc.get_csr_regions()
+    # Now we just access the regions directly.
+    regions = []
+    for region_name, region in soc.csr_regions.items():
+        regions.append((region_name, region.origin, region.busword, region.obj))
+    return regions
+
+def get_interrupts(soc):
+    """Return an ordered map of CSR region name to IRQ number"""
+    # Gather all interrupts so we can easily map IRQ numbers to CSR sections
+    interrupts = OrderedDict()
+    for csr, irq in sorted(soc.soc_interrupt_map.items()):
+        interrupts[csr] = irq
+    return interrupts
+
+def index_modules(soc, csr_regions, stats=None):
+    """Return a :obj:`ModuleIndex` of `soc`, with each module assigned to
+    the CSR region in `csr_regions` that owns it"""
+    if stats is None:
+        stats = NULL_STATS
+    region_modules = OrderedDict()
+    for csr_region in csr_regions:
+        if hasattr(soc, csr_region[0]):
+            region_modules[getattr(soc, csr_region[0])] = csr_region[0]
+
+    # Walk the whole module tree once, rather than once per region.
+    with stats.phase("index_modules"):
+        return ModuleIndex(soc, region_modules)
+
+def iter_documented_regions(soc, stats=None, csr_regions=None, index=None, interrupts=None):
+    """Extract the CSR regions of `soc` one at a time
+
+    This yields a :obj:`DocumentedCSRRegion` for each CSR region, in the same
+    order as :func:`build_register_map`, but doesn't keep any of them.  A
+    caller that writes out each region and then drops it only ever holds
+    one region's registers in memory.
+
+    `csr_regions`, `index` and `interrupts` may be passed in if the caller
+    already has them, to avoid computing them twice.
+    """
+    if stats is None:
+        stats = NULL_STATS
+    if csr_regions is None:
+        csr_regions = get_csr_regions(soc)
+    if index is None:
+        index = index_modules(soc, csr_regions, stats)
+    if interrupts is None:
+        interrupts = get_interrupts(soc)
+
+    # Convert each CSR region into a DocumentedCSRRegion.
+    # This process will also expand each CSR into a DocumentedCSR,
+    # which means that CompoundCSRs (such as CSRStorage and CSRStatus)
+    # that are larger than the buswidth will be turned into multiple
+    # DocumentedCSRs.
+    for csr_region in csr_regions:
+        module = None
+        if hasattr(soc, csr_region[0]):
+            module = getattr(soc, csr_region[0])
+        submodules = index.submodules(module)
+
+        with stats.phase("document_csr", csr_region[0]):
+            documented_region = DocumentedCSRRegion(csr_region, module, submodules, csr_data_width=soc.csr_data_width)
+        if documented_region.name in interrupts:
+            with stats.phase("document_interrupt", csr_region[0]):
+                documented_region.document_interrupt(soc, submodules, interrupts[documented_region.name])
+        yield documented_region.freeze()
+
+def document_modules(soc, index, interrupts, stats=None):
+    """Return a list of :obj:`DocumentedModule` for the interrupt table and
+    every top-level module of `soc` that documents itself but has no CSRs"""
+    if stats is None:
+        stats = NULL_STATS
+    # Document any modules that are not CSRs:
+    additional_modules = [
+        DocumentedInterrupts(interrupts),
+    ]
+    with stats.phase("document_module"):
+        for (mod_name, mod) in index.top_level:
+            if not index.is_region(mod):
+                try:
+                    additional_modules.append(DocumentedModule(mod_name, mod))
+                except ModuleNotDocumented:
+                    pass
+    return additional_modules
+
+def build_register_map(soc, stats=None):
+    """Extract the register map of `soc` into a :obj:`RegisterMap`
+
+    This is the only place where lxsocdoc introspects the SoC, so it should
+    be called once per build and the result shared between generators.
+
+    If `stats` is a :obj:`BuildStats`, the time spent in each phase of the
+    extraction is recorded in it.
+    """
+    if stats is None:
+        stats = NULL_STATS
+
+    interrupts = get_interrupts(soc)
+    csr_regions = get_csr_regions(soc)
+    index = index_modules(soc, csr_regions, stats)
+    documented_regions = tuple(iter_documented_regions(soc, stats, csr_regions, index, interrupts))
+    additional_modules = document_modules(soc, index, interrupts, stats)
+
+    return RegisterMap(
+        regions=documented_regions,
+        modules=tuple(module.snapshot() for module in additional_modules),
+        interrupts=types.MappingProxyType(interrupts),
+        csr_data_width=soc.csr_data_width,
+    )
+
+def as_register_map(soc, stats=None):
+    """Return `soc` if it is already a :obj:`RegisterMap`, otherwise build one"""
+    if isinstance(soc, RegisterMap):
+        return soc
+    return build_register_map(soc, stats)
+
+def group_identical_regions(regions):
+    """Group `regions` by :func:`DocumentedCSRRegion.layout_key`
+
+    Returns a list of lists of regions, in order of each group's first
+    member.  The first region of each group is its canonical instance.
+    """
+    groups = OrderedDict()
+    for region in regions:
+        key = region.layout_key()
+        if key is None:
+            key = ("unique", region.name)
+        groups.setdefault(key, []).append(region)
+    return list(groups.values())
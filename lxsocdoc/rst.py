@@ -1,62 +1,124 @@
+import functools
 import textwrap
+import time
 
-def make_table(t):
-    """Make a reStructured Text Table
+# If set, called with the time taken by each call to reflow().  This is
+# installed by BuildStats while it is measuring a build.
+reflow_hook = None
+
+@functools.lru_cache(maxsize=1024)
+def _rule(widths, char):
+    """Return the border line of a table whose columns are `widths` wide"""
+    return "+" + "+".join(char * (width + 2) for width in widths) + "+\n"
+
+def format_table(t):
+    """Lay out a reStructured Text grid table
+
+    Each cell is split into lines and measured exactly once, and the
+    table is returned as a single string.  `t` is not modified.
+
+    Arguments
+    ---------
+
+    t (:obj:`list` of :obj:`list`s): A list of rows in the table.
+    Each row has several columns.  The first row is the table header.
+    Cells may span several lines.
 
     Returns
     -------
 
-    A string containing a reStructured Text table.
+    A string containing the table, with no blank lines around it.
     """
-    column_widths = []
-
-    table = "\n"
     if len(t) <= 0:
-        return table
-
-    # Figure out how wide to make each column
-    for col in t[0]:
-        column_widths.append(0)
+        return ""
 
+    column_widths = [0] * len(t[0])
+    rows = []
     for row in t:
+        cells = []
         for i, column in enumerate(row):
-            column_widths[i] = max(column_widths[i], len(column))
-
-    # Print out header
-    header = t.pop(0)
-    table += "+"
-    for i, column in enumerate(header):
-        table += "-" + "-"*column_widths[i]
-        table += "-+"
-    table += "\n"
-
-    table += "|"
-    for i, column in enumerate(header):
-        table += " " + column.ljust(column_widths[i]) + " |"
-    table += "\n"
-
-    table += "+"
-    for i, column in enumerate(header):
-        table += "=" + "="*column_widths[i]
-        table += "=+"
-    table += "\n"
+            lines = column.splitlines()
+            if len(lines) == 0:
+                lines = [""]
+            for line in lines:
+                column_widths[i] = max(column_widths[i], len(line))
+            cells.append(lines)
+        rows.append(cells)
+
+    column_widths = tuple(column_widths)
+    rule = _rule(column_widths, "-")
+    out = [rule]
+    for n, cells in enumerate(rows):
+        for j in range(max(len(lines) for lines in cells)):
+            out.append("|")
+            for lines, width in zip(cells, column_widths):
+                line = lines[j] if j < len(lines) else ""
+                out.append(" " + line.ljust(width) + " |")
+            out.append("\n")
+        out.append(_rule(column_widths, "=") if n == 0 else rule)
+    return "".join(out)
+
+def format_list_table(t):
+    """Lay out a table as a reStructured Text `list-table` directive
+
+    Unlike a grid table, cells aren't padded to the width of their column,
+    so the output only grows with the amount of text.  The cost is a
+    slower parse, since docutils parses every cell as a separate nested
+    document.  Cells may span several lines and may hold further tables.
 
+    Arguments
+    ---------
+
+    t (:obj:`list` of :obj:`list`s): A list of rows in the table.
+    Each row has several columns.  The first row is the table header.
+
+    Returns
+    -------
+
+    A string containing the directive, with no blank lines around it.
+    """
+    if len(t) <= 0:
+        return ""
+
+    out = [".. list-table::\n    :header-rows: 1\n\n"]
     for row in t:
-        table += "|"
         for i, column in enumerate(row):
-            table += " " + column.ljust(column_widths[i]) + " |"
-        table += "\n"
+            lines = column.splitlines()
+            if len(lines) == 0:
+                lines = [""]
+            out.append((("    * - " if i == 0 else "      - ") + lines[0]).rstrip())
+            for line in lines[1:]:
+                out.append("\n" + ("        " + line).rstrip())
+            out.append("\n")
+    return "".join(out)
+
+# Ways of laying out a table, for the `table_format` arguments
+TABLE_FORMATS = {
+    "grid": format_table,
+    "list": format_list_table,
+}
+
+def layout_table(t, table_format="grid"):
+    """Lay out `t` with :func:`format_table` if `table_format` is `"grid"`,
+    or with :func:`format_list_table` if it is `"list"`"""
+    try:
+        return TABLE_FORMATS[table_format](t)
+    except KeyError:
+        raise ValueError("Unknown table format: {}".format(table_format)) from None
+
+def make_table(t, table_format="grid"):
+    """Make a reStructured Text Table
 
-        table += "+"
-        for i, column in enumerate(row):
-            table += "-" + "-"*column_widths[i]
-            table += "-+"
-        table += "\n"
-    table += "\n"
+    Returns
+    -------
 
-    return table
+    A string containing a reStructured Text table.
+    """
+    if len(t) <= 0:
+        return "\n"
+    return "\n" + layout_table(t, table_format) + "\n"
 
-def print_table(table, stream):
+def print_table(table, stream, table_format="grid"):
     """Print a reStructured Text table
 
     Arguments
@@ -66,52 +128,11 @@ def print_table(table, stream):
     Each row has several columns.  The first row is the table header.
 
     stream (:obj:`io`): Destination output file.
-    """
-    column_widths = []
 
-    print("", file=stream)
-    if len(table) <= 0:
-        return
-
-    # Figure out how wide to make each column
-    for col in table[0]:
-        column_widths.append(0)
-
-    for row in table:
-        for i, column in enumerate(row):
-            column_widths[i] = max(column_widths[i], len(column))
-
-    # Print out header
-    header = table.pop(0)
-    print("+", file=stream, end="")
-    for i, column in enumerate(header):
-        print("-" + "-"*column_widths[i], file=stream, end="")
-        print("-+", file=stream, end="")
-    print("", file=stream)
-
-    print("|", file=stream, end="")
-    for i, column in enumerate(header):
-        print(" " + column.ljust(column_widths[i]) + " |", file=stream, end="")
-    print("", file=stream)
-
-    print("+", file=stream, end="")
-    for i, column in enumerate(header):
-        print("=" + "="*column_widths[i], file=stream, end="")
-        print("=+", file=stream, end="")
-    print("", file=stream)
-
-    for row in table:
-        print("|", file=stream, end="")
-        for i, column in enumerate(row):
-            print(" " + column.ljust(column_widths[i]) + " |", file=stream, end="")
-        print("", file=stream)
-
-        print("+", file=stream, end="")
-        for i, column in enumerate(row):
-            print("-" + "-"*column_widths[i], file=stream, end="")
-            print("-+", file=stream, end="")
-        print("", file=stream)
-    print("", file=stream)
+    table_format (str): `"grid"` for a grid table, or `"list"` for a
+    `list-table` directive.
+    """
+    stream.write(make_table(table, table_format))
 
 def pad_first_line_if_necessary(s):
     if not isinstance(s, str):
@@ -147,9 +168,26 @@ def reflow(s, width=80):
     each line individually.
 
     Finally, append it to a new string to be returned.
+
+    The result is cached by content, since the same docstrings turn up
+    in every instance of a peripheral.  See :func:`set_text_cache_size`.
     """
     if not isinstance(s, str):
         return s
+    if reflow_hook is not None:
+        start = time.perf_counter()
+        s = _cached_reflow(s, width)
+        reflow_hook(time.perf_counter() - start)
+        return s
+    return _cached_reflow(s, width)
+
+def dedent(s):
+    """Cached version of :func:`textwrap.dedent`"""
+    if not isinstance(s, str):
+        return s
+    return _cached_dedent(s)
+
+def _reflow_text(s, width):
     out = []
     s = pad_first_line_if_necessary(s)
     for piece in textwrap.dedent(s).split("\n\n"):
@@ -157,6 +195,30 @@ def reflow(s, width=80):
         out.append(trimmed_piece)
     return "\n\n".join(out)
 
+TEXT_CACHE_SIZE = 4096
+
+_cached_reflow = functools.lru_cache(maxsize=TEXT_CACHE_SIZE)(_reflow_text)
+_cached_dedent = functools.lru_cache(maxsize=TEXT_CACHE_SIZE)(textwrap.dedent)
+
+def set_text_cache_size(maxsize):
+    """Set how many strings :func:`reflow` and :func:`dedent` each remember
+
+    The caches are emptied.  A `maxsize` of 0 disables caching, and `None`
+    lets the caches grow without limit.
+    """
+    global _cached_reflow, _cached_dedent
+    _cached_reflow = functools.lru_cache(maxsize=maxsize)(_reflow_text)
+    _cached_dedent = functools.lru_cache(maxsize=maxsize)(textwrap.dedent)
+
+def text_cache_info():
+    """Return the hits, misses and size of the :func:`reflow` and
+    :func:`dedent` caches, keyed by function name"""
+    info = {}
+    for (name, cached) in (("reflow", _cached_reflow), ("dedent", _cached_dedent)):
+        ci = cached.cache_info()
+        info[name] = {"hits": ci.hits, "misses": ci.misses, "maxsize": ci.maxsize, "currsize": ci.currsize}
+    return info
+
 def _reflow(s, width=80):
     return reflow(s, width)
 
@@ -0,0 +1,46 @@
+"""Sphinx extension for documentation generated by lxsocdoc.
+
+Add `"lxsocdoc.sphinxext"` to the `sphinx_extensions` of
+:func:`generate_docs` (or let :func:`build_docs` load it) and Sphinx will
+re-read exactly the pages whose contents lxsocdoc changed.
+
+:func:`generate_docs` writes a digest of every page, including the
+markdown files and diagrams it pulls in, to `.lxsocdoc-pages`.  The
+extension keeps the digests seen by the last build in the pickled Sphinx
+environment, and reports every page whose digest differs as outdated.
+This catches changes that Sphinx's own modification-time check misses,
+such as a page rewritten within the same timestamp or a changed file
+included through `mdinclude`.
+"""
+
+import json
+import os
+
+from .docs import PAGES_FILE
+
+ENV_VERSION = 1
+
+def read_pages(srcdir):
+    """Return the map of document name to digest stored in `srcdir`, or an
+    empty map if lxsocdoc didn't generate it"""
+    try:
+        with open(os.path.join(srcdir, PAGES_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)["pages"]
+    except (OSError, ValueError, KeyError):
+        return {}
+
+def _get_outdated(app, env, added, changed, removed):
+    pages = read_pages(app.srcdir)
+    previous = getattr(env, "lxsocdoc_pages", {})
+    # Stored in the environment, so it is pickled along with it.
+    env.lxsocdoc_pages = pages
+    return [name for (name, digest) in pages.items()
+        if name not in added and previous.get(name) != digest]
+
+def setup(app):
+    app.connect("env-get-outdated", _get_outdated)
+    return {
+        "env_version": ENV_VERSION,
+        "parallel_read_safe": True,
+        "parallel_write_safe": True,
+    }
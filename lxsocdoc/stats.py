@@ -0,0 +1,152 @@
+import json
+import time
+from collections import OrderedDict
+
+from . import rst
+
+class _NullPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+_NULL_PHASE = _NullPhase()
+
+def _reset_peak():
+    # tracemalloc.reset_peak() was added in Python 3.9.  Without it, each
+    # phase reports the peak since the outermost phase started.
+    import tracemalloc
+    if hasattr(tracemalloc, "reset_peak"):
+        tracemalloc.reset_peak()
+
+class NullStats:
+    """Stand-in used when no statistics were requested.  Every phase is a
+    shared no-op context manager, so disabled instrumentation costs one
+    method call per phase."""
+    enabled = False
+
+    def phase(self, name, region=None):
+        return _NULL_PHASE
+
+NULL_STATS = NullStats()
+
+class _Phase:
+    def __init__(self, stats, name, region):
+        self.stats = stats
+        self.name = name
+        self.region = region
+
+    def __enter__(self):
+        self.stats._enter(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        elapsed = time.perf_counter() - self.start
+        self.stats._exit(self, elapsed)
+        return False
+
+class BuildStats:
+    """Collect per-phase timing and memory statistics
+
+    Pass an instance as the `stats` argument of :func:`build_register_map`,
+    :func:`generate_docs` or :func:`generate_svd`.  For each phase (such as
+    `document_csr`, `print_region` or `svd`) it records the number of calls,
+    the total wall time and, if `trace_memory` is set, the peak memory
+    allocated while the phase ran.  The same figures are also broken down
+    per region.
+
+    Calls to :func:`reflow` are counted and timed while any phase is
+    running, but not memory-traced.  The hit and miss counts of the
+    :func:`reflow` and :func:`dedent` caches are reported as `text_cache`.
+
+    Arguments
+    ---------
+
+    trace_memory (bool): Measure peak memory with :mod:`tracemalloc`.  If
+    tracemalloc isn't already running, it is started for the outermost
+    phase and stopped again afterwards.  This makes everything noticeably
+    slower.
+
+    callback (callable): Called as `callback(name, region, seconds,
+    peak_bytes)` at the end of every phase.  `region` and `peak_bytes` may
+    be `None`.
+    """
+    enabled = True
+
+    def __init__(self, trace_memory=False, callback=None):
+        self.trace_memory = trace_memory
+        self.callback = callback
+        self.phases = OrderedDict()
+        self.regions = OrderedDict()
+        self._stack = []
+        self._started_tracing = False
+
+    def phase(self, name, region=None):
+        """Return a context manager that measures one run of phase `name`"""
+        return _Phase(self, name, region)
+
+    def record(self, name, seconds, region=None, peak_bytes=None):
+        """Add one call of `name` taking `seconds` to the statistics"""
+        self._add(self.phases, name, seconds, peak_bytes)
+        if region is not None:
+            self._add(self.regions.setdefault(region, OrderedDict()), name, seconds, peak_bytes)
+        if self.callback is not None:
+            self.callback(name, region, seconds, peak_bytes)
+
+    def _add(self, table, name, seconds, peak_bytes):
+        entry = table.get(name)
+        if entry is None:
+            entry = table[name] = {"calls": 0, "seconds": 0.0, "peak_bytes": None}
+        entry["calls"] += 1
+        entry["seconds"] += seconds
+        if peak_bytes is not None:
+            entry["peak_bytes"] = max(entry["peak_bytes"] or 0, peak_bytes)
+
+    def _reflow_hook(self, seconds):
+        self._add(self.phases, "reflow", seconds, None)
+
+    def _enter(self, phase):
+        import tracemalloc
+        if len(self._stack) == 0:
+            rst.reflow_hook = self._reflow_hook
+            if self.trace_memory and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+        if self.trace_memory:
+            # tracemalloc only has one peak counter, so fold the current
+            # peak into the enclosing phase before resetting it for this one.
+            (current, peak) = tracemalloc.get_traced_memory()
+            if len(self._stack) > 0:
+                self._stack[-1][1] = max(self._stack[-1][1], peak)
+            _reset_peak()
+            self._stack.append([current, current])
+        else:
+            self._stack.append(None)
+
+    def _exit(self, phase, seconds):
+        import tracemalloc
+        frame = self._stack.pop()
+        peak_bytes = None
+        if frame is not None:
+            peak = max(frame[1], tracemalloc.get_traced_memory()[1])
+            peak_bytes = peak - frame[0]
+            if len(self._stack) > 0:
+                self._stack[-1][1] = max(self._stack[-1][1], peak)
+            _reset_peak()
+        if len(self._stack) == 0:
+            rst.reflow_hook = None
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+        self.record(phase.name, seconds, phase.region, peak_bytes)
+
+    def as_dict(self):
+        return {"phases": self.phases, "regions": self.regions, "text_cache": rst.text_cache_info()}
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.as_dict(), **kwargs)
+
+    def dump(self, fp, **kwargs):
+        json.dump(self.as_dict(), fp, **kwargs)
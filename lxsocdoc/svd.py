@@ -0,0 +1,461 @@
+import contextlib
+import html
+import io
+import re
+from collections import OrderedDict
+
+from .fingerprint import Fingerprint
+from .regmap import group_identical_regions
+from .rst import reflow
+from .stats import NULL_STATS
+
+_HEADER = """<?xml version="1.0" encoding="utf-8"?>
+
+<device schemaVersion="1.1" xmlns:xs="http://www.w3.org/2001/XMLSchema-instance" xs:noNamespaceSchemaLocation="CMSIS-SVD.xsd" >
+    <vendor>{vendor}</vendor>
+    <name>{name}</name>
+{description}
+    <addressUnitBits>8</addressUnitBits>
+    <width>32</width>
+    <size>32</size>
+    <access>read-write</access>
+    <resetValue>0x00000000</resetValue>
+    <resetMask>0xFFFFFFFF</resetMask>
+
+    <peripherals>
+"""
+
+_FOOTER = """    </peripherals>
+</device>
+"""
+
+_PERIPHERAL_HEAD = """        <peripheral>
+            <name>{name}</name>
+            <baseAddress>0x{origin:08X}</baseAddress>
+            <groupName>{name}</groupName>
+{description}            <registers>
+"""
+
+_PERIPHERAL_TAIL = """            </registers>
+            <addressBlock>
+                <offset>0</offset>
+                <size>0x{size:x}</size>
+                <usage>registers</usage>
+            </addressBlock>
+{interrupt}        </peripheral>
+"""
+
+_DERIVED_PERIPHERAL = """        <peripheral derivedFrom="{base}">
+            <name>{name}</name>
+            <baseAddress>0x{origin:08X}</baseAddress>
+{interrupt}        </peripheral>
+"""
+
+_INTERRUPT = """            <interrupt>
+                <name>{name}</name>
+                <value>{value}</value>
+            </interrupt>
+"""
+
+_REGISTER_HEAD = """                <register>
+{dim}                    <name>{name}</name>
+{description}                    <addressOffset>0x{offset:04x}</addressOffset>
+                    <resetValue>0x{reset:02x}</resetValue>
+                    <size>{size}</size>
+                    <access>{access}</access>
+                    <fields>
+"""
+
+_DIM = """                    <dim>{dim}</dim>
+                    <dimIncrement>0x{increment:x}</dimIncrement>
+                    <dimIndex>{index}</dimIndex>
+"""
+
+_REGISTER_TAIL = """                    </fields>
+                </register>
+"""
+
+_FIELD = """                        <field>
+                            <name>{name}</name>
+                            <msb>{msb}</msb>
+                            <bitRange>[{msb}:{lsb}]</bitRange>
+                            <lsb>{lsb}</lsb>
+{description}                        </field>
+"""
+
+# Strip off "ev_" from eventmanager fields
+_EVENT_FIELD_NAMES = {
+    "ev_enable":  "enable",
+    "ev_pending": "pending",
+    "ev_status":  "status",
+}
+
+def cdata(s):
+    """Wrap `s` in a CDATA section, splitting any `]]>` it contains so that
+    it can't terminate the section early."""
+    return "<![CDATA[" + "{}".format(s).replace("]]>", "]]]]><![CDATA[>") + "]]>"
+
+def _description(indent, s):
+    if s is None:
+        return ""
+    return indent + "<description>" + cdata(s) + "</description>\n"
+
+def format_register(csr, csr_address, description, length, name=None, dim=""):
+    """Return the SVD `<register>` element for a :obj:`DocumentedCSR`
+
+    `name` overrides the register name, and `dim` holds any `<dim>`
+    elements for a register array."""
+    if name is None:
+        name = csr.short_numbered_name
+    parts = [_REGISTER_HEAD.format(
+        dim=dim,
+        name=html.escape(name, quote=False),
+        description=_description("                    ", description),
+        offset=csr_address,
+        reset=csr.reset_value,
+        size=length,
+        access=csr.access,
+    )]
+    if hasattr(csr, "fields") and len(csr.fields) > 0:
+        for field in csr.fields:
+            parts.append(_FIELD.format(
+                name=html.escape(field.name, quote=False),
+                msb=field.offset + field.size - 1,
+                lsb=field.offset,
+                description="                            <description>" + cdata(reflow(field.description)) + "</description>\n",
+            ))
+    else:
+        field_name = csr.short_name.lower()
+        parts.append(_FIELD.format(
+            name=html.escape(_EVENT_FIELD_NAMES.get(field_name, field_name), quote=False),
+            msb=csr.size - 1,
+            lsb=0,
+            description="",
+        ))
+    parts.append(_REGISTER_TAIL)
+    return "".join(parts)
+
+# A register name that ends in an index, such as the `VALUE1` and `VALUE0`
+# words of a split CSR
+_NUMBERED_NAME = re.compile(r"^(.*?)(\d+)$")
+
+def _array_prefix(csr):
+    """Return the name of `csr` without its trailing index, or `None`"""
+    name = csr.short_numbered_name
+    # The words of a split CSR are numbered after the CSR's own name, which
+    # may itself end in a digit.
+    if name.startswith(csr.short_name) and name[len(csr.short_name):].isdigit():
+        return csr.short_name
+    match = _NUMBERED_NAME.match(name)
+    if match is None:
+        return None
+    return match.group(1)
+
+def _array_key(csr, length):
+    """Return what must match for consecutive registers to form an array,
+    or `None` if `csr` can't be part of one"""
+    prefix = _array_prefix(csr)
+    if prefix is None:
+        return None
+    if hasattr(csr, "fields") and len(csr.fields) > 0:
+        fields = tuple((f.name, f.offset, f.size, f.description) for f in csr.fields)
+    else:
+        fields = (csr.short_name.lower(), csr.size)
+    return (prefix, csr.reset_value, length, csr.access, fields)
+
+def _register_runs(registers):
+    """Split `(csr, description, length)` tuples into runs that can each be
+    described as one register array
+
+    An array has a single description, so registers whose descriptions
+    differ, such as the words of a split CSR, never share one.
+    """
+    runs = []
+    last_key = None
+    for (csr, description, length) in registers:
+        key = _array_key(csr, length)
+        if key is not None:
+            key = (key, description)
+        if key is not None and key == last_key:
+            runs[-1].append((csr, description, length))
+        else:
+            runs.append([(csr, description, length)])
+        last_key = key
+    return runs
+
+def format_register_array(run, csr_address):
+    """Return a single `<register>` array element that expands to the
+    registers in `run`, which are 4 bytes apart starting at `csr_address`"""
+    (csr, _, length) = run[0]
+    prefix = _array_prefix(csr)
+    indices = [c.short_numbered_name[len(prefix):] for (c, _, _) in run]
+    description = run[0][1]
+    dim = _DIM.format(dim=len(run), increment=4, index=",".join(indices))
+    return format_register(csr, csr_address, description, length, name=prefix + "%s", dim=dim)
+
+def _svd_registers(text):
+    """Return a list of `(peripheral, register, shape, description)` for
+    every register in the SVD document `text`, with arrays expanded"""
+    from xml.etree import ElementTree
+    registers = []
+    root = ElementTree.fromstring(text)
+    for peripheral in root.iter("peripheral"):
+        peripheral_name = peripheral.findtext("name")
+        for register in peripheral.iter("register"):
+            fields = tuple((f.findtext("name"), f.findtext("bitRange"), f.findtext("description"))
+                for f in register.iter("field"))
+            offset = int(register.findtext("addressOffset"), 0)
+            shape = (register.findtext("size"), int(register.findtext("resetValue"), 0), register.findtext("access"), fields)
+            name = register.findtext("name")
+            description = register.findtext("description")
+            if register.find("dim") is None:
+                registers.append((peripheral_name, name, (offset,) + shape, description))
+                continue
+            increment = int(register.findtext("dimIncrement"), 0)
+            for (i, index) in enumerate(register.findtext("dimIndex").split(",")):
+                registers.append((peripheral_name, name.replace("%s", index.strip()), (offset + i*increment,) + shape, description))
+    return registers
+
+def check_register_arrays(expected, actual):
+    """Check that the register arrays in the SVD document `actual` expand to
+    the registers in `expected`, which was written without arrays
+
+    Every register must have the same name, offset, size, reset value,
+    access, fields and description.
+
+    Returns a list of problems, which is empty if the two are equivalent.
+    """
+    problems = []
+    expected_registers = _svd_registers(expected)
+    actual_registers = _svd_registers(actual)
+    if len(expected_registers) != len(actual_registers):
+        problems.append("expected {} registers, found {}".format(len(expected_registers), len(actual_registers)))
+    for (e, a) in zip(expected_registers, actual_registers):
+        label = "{}.{}".format(e[0], e[1])
+        if e[:3] != a[:3]:
+            problems.append("{}: expected {}, found {}".format(label, e[:3], a[:3]))
+        elif e[3] != a[3]:
+            problems.append("{}: expected description {!r}, found {!r}".format(label, e[3], a[3]))
+    return problems
+
+# File name suffix used for each kind of compression
+COMPRESSION_SUFFIXES = OrderedDict([
+    ("gzip", ".gz"),
+    ("xz",   ".xz"),
+    ("bz2",  ".bz2"),
+])
+
+def svd_compression(target, compression=None):
+    """Return the compression to use for an SVD file written to `target`
+
+    If `compression` is `None` and `target` is a path, it is chosen by the
+    path's suffix.  Raises :obj:`ValueError` for an unknown compression.
+    """
+    if compression is None and isinstance(target, str):
+        for (kind, suffix) in COMPRESSION_SUFFIXES.items():
+            if target.endswith(suffix):
+                compression = kind
+    if compression is not None and compression not in COMPRESSION_SUFFIXES:
+        raise ValueError("unknown SVD compression {!r}".format(compression))
+    return compression
+
+def svd_fingerprint(vendor="litex", name="soc", description=None, deduplicate=False, arrays=False,
+            compression=None, compresslevel=None):
+    """Return a :obj:`Fingerprint` of an SVD file written with these
+    options, to which the register map is then added"""
+    return Fingerprint("svd", {
+        "vendor": vendor, "name": name, "description": description,
+        "deduplicate": deduplicate, "arrays": arrays, "compression": (compression, compresslevel),
+    })
+
+@contextlib.contextmanager
+def open_svd_output(target, compression=None, compresslevel=None):
+    """Open a text stream for an SVD file, optionally compressing it
+
+    Arguments
+    ---------
+
+    target (str or :obj:`io`): Either a path, or a binary file object to
+    write to.  A file object is left open afterwards.
+
+    compression (str): `"gzip"`, `"xz"`, `"bz2"` or `None`.  If `None` and
+    `target` is a path, this is chosen by the path's suffix.
+
+    compresslevel (int): Compression level, or preset for xz.  `None` uses
+    the default of each compressor.
+
+    The text is compressed as it is written, so the uncompressed file never
+    exists.  Gzip output leaves out the file name and timestamp, so the
+    same SoC always produces the same bytes.
+    """
+    compression = svd_compression(target, compression)
+
+    if isinstance(target, str) and compression is None:
+        with open(target, "w", encoding="utf-8") as f:
+            yield f
+        return
+
+    binary = target
+    if isinstance(target, str):
+        binary = open(target, "wb")
+    try:
+        if compression == "gzip":
+            import gzip
+            compressed = gzip.GzipFile(filename="", mode="wb", fileobj=binary, mtime=0,
+                compresslevel=9 if compresslevel is None else compresslevel)
+        elif compression == "xz":
+            import lzma
+            compressed = lzma.LZMAFile(binary, "wb", preset=compresslevel)
+        elif compression == "bz2":
+            import bz2
+            compressed = bz2.BZ2File(binary, "wb", compresslevel=9 if compresslevel is None else compresslevel)
+        else:
+            compressed = binary
+        text = io.TextIOWrapper(compressed, encoding="utf-8")
+        yield text
+        # Leave `binary` open; only the compressor is finished off here.
+        text.flush()
+        text.detach()
+        if compressed is not binary:
+            compressed.close()
+    finally:
+        if binary is not target:
+            binary.close()
+
+class SVDWriter:
+    """Stream a CMSIS-SVD description of a register map to a file
+
+    Each peripheral is formatted from precomputed templates into a single
+    string and the output is handed to `stream` in chunks of roughly
+    `chunk_size` characters, rather than one `write()` per line.
+
+    Arguments
+    ---------
+
+    stream (:obj:`io`): Destination text stream.
+
+    vendor (str): Contents of the `<vendor>` tag.
+
+    name (str): Device name.  This is upper-cased for the `<name>` tag.
+
+    description (str): Optional device description.
+
+    chunk_size (int): Number of characters to buffer before writing.
+
+    derive (bool): Describe each peripheral that is identical to an earlier
+    one with `derivedFrom`, rather than repeating its registers.
+
+    arrays (bool): Describe runs of consecutive registers that only differ
+    in a trailing index, such as the words of a split CSR, as a single
+    `dim` register array.
+    """
+    def __init__(self, stream, vendor="litex", name="soc", description=None, chunk_size=65536, derive=False, arrays=False):
+        self.stream = stream
+        self.vendor = vendor
+        self.name = name
+        self.description = description
+        self.chunk_size = chunk_size
+        self.derive = derive
+        self.arrays = arrays
+        self._buffer = []
+        self._buffered = 0
+
+    def _emit(self, s):
+        self._buffer.append(s)
+        self._buffered += len(s)
+        if self._buffered >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if len(self._buffer) > 0:
+            self.stream.write("".join(self._buffer))
+            self._buffer = []
+            self._buffered = 0
+
+    def write_header(self):
+        description = ""
+        if self.description is not None:
+            description = _description("    ", reflow(self.description))
+        self._emit(_HEADER.format(vendor=html.escape(self.vendor, quote=False), name=html.escape(self.name.upper(), quote=False), description=description))
+
+    def write_footer(self):
+        self._emit(_FOOTER)
+        self.flush()
+
+    def format_peripheral(self, region, irq=None):
+        """Return the `<peripheral>` element for a :obj:`DocumentedCSRRegion`"""
+        description = ""
+        if len(region.sections) > 0:
+            description = _description("            ", reflow(region.sections[0].body()))
+        parts = [_PERIPHERAL_HEAD.format(name=html.escape(region.name.upper(), quote=False), origin=region.origin, description=description)]
+
+        registers = []
+        for csr in region.svd_csrs:
+            description = None
+            if hasattr(csr, "description"):
+                description = csr.description
+            length = ((csr.size + region.busword - 1)//region.busword) * region.busword
+            registers.append((csr, description, length))
+
+        csr_address = 0
+        if self.arrays:
+            for run in _register_runs(registers):
+                if len(run) > 1:
+                    parts.append(format_register_array(run, csr_address))
+                else:
+                    parts.append(format_register(run[0][0], csr_address, run[0][1], run[0][2]))
+                csr_address = csr_address + 4*len(run)
+        else:
+            for (csr, description, length) in registers:
+                parts.append(format_register(csr, csr_address, description, length))
+                csr_address = csr_address + 4
+
+        parts.append(_PERIPHERAL_TAIL.format(size=csr_address, interrupt=self._format_interrupt(region, irq)))
+        return "".join(parts)
+
+    def _format_interrupt(self, region, irq):
+        if irq is None:
+            return ""
+        return _INTERRUPT.format(name=html.escape(region.name, quote=False), value=irq)
+
+    def format_derived_peripheral(self, region, base, irq=None):
+        """Return a `<peripheral>` element that describes `region` as a copy
+        of the peripheral `base`"""
+        return _DERIVED_PERIPHERAL.format(base=html.escape(base.name.upper()), name=html.escape(region.name.upper(), quote=False),
+            origin=region.origin, interrupt=self._format_interrupt(region, irq))
+
+    def write_peripheral(self, region, irq=None, base=None):
+        if base is not None:
+            self._emit(self.format_derived_peripheral(region, base, irq))
+        else:
+            self._emit(self.format_peripheral(region, irq))
+
+    def write(self, register_map, stats=None):
+        """Write a complete SVD file for a :obj:`RegisterMap`"""
+        if stats is None:
+            stats = NULL_STATS
+        bases = {}
+        if self.derive:
+            with stats.phase("svd_derive"):
+                for group in group_identical_regions(register_map.regions):
+                    for region in group[1:]:
+                        bases[region.name] = group[0]
+        self.write_regions(register_map.regions, register_map.interrupts, stats, bases)
+
+    def write_regions(self, regions, interrupts, stats=None, bases={}):
+        """Write a complete SVD file for the regions produced by the
+        iterable `regions`
+
+        Each region is written as soon as it arrives and isn't referred to
+        afterwards, so `regions` may be a generator such as
+        :func:`iter_documented_regions`.  `bases` maps the name of a derived
+        region to the region it is derived from.
+        """
+        if stats is None:
+            stats = NULL_STATS
+        self.write_header()
+        for region in regions:
+            with stats.phase("svd", region.name):
+                self.write_peripheral(region, interrupts.get(region.name), bases.get(region.name))
+            del region
+        self.write_footer()
@@ -32,4 +32,9 @@ setup(
     packages=find_packages(exclude=("static*")),
     install_requires=["sphinx", "sphinxcontrib-wavedrom"],
     include_package_data=True,
+    entry_points={
+        "console_scripts": [
+            "lxsocdoc=lxsocdoc.__main__:main",
+        ],
+    },
 )
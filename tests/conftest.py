@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from lxsocdoc import load_register_map
+
+CSR_JSON = {
+    "csr_bases": {"ctrl": 0xf0000000, "uart": 0xf0000800, "uart_phy": 0xf0001000},
+    "csr_registers": {
+        "ctrl_reset": {"addr": 0xf0000000, "size": 1, "type": "rw"},
+        "ctrl_scratch": {"addr": 0xf0000004, "size": 1, "type": "rw"},
+        "ctrl_bus_errors": {"addr": 0xf0000008, "size": 1, "type": "ro"},
+        "uart_rxtx": {"addr": 0xf0000800, "size": 1, "type": "rw"},
+        "uart_txfull": {"addr": 0xf0000804, "size": 1, "type": "ro"},
+        "uart_ev_status": {"addr": 0xf0000808, "size": 1, "type": "ro"},
+        "uart_ev_pending": {"addr": 0xf000080c, "size": 1, "type": "rw"},
+        "uart_ev_enable": {"addr": 0xf0000810, "size": 1, "type": "rw"},
+        "uart_phy_tuning_word": {"addr": 0xf0001000, "size": 4, "type": "rw"},
+    },
+    "constants": {"config_csr_data_width": 8, "uart_interrupt": 2},
+    "memories": {},
+}
+
+SIDECAR = {
+    "regions": {
+        "uart": {
+            "sections": [{"title": "UART", "body": "A serial port."}],
+            "registers": {
+                "rxtx": {
+                    "description": "Data",
+                    "fields": [{"name": "data", "offset": 0, "size": 8, "description": "One byte",
+                                "values": [["0", "zero"], ["1", "one"]]}],
+                },
+            },
+        },
+        "uart_phy": {
+            "registers": {"tuning_word": {"description": "Tuning word", "size": 32, "reset": 12345}},
+        },
+    },
+}
+
+@pytest.fixture
+def csr_json(tmp_path):
+    """Paths of a small `csr.json` and its sidecar"""
+    path = tmp_path / "csr.json"
+    path.write_text(json.dumps(CSR_JSON))
+    sidecar = tmp_path / "sidecar.json"
+    sidecar.write_text(json.dumps(SIDECAR))
+    return (str(path), str(sidecar))
+
+@pytest.fixture
+def register_map(csr_json):
+    return load_register_map(*csr_json)
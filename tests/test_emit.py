@@ -0,0 +1,29 @@
+from lxsocdoc import emit, generate_docs, generate_svd, DocsBackend, SVDBackend, MemoryOutput
+
+def test_backends_match_generators(tmp_path, register_map):
+    generate_docs(register_map, str(tmp_path / "ref"))
+    generate_svd(register_map, str(tmp_path))
+    emit(register_map, [DocsBackend(str(tmp_path / "emit")), SVDBackend(str(tmp_path / "emit.svd"))])
+    for name in ("index.rst", "uart.rst", ".lxsocdoc-pages", ".lxsocdoc-fingerprint"):
+        assert (tmp_path / "ref" / name).read_bytes() == (tmp_path / "emit" / name).read_bytes()
+    assert (tmp_path / "soc.svd").read_bytes() == (tmp_path / "emit.svd").read_bytes()
+    assert (tmp_path / "soc.svd.fingerprint").read_bytes() == (tmp_path / "emit.svd.fingerprint").read_bytes()
+
+def test_emit_invalidates_generated_output(tmp_path, register_map):
+    docs = str(tmp_path / "docs")
+    generate_docs(register_map, docs)
+    assert generate_svd(register_map, str(tmp_path))
+
+    # Overwrite both outputs with a different register map.
+    other = register_map._replace(regions=register_map.regions[:1])
+    emit(other, [DocsBackend(docs), SVDBackend(str(tmp_path / "soc.svd"))])
+
+    assert not generate_docs(register_map, docs).skipped
+    assert generate_svd(register_map, str(tmp_path))
+    assert generate_docs(register_map, docs).skipped
+    assert not generate_svd(register_map, str(tmp_path))
+
+def test_docs_backend_into_sink(register_map):
+    output = MemoryOutput()
+    emit(register_map, [DocsBackend(output)])
+    assert generate_docs(register_map, output).skipped
@@ -0,0 +1,76 @@
+import os
+import sys
+
+import pytest
+
+from lxsocdoc import build_register_map, generate_docs, generate_svd, Fingerprint
+
+def changed_description(register_map):
+    region = register_map.regions[1]
+    csrs = (region.csrs[0].replace(description="Other data"),) + tuple(region.csrs[1:])
+    regions = list(register_map.regions)
+    regions[1] = region.replace(csrs=csrs)
+    return register_map._replace(regions=tuple(regions))
+
+def test_docs_skip_when_unchanged(tmp_path, register_map):
+    docs = str(tmp_path / "docs")
+    assert not generate_docs(register_map, docs).skipped
+    report = generate_docs(register_map, docs)
+    assert report.skipped
+    assert report.changed == []
+    assert not generate_docs(register_map, docs, force=True).skipped
+
+def test_docs_regenerate_when_changed(tmp_path, register_map):
+    docs = str(tmp_path / "docs")
+    generate_docs(register_map, docs)
+    report = generate_docs(changed_description(register_map), docs)
+    assert not report.skipped
+    assert "uart.rst" in report.changed
+    assert "ctrl.rst" in report.unchanged
+    assert not generate_docs(register_map, docs, table_format="list").skipped
+
+def test_docs_regenerate_missing_pages(tmp_path, register_map):
+    docs = tmp_path / "docs"
+    generate_docs(register_map, str(docs))
+    os.remove(str(docs / "uart.rst"))
+    assert generate_docs(register_map, str(docs)).changed == ["uart.rst", ".lxsocdoc-fingerprint"]
+
+def test_svd_skip_and_invalidation(tmp_path, register_map):
+    out = str(tmp_path)
+    assert generate_svd(register_map, out)
+    assert os.path.exists(os.path.join(out, "soc.svd.fingerprint"))
+    assert not generate_svd(register_map, out)
+    assert generate_svd(register_map, out, force=True)
+    assert generate_svd(changed_description(register_map), out)
+    assert generate_svd(changed_description(register_map), out, arrays=True)
+    os.remove(os.path.join(out, "soc.svd"))
+    assert generate_svd(changed_description(register_map), out, arrays=True)
+
+def test_interrupted_build_is_not_up_to_date(tmp_path, register_map):
+    out = str(tmp_path)
+    generate_svd(register_map, out)
+    os.remove(os.path.join(out, "soc.svd.fingerprint"))
+    assert generate_svd(register_map, out)
+
+def test_fingerprint_covers_the_register_map(register_map):
+    def digest(register_map, options={}):
+        fingerprint = Fingerprint("docs", options)
+        fingerprint.add_register_map(register_map)
+        return fingerprint.hexdigest()
+    assert digest(register_map) == digest(register_map._replace())
+    assert digest(register_map) != digest(changed_description(register_map))
+    assert digest(register_map) != digest(register_map, {"diagrams": "svg"})
+
+def test_soc_skip_matches_register_map(tmp_path):
+    pytest.importorskip("litex")
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+    from synthetic import SyntheticSoC
+    soc = SyntheticSoC(regions=2, csrs=2)
+    streamed = str(tmp_path / "streamed")
+    assert not generate_docs(soc, streamed, quiet=True).skipped
+    assert generate_docs(soc, streamed, quiet=True).skipped
+    assert generate_svd(soc, streamed)
+    assert not generate_svd(soc, streamed)
+    # The fingerprint of a streamed SoC is that of its register map.
+    assert generate_docs(build_register_map(soc), streamed, quiet=True).skipped
+    assert not generate_svd(build_register_map(soc), streamed)
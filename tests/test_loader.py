@@ -0,0 +1,59 @@
+import pytest
+
+from lxsocdoc import load_register_map
+from lxsocdoc.__main__ import main
+
+CSR_CSV = """\
+csr_base,ctrl,0xf0000000,,
+csr_base,uart,0xf0000800,,
+csr_base,uart_phy,0xf0001000,,
+csr_register,ctrl_reset,0xf0000000,1,rw
+csr_register,ctrl_scratch,0xf0000004,1,rw
+csr_register,ctrl_bus_errors,0xf0000008,1,ro
+csr_register,uart_rxtx,0xf0000800,1,rw
+csr_register,uart_txfull,0xf0000804,1,ro
+csr_register,uart_ev_status,0xf0000808,1,ro
+csr_register,uart_ev_pending,0xf000080c,1,rw
+csr_register,uart_ev_enable,0xf0000810,1,rw
+csr_register,uart_phy_tuning_word,0xf0001000,4,rw
+constant,config_csr_data_width,8,,
+constant,uart_interrupt,2,,
+"""
+
+def test_regions_and_registers(register_map):
+    assert [region.name for region in register_map.regions] == ["ctrl", "uart", "uart_phy"]
+    assert register_map.csr_data_width == 8
+    assert dict(register_map.interrupts) == {"uart": 2}
+    uart = register_map.regions[1]
+    assert [csr.short_name for csr in uart.csrs] == ["RXTX", "TXFULL", "EV_STATUS", "EV_PENDING", "EV_ENABLE"]
+    assert uart.csrs[1].access == "read-only"
+    assert [section.title() for section in uart.sections] == ["UART"]
+
+def test_sidecar_fields_and_sizes(register_map):
+    rxtx = register_map.regions[1].csrs[0]
+    assert rxtx.description == "Data"
+    assert [(f.name, f.offset, f.size) for f in rxtx.fields] == [("data", 0, 8)]
+    # A 32-bit register on an 8-bit bus is split into four words.
+    tuning = register_map.regions[2].csrs
+    assert [csr.name for csr in tuning] == ["UART_PHY_TUNING_WORD3", "UART_PHY_TUNING_WORD2",
+        "UART_PHY_TUNING_WORD1", "UART_PHY_TUNING_WORD0"]
+    assert [csr.address for csr in tuning] == [0xf0001000, 0xf0001004, 0xf0001008, 0xf000100c]
+
+def test_csv_matches_json(tmp_path, csr_json, register_map):
+    path = tmp_path / "csr.csv"
+    path.write_text(CSR_CSV)
+    from_csv = load_register_map(str(path), csr_json[1])
+    def registers(register_map):
+        return [[(csr.name, csr.address, csr.size, csr.access, csr.description) for csr in region.csrs]
+            for region in register_map.regions]
+    assert registers(from_csv) == registers(register_map)
+    assert dict(from_csv.interrupts) == dict(register_map.interrupts)
+
+def test_cli_creates_the_svd_directory(tmp_path, csr_json):
+    out = tmp_path / "a" / "b"
+    assert main(["build", "--from", csr_json[0], "--svd", str(out), "--svd-compression", "xz"]) == 0
+    assert (out / "soc.svd.xz").exists()
+
+def test_cli_rejects_sphinx_without_docs(csr_json):
+    with pytest.raises(SystemExit):
+        main(["build", "--from", csr_json[0], "--sphinx"])
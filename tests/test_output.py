@@ -0,0 +1,55 @@
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from lxsocdoc import generate_docs, open_output, MemoryOutput, OutputDirectory, ZipOutput, TarOutput
+
+def directory_files(path):
+    return dict((str(p.relative_to(path)).replace("\\", "/"), p.read_bytes())
+        for p in sorted(path.rglob("*")) if p.is_file())
+
+def test_sinks_hold_the_same_files(tmp_path, register_map):
+    memory = MemoryOutput()
+    generate_docs(register_map, memory)
+    generate_docs(register_map, str(tmp_path / "docs"))
+    generate_docs(register_map, str(tmp_path / "docs.zip"))
+    generate_docs(register_map, str(tmp_path / "docs.tar.gz"))
+
+    expected = dict((name, memory.read(name)) for name in memory.files)
+    assert directory_files(tmp_path / "docs") == expected
+
+    # Archives can't be checked against a fingerprint, so get none.
+    del expected[".lxsocdoc-fingerprint"]
+    with zipfile.ZipFile(str(tmp_path / "docs.zip")) as archive:
+        assert dict((name, archive.read(name)) for name in archive.namelist()) == expected
+    with tarfile.open(str(tmp_path / "docs.tar.gz")) as archive:
+        assert dict((m.name, archive.extractfile(m).read()) for m in archive.getmembers()) == expected
+
+def test_archive_is_always_regenerated(tmp_path, register_map):
+    target = str(tmp_path / "docs.zip")
+    generate_docs(register_map, target)
+    assert not generate_docs(register_map, target).skipped
+
+def test_directory_keeps_unchanged_files(tmp_path):
+    output = OutputDirectory(str(tmp_path))
+    assert output.write("a/b.txt", "one")
+    assert not OutputDirectory(str(tmp_path)).write("a/b.txt", "one")
+    assert output.read("a/b.txt") == b"one"
+
+def test_archive_rejects_rewriting_a_file():
+    with ZipOutput(io.BytesIO()) as output:
+        output.write("a.txt", "one")
+        assert not output.write("a.txt", "one")
+        with pytest.raises(ValueError):
+            output.write("a.txt", "two")
+
+def test_open_output(tmp_path):
+    assert isinstance(open_output(tmp_path / "docs"), OutputDirectory)
+    with open_output(str(tmp_path / "docs.tar")) as output:
+        assert isinstance(output, TarOutput)
+    memory = MemoryOutput()
+    assert open_output(memory) is memory
+    with pytest.raises(TypeError):
+        open_output(io.BytesIO())
@@ -0,0 +1,45 @@
+import pickle
+
+import pytest
+
+from lxsocdoc import DocumentedInterrupts
+
+def region_named(register_map, name):
+    return next(region for region in register_map.regions if region.name == name)
+
+def test_regions_are_frozen(register_map):
+    region = region_named(register_map, "uart")
+    with pytest.raises(AttributeError):
+        region.name = "other"
+    with pytest.raises(AttributeError):
+        region.csrs[0].name = "other"
+    with pytest.raises(AttributeError):
+        region.csrs[0].fields[0].size = 2
+    assert isinstance(region.csrs, tuple)
+    assert isinstance(region.sections, tuple)
+
+def test_replace_leaves_original_alone(register_map):
+    region = region_named(register_map, "uart")
+    renamed = region.replace(name="other")
+    assert renamed.name == "other"
+    assert region.name == "uart"
+
+def test_interrupts_are_read_only(register_map):
+    with pytest.raises(TypeError):
+        register_map.interrupts["ctrl"] = 3
+    table = register_map.modules[0]
+    assert isinstance(table, DocumentedInterrupts)
+    with pytest.raises(TypeError):
+        table.interrupts["ctrl"] = 3
+
+def test_interrupt_table_has_its_own_copy():
+    interrupts = {"uart": 2}
+    table = DocumentedInterrupts(interrupts)
+    interrupts["timer"] = 1
+    assert dict(table.interrupts) == {"uart": 2}
+
+def test_modules_are_snapshots(register_map):
+    for module in register_map.modules:
+        assert isinstance(module.sections, tuple)
+    table = pickle.loads(pickle.dumps(register_map.modules[0]))
+    assert dict(table.interrupts) == dict(register_map.interrupts)
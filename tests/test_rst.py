@@ -0,0 +1,45 @@
+import pytest
+
+from lxsocdoc import format_table, format_list_table, generate_docs, MemoryOutput
+
+TABLE = [
+    ["Register", "Description"],
+    ["CTRL", "Control register"],
+    ["STATUS", "First line\nsecond line"],
+    ["EMPTY", ""],
+]
+
+def test_list_table():
+    assert format_list_table(TABLE) == (
+        ".. list-table::\n"
+        "    :header-rows: 1\n"
+        "\n"
+        "    * - Register\n"
+        "      - Description\n"
+        "    * - CTRL\n"
+        "      - Control register\n"
+        "    * - STATUS\n"
+        "      - First line\n"
+        "        second line\n"
+        "    * - EMPTY\n"
+        "      -\n"
+    )
+    assert format_list_table([]) == ""
+
+def cells(rst):
+    from docutils.core import publish_doctree
+    from docutils import nodes
+    doctree = publish_doctree(rst, settings_overrides={"report_level": 5})
+    return [[entry.astext() for entry in row.findall(nodes.entry)] for row in doctree.findall(nodes.row)]
+
+def test_list_and_grid_tables_parse_the_same():
+    pytest.importorskip("docutils")
+    assert cells(format_list_table(TABLE)) == cells(format_table(TABLE))
+    assert cells(format_table(TABLE))[2] == ["STATUS", "First line\nsecond line"]
+
+def test_docs_use_list_tables(register_map):
+    output = MemoryOutput()
+    generate_docs(register_map, output, table_format="list")
+    page = output.read("uart.rst").decode("utf-8")
+    assert ".. list-table::" in page
+    assert "+---" not in page
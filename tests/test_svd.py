@@ -0,0 +1,47 @@
+import io
+import json
+
+import pytest
+
+from lxsocdoc import load_register_map, generate_svd, check_register_arrays
+
+@pytest.fixture
+def bank_map(tmp_path):
+    registers = {"dma_buf{}".format(i): {"addr": 0xf0000000 + 4*i, "size": 1, "type": "rw"} for i in range(4)}
+    registers["dma_len"] = {"addr": 0xf0000010, "size": 4, "type": "rw"}
+    path = tmp_path / "csr.json"
+    path.write_text(json.dumps({"csr_bases": {"dma": 0xf0000000}, "csr_registers": registers,
+        "constants": {"config_csr_data_width": 8}}))
+    fields = [{"name": "lo", "offset": 0, "size": 4, "description": "Low half"},
+              {"name": "hi", "offset": 4, "size": 4, "description": "High half"}]
+    sidecar = {"buf{}".format(i): {"description": "A buffer", "fields": fields} for i in range(4)}
+    sidecar["len"] = {"description": "Transfer length", "size": 32}
+    sidecar_path = tmp_path / "sidecar.json"
+    sidecar_path.write_text(json.dumps({"regions": {"dma": {"registers": sidecar}}}))
+    return load_register_map(str(path), str(sidecar_path))
+
+def svd(register_map, **kwargs):
+    stream = io.BytesIO()
+    generate_svd(register_map, stream, **kwargs)
+    return stream.getvalue().decode("utf-8")
+
+def test_equal_registers_form_an_array(bank_map):
+    text = svd(bank_map, arrays=True)
+    assert text.count("<dim>") == 1
+    assert "<name>BUF%s</name>" in text
+    assert "<dimIndex>0,1,2,3</dimIndex>" in text
+    assert check_register_arrays(svd(bank_map), text) == []
+
+def test_registers_with_different_descriptions_stay_apart(bank_map):
+    # The words of a split CSR each describe their own bits.
+    text = svd(bank_map, arrays=True)
+    for word in range(4):
+        assert "<name>LEN{}</name>".format(word) in text
+
+def test_checker_compares_descriptions_exactly(bank_map):
+    plain = svd(bank_map)
+    arrays = svd(bank_map, arrays=True)
+    changed = arrays.replace("A buffer", "A buffer, and more")
+    problems = check_register_arrays(plain, changed)
+    assert len(problems) == 4
+    assert "description" in problems[0]